@@ -1,7 +1,7 @@
 from django.contrib import admin
 from djangoql.admin import DjangoQLSearchMixin
 
-from .models import Category
+from .models import Category, CategoryDeletion
 
 
 class CategoryAdmin(DjangoQLSearchMixin, admin.ModelAdmin):
@@ -12,14 +12,25 @@ class CategoryAdmin(DjangoQLSearchMixin, admin.ModelAdmin):
         'background_url',
         'parent_category',
         'owner',
+        'link_count',
         'created_at',
         'updated_at'
     )
     list_filter = ("created_at", "updated_at")
     search_fields = ("name", "description")
-    readonly_fields = ("created_at", "updated_at")
+    readonly_fields = ("link_count", "created_at", "updated_at")
 
     # TODO handle validation errors
 
 
 admin.site.register(Category, CategoryAdmin)
+
+
+class CategoryDeletionAdmin(admin.ModelAdmin):
+    list_display = ('name', 'owner', 'status', 'deleted_links', 'deleted_categories', 'created_at')
+    list_filter = ('status',)
+    raw_id_fields = ('owner',)
+    ordering = ('-created_at',)
+
+
+admin.site.register(CategoryDeletion, CategoryDeletionAdmin)
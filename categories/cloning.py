@@ -0,0 +1,162 @@
+import re
+
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from links.models import Link, LinkMetadataJob
+
+from .models import Category, CategoryAccess
+
+NAME_MAX_LENGTH = Category._meta.get_field("name").max_length
+COPY_SUFFIX = re.compile(r" \(copy(?: \d+)?\)$")
+
+CLONE_LINKS = f"""
+    WITH mapping AS (
+        SELECT * FROM unnest(%(sources)s::bigint[], %(copies)s::bigint[])
+            AS mapping(source_id, copy_id)
+    ), source AS (
+        SELECT link.*, mapping.copy_id AS copy_category_id
+        FROM {Link._meta.db_table} AS link
+        JOIN mapping ON mapping.source_id = link.category_id
+    ), inserted AS (
+        INSERT INTO {Link._meta.db_table} (
+            url, url_hash, description, owner_id, category_id, created_at, updated_at,
+            title, canonical_url, favicon_url, status_code, last_checked_at, visits
+        )
+        SELECT
+            url, url_hash, description, %(owner)s, copy_category_id, %(now)s, %(now)s,
+            title, canonical_url, favicon_url, status_code, last_checked_at, 0
+        FROM source
+        ORDER BY id
+        ON CONFLICT (owner_id, url_hash) DO NOTHING
+        RETURNING id, url_hash
+    )
+    SELECT DISTINCT ON (inserted.id)
+        inserted.id,
+        source.id,
+        EXISTS (SELECT FROM {LinkMetadataJob._meta.db_table} WHERE link_id = source.id)
+    FROM inserted JOIN source ON source.url_hash = inserted.url_hash
+    ORDER BY inserted.id, source.id
+"""
+
+CLONE_LINK_TAGS = f"""
+    INSERT INTO {Link.tags.through._meta.db_table} (link_id, tag_id)
+    SELECT mapping.copy_id, link_tag.tag_id
+    FROM unnest(%s::bigint[], %s::bigint[]) AS mapping(source_id, copy_id)
+    JOIN {Link.tags.through._meta.db_table} AS link_tag ON link_tag.link_id = mapping.source_id
+"""
+
+
+def copy_name(name, taken):
+    """`name`, or the first of "name (copy)", "name (copy 2)"... not in `taken`"""
+    candidate, number = name, 1
+    while candidate in taken:
+        suffix = " (copy)" if number == 1 else f" (copy {number})"
+        candidate = name[: NAME_MAX_LENGTH - len(suffix)] + suffix
+        number += 1
+    taken.add(candidate)
+    return candidate
+
+
+def original_name(name):
+    """`name` without the suffix `copy_name` adds"""
+    return COPY_SUFFIX.sub("", name)
+
+
+def visible_categories(user):
+    """Categories `user` owns or which are shared with them"""
+    shared = CategoryAccess.objects.filter(category=OuterRef("pk"), user=user)
+    return Category.objects.filter(Q(owner=user) | Exists(shared), pending_deletion=False)
+
+
+def clone_subtree(root, owner, parent=None, name=None):
+    """
+    Copy `root` and the categories under it which `owner` can see, with
+    their links and tags, into the categories of `owner`, under `parent`.
+
+    Categories are inserted with one `bulk_create` per level, the links and
+    their tags with one `INSERT ... SELECT` each, so the number of queries
+    only grows with the depth of the subtree. Names already in use get a
+    " (copy)" suffix, links whose url `owner` already saved are skipped,
+    which are all of them when `owner` clones their own category. Returns
+    `(copy of root, links copied, links skipped)`, the copy without its
+    `path` and `link_count`.
+    """
+    with transaction.atomic():
+        categories = list(
+            visible_categories(owner)
+            .subtree(root.path)
+            .order_by("id")
+            .values(
+                "id",
+                "parent_category_id",
+                "name",
+                "description",
+                "background_url",
+                "link_count",
+            )
+        )
+        children = {}
+        for category in categories:
+            children.setdefault(category["parent_category_id"], []).append(category)
+
+        taken = set(
+            Category.objects.filter(owner=owner, pending_deletion=False).values_list(
+                "name", flat=True
+            )
+        )
+        if name:
+            taken.add(name)
+
+        copies = {}
+        # pairs of a category to copy and the id of the parent of its copy
+        level = [
+            (category, parent and parent.id) for category in categories if category["id"] == root.id
+        ]
+        while level:
+            created = Category.objects.bulk_create(
+                Category(
+                    name=(
+                        name
+                        if name and category["id"] == root.id
+                        else copy_name(category["name"], taken)
+                    ),
+                    owner=owner,
+                    description=category["description"],
+                    background_url=category["background_url"],
+                    parent_category_id=parent_id,
+                )
+                for category, parent_id in level
+            )
+            copies.update((category["id"], copy) for (category, _), copy in zip(level, created))
+            level = [
+                (child, copies[category["id"]].id)
+                for category, _ in level
+                for child in children.get(category["id"], [])
+            ]
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                CLONE_LINKS,
+                {
+                    "sources": list(copies),
+                    "copies": [copy.id for copy in copies.values()],
+                    "owner": owner.id,
+                    "now": timezone.now(),
+                },
+            )
+            links = cursor.fetchall()
+            cursor.execute(
+                CLONE_LINK_TAGS,
+                [[source for _, source, _ in links], [copy for copy, _, _ in links]],
+            )
+            # copies of links which were already enriched need no fetch
+            cursor.execute(
+                f"DELETE FROM {LinkMetadataJob._meta.db_table} WHERE link_id = ANY(%s)",
+                [[copy for copy, _, pending in links if not pending]],
+            )
+
+    copied = len(links)
+    total = sum(category["link_count"] for category in categories)
+    return copies[root.id], copied, max(total - copied, 0)
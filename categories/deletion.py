@@ -0,0 +1,141 @@
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Count, F, Sum, Value
+from django.db.models.functions import Length, Replace
+from django.utils import timezone
+
+from invitations.models import CategoryInvitation
+from links.models import Link
+
+from .models import Category, CategoryAccess, CategoryDeletion
+
+
+def schedule_deletion(category):
+    """
+    Hide `category` and everything under it, and create the
+    `CategoryDeletion` a worker will delete them with. Returns None when the
+    category is already being deleted.
+    """
+    with transaction.atomic():
+        # moves of the category wait, so the path stays the one of the job
+        path = (
+            Category.objects.select_for_update()
+            .filter(id=category.id, pending_deletion=False)
+            .values_list("path", flat=True)
+            .first()
+        )
+        if path is None:
+            return None
+
+        subtree = Category.objects.subtree(path)
+        totals = subtree.aggregate(categories=Count("id"), links=Sum("link_count"))
+        subtree.update(pending_deletion=True)
+        return CategoryDeletion.objects.create(
+            owner_id=category.owner_id,
+            category_id=category.id,
+            name=category.name,
+            path=path,
+            total_categories=totals["categories"],
+            total_links=totals["links"] or 0,
+        )
+
+
+def claim_deletion(lease=timedelta(minutes=5)):
+    """
+    Mark the oldest pending deletion as running and return it, or None.
+    Deletions left running for longer than `lease` without progress, by a
+    worker which died, are made pending again.
+    """
+    with transaction.atomic():
+        CategoryDeletion.objects.filter(
+            status=CategoryDeletion.Status.RUNNING, locked_at__lte=timezone.now() - lease
+        ).update(status=CategoryDeletion.Status.PENDING, locked_at=None)
+
+        deletion = (
+            CategoryDeletion.objects.select_for_update(skip_locked=True)
+            .filter(status=CategoryDeletion.Status.PENDING)
+            .order_by("created_at", "id")
+            .first()
+        )
+        if deletion is None:
+            return None
+        deletion.status = CategoryDeletion.Status.RUNNING
+        deletion.locked_at = timezone.now()
+        deletion.attempts += 1
+        deletion.save(update_fields=("status", "locked_at", "attempts", "updated_at"))
+    return deletion
+
+
+def record_progress(deletion, **counts):
+    """Add `counts` to the progress of `deletion` and renew its lease"""
+    now = timezone.now()
+    CategoryDeletion.objects.filter(id=deletion.id).update(
+        locked_at=now,
+        updated_at=now,
+        **{name: F(name) + count for name, count in counts.items()},
+    )
+
+
+def delete_links_batch(deletion, batch_size):
+    """Delete up to `batch_size` links of the subtree, returns how many"""
+    with transaction.atomic():
+        batch = Link.objects.filter(category__path__startswith=deletion.path).values("id")
+        deleted = Link.objects.filter(id__in=batch[:batch_size]).bulk_delete()
+        record_progress(deletion, deleted_links=deleted)
+    return deleted
+
+
+def delete_categories_batch(deletion, batch_size):
+    """
+    Delete up to `batch_size` categories of the subtree, deepest first so
+    that no category outlives its subcategories, returns how many.
+    """
+    depth = Length("path") - Length(Replace("path", Value("."), Value("")))
+    with transaction.atomic():
+        ids = list(
+            Category.objects.subtree(deletion.path)
+            .order_by(depth.desc())
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not ids:
+            return 0
+        # the delete below does not cascade to the rows referencing them
+        CategoryAccess.objects.filter(category_id__in=ids).delete()
+        CategoryInvitation.objects.filter(category_id__in=ids).delete()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {Category._meta.db_table} WHERE id = ANY(%s)", [ids]
+            )
+            deleted = cursor.rowcount
+        record_progress(deletion, deleted_categories=deleted)
+    return deleted
+
+
+def run_deletion(deletion, batch_size=1000, max_attempts=3):
+    """
+    Delete the links of the subtree, then its categories, each batch in its
+    own short transaction. Links added in the meantime are deleted by a
+    later batch, or fail the category batch until the deletion is retried.
+    """
+    try:
+        while delete_links_batch(deletion, batch_size) or delete_categories_batch(
+            deletion, batch_size
+        ):
+            pass
+    except Exception as error:
+        failed = deletion.attempts >= max_attempts
+        CategoryDeletion.objects.filter(id=deletion.id).update(
+            status=CategoryDeletion.Status.FAILED if failed else CategoryDeletion.Status.PENDING,
+            locked_at=None,
+            last_error=str(error)[:1000],
+            updated_at=timezone.now(),
+        )
+        raise
+
+    now = timezone.now()
+    CategoryDeletion.objects.filter(id=deletion.id).update(
+        status=CategoryDeletion.Status.DONE, locked_at=None, updated_at=now, finished_at=now
+    )
+    deletion.refresh_from_db()
+    return deletion
@@ -0,0 +1,109 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from categories.models import Category
+from categories.tree import TREE_FIELDS, build_tree
+
+UserModel = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare loading a category tree one request per category, one query "
+        "per level and with the single WITH RECURSIVE query of "
+        "`/categories/tree/`, on a deep and on a wide tree. "
+        "All data is created inside a transaction which is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--depth", type=int, default=50, help="levels of the deep tree")
+        parser.add_argument("--nodes", type=int, default=10000, help="categories of the wide tree")
+        parser.add_argument(
+            "--fanout", type=int, default=10, help="children per category of the wide tree"
+        )
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.stdout.write(
+                f"{'tree':<6} {'nodes':>6} {'strategy':<10} {'queries':>8} {'median (ms)':>12}"
+            )
+            deep = self.populate("deep", options["depth"], fanout=1)
+            self.run("deep", deep, options["repeat"])
+            wide = self.populate("wide", options["nodes"], fanout=options["fanout"])
+            self.run("wide", wide, options["repeat"])
+            transaction.set_rollback(True)
+
+    def populate(self, name, nodes, fanout):
+        """A tree of `nodes` categories filled breadth first, `fanout` children each"""
+        owner = UserModel.objects.create_user(
+            username=f"benchmark-{name}", email=f"{name}@example.com", password="benchmark"
+        )
+        level = [Category.objects.create(name=f"{name}-0", owner=owner)]
+        created = 1
+        while created < nodes:
+            children = []
+            for parent in level:
+                for _ in range(min(fanout, nodes - created - len(children))):
+                    children.append(
+                        Category(
+                            name=f"{name}-{created + len(children)}",
+                            owner=owner,
+                            parent_category=parent,
+                        )
+                    )
+            level = Category.objects.bulk_create(children, batch_size=1000)
+            created += len(level)
+        return owner
+
+    def run(self, name, owner, repeat):
+        strategies = (
+            ("per node", self.per_node),
+            ("per level", self.per_level),
+            ("recursive", self.recursive),
+        )
+        for strategy, load in strategies:
+            timings = []
+            for _ in range(repeat):
+                queries = []
+                # counted with a wrapper: the query log of the connection is
+                # capped below the number of queries of the per node strategy
+                with connection.execute_wrapper(
+                    lambda execute, *args: queries.append(1) or execute(*args)
+                ):
+                    start = time.perf_counter()
+                    count = load(owner)
+                    timings.append((time.perf_counter() - start) * 1000)
+            self.stdout.write(
+                f"{name:<6} {count:>6} {strategy:<10} {len(queries):>8} "
+                f"{statistics.median(timings):>12.2f}"
+            )
+
+    def per_node(self, owner):
+        """What clients do today: one `?parent_category=` request per category"""
+        categories = Category.objects.filter(owner=owner).only(*TREE_FIELDS)
+        pending = list(categories.filter(parent_category=None))
+        count = 0
+        while pending:
+            category = pending.pop()
+            count += 1
+            pending.extend(categories.filter(parent_category=category.id))
+        return count
+
+    def per_level(self, owner):
+        categories = Category.objects.filter(owner=owner).only(*TREE_FIELDS)
+        level = list(categories.filter(parent_category=None))
+        count = 0
+        while level:
+            count += len(level)
+            level = list(categories.filter(parent_category__in=[category.id for category in level]))
+        return count
+
+    def recursive(self, owner):
+        categories = list(Category.objects.tree_of(owner).order_by("name", "id").only(*TREE_FIELDS))
+        build_tree(categories)
+        return len(categories)
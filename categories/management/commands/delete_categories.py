@@ -0,0 +1,34 @@
+from categories.deletion import claim_deletion, run_deletion
+from links_organizer_api.utils.commands import WorkerCommand
+
+
+class Command(WorkerCommand):
+    help = (
+        "Worker which deletes the categories scheduled for deletion in the "
+        "background, with their subcategories and links, in bounded batches."
+    )
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--max-attempts", type=int, default=3)
+
+    def work(self, **options):
+        deletion = claim_deletion()
+        if deletion is None:
+            return False
+
+        try:
+            deletion = run_deletion(
+                deletion,
+                batch_size=options["batch_size"],
+                max_attempts=options["max_attempts"],
+            )
+        except Exception as error:
+            self.stderr.write(f"{deletion}: {error}")
+            return True
+        self.stdout.write(
+            f"{deletion}: deleted {deletion.deleted_links} links "
+            f"and {deletion.deleted_categories} categories"
+        )
+        return True
@@ -0,0 +1,17 @@
+# Generated by Django 4.1.2 on 2026-10-18 08:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0003_categoryaccess_category_shared_users_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['owner', '-created_at', '-id'], name='category_owner_created_idx'),
+        ),
+    ]
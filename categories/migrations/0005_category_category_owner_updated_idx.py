@@ -0,0 +1,17 @@
+# Generated by Django 4.1.2 on 2026-10-18 08:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0004_category_category_owner_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['owner', 'updated_at', 'id'], name='category_owner_updated_idx'),
+        ),
+    ]
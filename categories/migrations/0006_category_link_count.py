@@ -0,0 +1,18 @@
+# Generated by Django 4.1.2 on 2026-10-18 08:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0005_category_category_owner_updated_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='link_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
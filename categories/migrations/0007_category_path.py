@@ -0,0 +1,77 @@
+# Generated by Django 4.1.2 on 2026-10-18 09:11
+
+from django.db import migrations, models
+
+CREATE_TRIGGERS = """
+CREATE FUNCTION categories_category_set_path() RETURNS trigger AS $$
+BEGIN
+    IF NEW.parent_category_id IS NULL THEN
+        NEW.path := NEW.id || '.';
+    ELSE
+        -- waits for a concurrent move of the parent, then reads its new path
+        SELECT path || NEW.id || '.' INTO NEW.path
+        FROM categories_category WHERE id = NEW.parent_category_id
+        FOR SHARE;
+    END IF;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER categories_category_path_trigger
+    BEFORE INSERT OR UPDATE OF parent_category_id ON categories_category
+    FOR EACH ROW EXECUTE FUNCTION categories_category_set_path();
+
+CREATE FUNCTION categories_category_move_subtree() RETURNS trigger AS $$
+BEGIN
+    -- the whole subtree is re-pathed by one statement; ~>=~ and ~<~ compare
+    -- bytewise like the text_pattern_ops index, and '~' sorts after the
+    -- digits and dots of a path
+    UPDATE categories_category
+    SET path = NEW.path || substr(path, length(OLD.path) + 1)
+    WHERE path ~>=~ OLD.path AND path ~<~ (OLD.path || '~') AND id <> NEW.id;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER categories_category_subtree_path_trigger
+    AFTER UPDATE OF parent_category_id ON categories_category
+    FOR EACH ROW WHEN (OLD.path IS DISTINCT FROM NEW.path)
+    EXECUTE FUNCTION categories_category_move_subtree();
+
+WITH RECURSIVE paths(id, path) AS (
+    SELECT id, id || '.' FROM categories_category WHERE parent_category_id IS NULL
+    UNION ALL
+    SELECT category.id, paths.path || category.id || '.'
+    FROM categories_category AS category
+    JOIN paths ON category.parent_category_id = paths.id
+)
+UPDATE categories_category AS category SET path = paths.path
+FROM paths WHERE category.id = paths.id;
+"""
+
+DROP_TRIGGERS = """
+DROP TRIGGER IF EXISTS categories_category_path_trigger ON categories_category;
+DROP TRIGGER IF EXISTS categories_category_subtree_path_trigger ON categories_category;
+DROP FUNCTION IF EXISTS categories_category_set_path();
+DROP FUNCTION IF EXISTS categories_category_move_subtree();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0006_category_link_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.TextField(default='', editable=False),
+        ),
+        migrations.RunSQL(CREATE_TRIGGERS, DROP_TRIGGERS),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['path'], name='category_path_idx', opclasses=['text_pattern_ops']),
+        ),
+    ]
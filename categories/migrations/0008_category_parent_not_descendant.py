@@ -0,0 +1,61 @@
+# Generated by Django 4.1.2 on 2026-10-18 09:20
+
+from django.db import migrations
+
+# The parent row is read FOR SHARE after the moved row was locked by the
+# update, so a concurrent move of the parent, or of one of its ancestors
+# which re-paths it, either commits before the check reads the parent's path
+# or waits for this move and then fails the same check on its own side.
+SET_PATH = """
+CREATE OR REPLACE FUNCTION categories_category_set_path() RETURNS trigger AS $$
+DECLARE
+    parent_path text;
+BEGIN
+    IF NEW.parent_category_id IS NULL THEN
+        NEW.path := NEW.id || '.';
+        RETURN NEW;
+    END IF;
+
+    SELECT path INTO parent_path
+    FROM categories_category WHERE id = NEW.parent_category_id
+    FOR SHARE;
+
+    -- the new parent is the category itself or one of its descendants
+    IF TG_OP = 'UPDATE' AND starts_with(parent_path, OLD.path) THEN
+        RAISE EXCEPTION 'Category % cannot be moved under its descendant %',
+            NEW.id, NEW.parent_category_id
+            USING ERRCODE = 'check_violation', CONSTRAINT = 'category_parent_not_descendant';
+    END IF;
+
+    NEW.path := parent_path || NEW.id || '.';
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+PREVIOUS_SET_PATH = """
+CREATE OR REPLACE FUNCTION categories_category_set_path() RETURNS trigger AS $$
+BEGIN
+    IF NEW.parent_category_id IS NULL THEN
+        NEW.path := NEW.id || '.';
+    ELSE
+        -- waits for a concurrent move of the parent, then reads its new path
+        SELECT path || NEW.id || '.' INTO NEW.path
+        FROM categories_category WHERE id = NEW.parent_category_id
+        FOR SHARE;
+    END IF;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0007_category_path'),
+    ]
+
+    operations = [
+        migrations.RunSQL(SET_PATH, PREVIOUS_SET_PATH),
+    ]
@@ -0,0 +1,124 @@
+# Generated by Django 4.1.2 on 2026-10-18 09:25
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+# categories cannot be put under a category which is being deleted, they
+# would be deleted with it
+SET_PATH = """
+CREATE OR REPLACE FUNCTION categories_category_set_path() RETURNS trigger AS $$
+DECLARE
+    parent_path text;
+    parent_pending_deletion boolean;
+BEGIN
+    IF NEW.parent_category_id IS NULL THEN
+        NEW.path := NEW.id || '.';
+        RETURN NEW;
+    END IF;
+
+    SELECT path, pending_deletion INTO parent_path, parent_pending_deletion
+    FROM categories_category WHERE id = NEW.parent_category_id
+    FOR SHARE;
+
+    -- the new parent is the category itself or one of its descendants
+    IF TG_OP = 'UPDATE' AND starts_with(parent_path, OLD.path) THEN
+        RAISE EXCEPTION 'Category % cannot be moved under its descendant %',
+            NEW.id, NEW.parent_category_id
+            USING ERRCODE = 'check_violation', CONSTRAINT = 'category_parent_not_descendant';
+    END IF;
+    IF parent_pending_deletion THEN
+        RAISE EXCEPTION 'Category % is being deleted', NEW.parent_category_id
+            USING ERRCODE = 'check_violation', CONSTRAINT = 'category_parent_not_deleted';
+    END IF;
+
+    NEW.path := parent_path || NEW.id || '.';
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+PREVIOUS_SET_PATH = """
+CREATE OR REPLACE FUNCTION categories_category_set_path() RETURNS trigger AS $$
+DECLARE
+    parent_path text;
+BEGIN
+    IF NEW.parent_category_id IS NULL THEN
+        NEW.path := NEW.id || '.';
+        RETURN NEW;
+    END IF;
+
+    SELECT path INTO parent_path
+    FROM categories_category WHERE id = NEW.parent_category_id
+    FOR SHARE;
+
+    -- the new parent is the category itself or one of its descendants
+    IF TG_OP = 'UPDATE' AND starts_with(parent_path, OLD.path) THEN
+        RAISE EXCEPTION 'Category % cannot be moved under its descendant %',
+            NEW.id, NEW.parent_category_id
+            USING ERRCODE = 'check_violation', CONSTRAINT = 'category_parent_not_descendant';
+    END IF;
+
+    NEW.path := parent_path || NEW.id || '.';
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('categories', '0008_category_parent_not_descendant'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryDeletion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category_id', models.BigIntegerField()),
+                ('name', models.CharField(max_length=255)),
+                ('path', models.TextField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('total_links', models.PositiveIntegerField(default=0)),
+                ('total_categories', models.PositiveIntegerField(default=0)),
+                ('deleted_links', models.PositiveIntegerField(default=0)),
+                ('deleted_categories', models.PositiveIntegerField(default=0)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.RemoveConstraint(
+            model_name='category',
+            name='unique_category_name_owner',
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='pending_deletion',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(condition=models.Q(('pending_deletion', True)), fields=['owner'], name='category_pending_deletion_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='category',
+            constraint=models.UniqueConstraint(condition=models.Q(('pending_deletion', False)), fields=('name', 'owner'), name='unique_category_name_owner'),
+        ),
+        migrations.AddField(
+            model_name='categorydeletion',
+            name='owner',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='categorydeletion',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['created_at', 'id'], name='category_deletion_pending_idx'),
+        ),
+        migrations.RunSQL(SET_PATH, PREVIOUS_SET_PATH),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.1.2 on 2026-10-18 09:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0009_category_deletion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='sync_txid',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['owner', 'sync_txid', 'id'], name='category_owner_sync_idx'),
+        ),
+    ]
@@ -1,6 +1,10 @@
+from django.apps import apps
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce, Greatest
 
 
 class AccessLevel(models.IntegerChoices):
@@ -9,6 +13,101 @@ class AccessLevel(models.IntegerChoices):
     READ_ONLY = 300
 
 
+class CategoryQuerySet(models.QuerySet):
+    def with_owner_and_shares(self):
+        """
+        Join the owner and prefetch the accesses with their users, everything
+        `CategorySerializer` renders, so a page costs the same few queries
+        whatever its size.
+        """
+        return self.select_related("owner").prefetch_related(
+            models.Prefetch(
+                "categoryaccess_set",
+                queryset=CategoryAccess.objects.select_related("user").order_by("id"),
+            )
+        )
+
+    def with_activity(self):
+        """
+        Annotate `last_link_added_at`, `subcategory_count` and
+        `last_activity`, the latest of `updated_at` and `last_link_added_at`,
+        with correlated subqueries. Each is an index probe per category, on
+        `link_category_created_idx` and on the `parent_category` index, so
+        ordering by them never sorts the links themselves.
+        """
+        Link = apps.get_model("links", "Link")
+        last_link = (
+            Link.objects.filter(category=OuterRef("pk"))
+            .order_by("-created_at")
+            .values("created_at")[:1]
+        )
+        subcategories = (
+            Category.objects.filter(parent_category=OuterRef("pk"), pending_deletion=False)
+            .order_by()
+            .values("parent_category")
+            .annotate(count=Count("id"))
+            .values("count")
+        )
+        return self.annotate(
+            last_link_added_at=Subquery(last_link),
+            subcategory_count=Coalesce(Subquery(subcategories), Value(0)),
+        ).annotate(
+            # GREATEST skips NULLs on PostgreSQL
+            last_activity=Greatest("updated_at", "last_link_added_at"),
+        )
+
+    def _subtrees(self, roots, params, owner=None):
+        """
+        Categories reachable from the `roots` condition through
+        `subcategories`, at any depth, with one `WITH RECURSIVE` subquery.
+        `UNION` drops rows already seen, so the walk ends even on a cycle.
+        """
+        table = Category._meta.db_table
+        same_owner = "WHERE category.owner_id = %s" if owner is not None else ""
+        sql = f"""
+            WITH RECURSIVE subtree(id) AS (
+                SELECT category.id FROM {table} AS category WHERE {roots}
+                UNION
+                SELECT category.id FROM {table} AS category
+                JOIN subtree ON category.parent_category_id = subtree.id
+                {same_owner}
+            )
+            SELECT id FROM subtree
+        """
+        if owner is not None:
+            params = (*params, owner.pk)
+        return self.filter(id__in=RawSQL(sql, params))
+
+    def descendants_of(self, category_id, include_self=False):
+        """The categories under `category_id`, at any depth"""
+        subtree = self._subtrees("category.id = %s", (category_id,))
+        return subtree if include_self else subtree.exclude(id=category_id)
+
+    def subtree(self, path):
+        """The category with `path` and all the categories under it"""
+        return self.filter(path__startswith=path)
+
+    def tree_of(self, owner, root_id=None):
+        """
+        The categories of `owner` under `root_id` included, or every
+        category of `owner` reachable from their top level categories.
+        """
+        if root_id is not None:
+            return self._subtrees(
+                "category.id = %s AND category.owner_id = %s", (root_id, owner.pk), owner
+            )
+        return self._subtrees(
+            f"""
+            category.owner_id = %s AND NOT EXISTS (
+                SELECT FROM {Category._meta.db_table} AS parent
+                WHERE parent.id = category.parent_category_id AND parent.owner_id = %s
+            )
+            """,
+            (owner.pk, owner.pk),
+            owner,
+        )
+
+
 class Category(models.Model):
     name = models.CharField(max_length=255)
     owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
@@ -29,14 +128,47 @@ class Category(models.Model):
         through_fields=("category", "user"),
         related_name="shared_categories",
     )
+    # maintained by triggers on `links_link`, see links migration 0008
+    link_count = models.PositiveIntegerField(default=0, editable=False)
+    # ids from the top level category down to this one, e.g. "3.8.21.",
+    # maintained by triggers, see migration 0007, so an instance which was
+    # saved or moved must be refreshed to see it
+    path = models.TextField(default="", editable=False)
+    # set on a whole subtree while a `CategoryDeletion` deletes it in the
+    # background, which hides it and frees its names for new categories
+    pending_deletion = models.BooleanField(default=False, editable=False)
+    # id of the transaction which last changed `updated_at`, set by a
+    # trigger, see sync migration 0002
+    sync_txid = models.BigIntegerField(default=0, editable=False)
+
+    objects = CategoryQuerySet.as_manager()
 
     class Meta:
         verbose_name_plural = "categories"
         constraints = [
             models.UniqueConstraint(
-                fields=["name", "owner"], name="unique_category_name_owner"
+                fields=["name", "owner"],
+                condition=models.Q(pending_deletion=False),
+                name="unique_category_name_owner",
             )
         ]
+        indexes = [
+            models.Index(
+                fields=["owner", "-created_at", "-id"], name="category_owner_created_idx"
+            ),
+            models.Index(
+                fields=["owner", "updated_at", "id"], name="category_owner_updated_idx"
+            ),
+            models.Index(fields=["owner", "sync_txid", "id"], name="category_owner_sync_idx"),
+            models.Index(
+                fields=["path"], name="category_path_idx", opclasses=["text_pattern_ops"]
+            ),
+            models.Index(
+                fields=["owner"],
+                name="category_pending_deletion_idx",
+                condition=models.Q(pending_deletion=True),
+            ),
+        ]
 
     def save(self, *args, **kwargs):
         if self.parent_category is not None and self.parent_category.id == self.id:
@@ -73,3 +205,47 @@ class CategoryAccess(models.Model):
                 fields=["category", "user"], name="unique_category_access_through"
             )
         ]
+
+
+class CategoryDeletion(models.Model):
+    """
+    The background deletion of a category and of everything under it, run
+    by the `delete_categories` worker in bounded batches. The subtree is
+    marked `pending_deletion` when the deletion is scheduled, and the counts
+    report the progress of the worker.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending"
+        RUNNING = "running"
+        DONE = "done"
+        FAILED = "failed"
+
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+")
+    # not a foreign key, the category is deleted by the job
+    category_id = models.BigIntegerField()
+    name = models.CharField(max_length=255)
+    path = models.TextField()
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    total_links = models.PositiveIntegerField(default=0)
+    total_categories = models.PositiveIntegerField(default=0)
+    deleted_links = models.PositiveIntegerField(default=0)
+    deleted_categories = models.PositiveIntegerField(default=0)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["created_at", "id"],
+                name="category_deletion_pending_idx",
+                condition=models.Q(status="pending"),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
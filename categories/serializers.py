@@ -1,7 +1,9 @@
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
-from .models import AccessLevel, Category, CategoryAccess
+from links_organizer_api.utils.serializers import SparseFieldsetSerializerMixin
+
+from .models import AccessLevel, Category, CategoryAccess, CategoryDeletion
 
 
 class CategoryAccessSerializer(serializers.ModelSerializer):
@@ -22,12 +24,17 @@ class CategoryAccessSerializer(serializers.ModelSerializer):
         read_only_fields = ("id", "user", "category")
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     owner_username = serializers.ReadOnlyField(source="owner.username")
     owner_avatar = serializers.ReadOnlyField(source="owner.avatar")
     shared_users = CategoryAccessSerializer(
         source="categoryaccess_set", read_only=True, many=True
     )
+    # annotated by `CategoryQuerySet.with_activity`, left out of the
+    # categories which were not, such as a category just created
+    last_link_added_at = serializers.DateTimeField(read_only=True, allow_null=True)
+    subcategory_count = serializers.IntegerField(read_only=True)
+    last_activity = serializers.DateTimeField(read_only=True, allow_null=True)
 
     class Meta:
         model = Category
@@ -40,8 +47,100 @@ class CategorySerializer(serializers.ModelSerializer):
             "owner_username",
             "owner_avatar",
             "shared_users",
+            "link_count",
+            "last_link_added_at",
+            "subcategory_count",
+            "last_activity",
             "created_at",
             "updated_at",
             "parent_category",
         )
-        read_only_fields = ("id", "created_at", "updated_at", "owner")
+        read_only_fields = ("id", "link_count", "created_at", "updated_at", "owner")
+
+    def update(self, instance, validated_data):
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        # only the edited fields are written, `link_count` and
+        # `pending_deletion` may have changed since the instance was read
+        instance.save(update_fields=(*validated_data, "updated_at"))
+        return instance
+
+
+class CategoryCloneResultSerializer(CategorySerializer):
+    copied_links = serializers.IntegerField(read_only=True)
+    skipped_links = serializers.IntegerField(
+        read_only=True, help_text="Links not copied because the user already saved their url"
+    )
+
+    class Meta(CategorySerializer.Meta):
+        fields = (*CategorySerializer.Meta.fields, "copied_links", "skipped_links")
+
+
+class CategoryTreeQuerySerializer(serializers.Serializer):
+    root = serializers.IntegerField(
+        required=False, help_text="Only return the subtree of this category"
+    )
+    link_counts = serializers.BooleanField(
+        default=False, help_text="Add the link counts of each category and of its subtree"
+    )
+
+
+class CategoryDeleteQuerySerializer(serializers.Serializer):
+    background = serializers.BooleanField(
+        default=False,
+        help_text="Hide the category now and delete it with everything under it in the background",
+    )
+
+
+class CategoryDeletionSerializer(serializers.ModelSerializer):
+    progress = serializers.SerializerMethodField()
+
+    class Meta:
+        model = CategoryDeletion
+        fields = (
+            "id",
+            "category_id",
+            "name",
+            "status",
+            "total_links",
+            "total_categories",
+            "deleted_links",
+            "deleted_categories",
+            "progress",
+            "last_error",
+            "created_at",
+            "updated_at",
+            "finished_at",
+        )
+        read_only_fields = fields
+
+    def get_progress(self, deletion) -> float:
+        """The share of the rows deleted so far, from 0 to 1"""
+        if deletion.status == CategoryDeletion.Status.DONE:
+            return 1.0
+        total = deletion.total_links + deletion.total_categories
+        deleted = deletion.deleted_links + deletion.deleted_categories
+        return min(deleted / total, 1.0) if total else 0.0
+
+
+class CategoryCloneSerializer(serializers.Serializer):
+    name = serializers.CharField(
+        max_length=255,
+        required=False,
+        help_text="Name of the copy, by default the name of the category, suffixed when in use",
+    )
+    parent_category = serializers.PrimaryKeyRelatedField(
+        queryset=Category.objects.none(),
+        required=False,
+        allow_null=True,
+        help_text="Category of the user to put the copy under, by default at the top level",
+    )
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get("request")
+        if request is not None:
+            fields["parent_category"].queryset = Category.objects.filter(
+                owner=request.user, pending_deletion=False
+            )
+        return fields
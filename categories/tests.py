@@ -1,16 +1,30 @@
+import io
 import json
+from datetime import timedelta
+import threading
+import time
+from unittest.mock import patch
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.management import call_command
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.utils.dateparse import parse_datetime
 from rest_framework.test import APIRequestFactory, force_authenticate
 
 from accounts.models import User
-from categories.models import AccessLevel, Category, CategoryAccess
+from categories.deletion import claim_deletion, run_deletion
+from categories.models import AccessLevel, Category, CategoryAccess, CategoryDeletion
+from links.models import Link, LinkMetadataJob
 from categories.views import (
     CategoryAccessViewSet,
+    CategoryDeletionViewSet,
     CategoryViewSet,
     SharedCategoryViewSet,
 )
+from invitations.models import CategoryInvitation
+from links.views import LinksViewSet
+from tags.models import Tag, TagUsage
 
 User: User = get_user_model()
 
@@ -114,6 +128,72 @@ class CategoryListApiTests(TestCase):
         self.assertEqual(response.data["results"][1]["id"], self.category2.id)
         self.assertEqual(response.data["results"][2]["id"], self.category1.id)
 
+    def test_get_categories_list_queries(self):
+        for number in range(3):
+            user = User.objects.create_user(
+                username=f"friend{number}", password="test", email=f"friend{number}@test.com"
+            )
+            for category in (self.category1, self.category2, self.category3):
+                CategoryAccess.objects.create(user=user, category=category, level=AccessLevel.READ_ONLY)
+
+        request = self.factory.get("/api/categories/", format="json")
+        force_authenticate(request, user=self.user)
+        # count, page with owners, accesses with their users
+        with self.assertNumQueries(3):
+            response = CategoryViewSet.as_view({"get":"list"})(request)
+
+        self.assertEqual(len(response.data["results"][0]["shared_users"]), 3)
+        self.assertEqual(response.data["results"][0]["shared_users"][2]["username"], "friend2")
+
+    def test_get_categories_list_activity(self):
+        child1 = Category.objects.create(name="Child1", owner=self.user, parent_category=self.category1)
+        child2 = Category.objects.create(name="Child2", owner=self.user, parent_category=self.category1)
+        link = Link.objects.create(url="https://example.com", category=self.category2, owner=self.user)
+        Category.objects.filter(id=self.category3.id).update(updated_at=link.created_at - timedelta(days=1))
+
+        request = self.factory.get("/api/categories/", {"ordering": "-last_activity"})
+        force_authenticate(request, user=self.user)
+        with self.assertNumQueries(3):
+            response = CategoryViewSet.as_view({"get":"list"})(request)
+
+        results = {category["id"]: category for category in response.data["results"]}
+        self.assertEqual(
+            [category["id"] for category in response.data["results"]],
+            [self.category2.id, child2.id, child1.id, self.category1.id, self.category3.id],
+        )
+        self.assertEqual(results[self.category1.id]["subcategory_count"], 2)
+        self.assertIsNone(results[self.category1.id]["last_link_added_at"])
+        self.assertEqual(results[self.category2.id]["link_count"], 1)
+        self.assertEqual(parse_datetime(results[self.category2.id]["last_link_added_at"]), link.created_at)
+        self.assertEqual(results[self.category2.id]["last_activity"], results[self.category2.id]["last_link_added_at"])
+
+    def test_get_categories_list_fields(self):
+        request = self.factory.get("/api/categories/", {"fields": "id,name"})
+        force_authenticate(request, user=self.user)
+        response = CategoryViewSet.as_view({"get":"list"})(request)
+
+        self.assertEqual(response.data["results"][0], {"id": self.category3.id, "name": "Category3"})
+
+    def test_get_categories_list_omit(self):
+        request = self.factory.get("/api/categories/", {"omit": "shared_users,description"})
+        force_authenticate(request, user=self.user)
+        response = CategoryViewSet.as_view({"get":"list"})(request)
+
+        self.assertNotIn("shared_users", response.data["results"][0])
+        self.assertNotIn("description", response.data["results"][0])
+        self.assertEqual(response.data["results"][0]["owner_username"], "test")
+
+    def test_get_categories_list_link_count(self):
+        Link.objects.create(url="https://example1.com", category=self.category1, owner=self.user)
+        Link.objects.create(url="https://example2.com", category=self.category1, owner=self.user)
+
+        request = self.factory.get("/api/categories/", {"fields": "id,link_count"})
+        force_authenticate(request, user=self.user)
+        response = CategoryViewSet.as_view({"get":"list"})(request)
+
+        self.assertEqual(response.data["results"][2], {"id": self.category1.id, "link_count": 2})
+        self.assertEqual(response.data["results"][0]["link_count"], 0)
+
     def test_get_categories_list_limit(self):
         request = self.factory.get(f"/api/categories/?limit=2", format="json")
         force_authenticate(request, user=self.user)
@@ -245,6 +325,27 @@ class CategoryDetailApiTests(TestCase):
         self.assertEqual(response.data["owner_avatar"], self.category1.owner.avatar)
         self.assertEqual(response.data["shared_users"], [])
 
+    def test_update_does_not_overwrite_concurrent_changes(self):
+        get_object = CategoryViewSet.get_object
+
+        def get_object_then_change(view):
+            category = get_object(view)
+            # a link added and a deletion scheduled while the update runs
+            Link.objects.create(url="https://example.com/1", category=self.category1, owner=self.user)
+            Category.objects.filter(id=self.category1.id).update(pending_deletion=True)
+            return category
+
+        request = self.factory.patch(f"/api/categories/{self.category1.id}/", {"description": "updated"}, format="json")
+        force_authenticate(request, user=self.user)
+        with patch.object(CategoryViewSet, "get_object", get_object_then_change):
+            response = CategoryViewSet.as_view({"patch":"partial_update"})(request, pk=self.category1.id)
+
+        self.assertEqual(response.status_code, 200)
+        self.category1.refresh_from_db()
+        self.assertEqual(self.category1.description, "updated")
+        self.assertEqual(self.category1.link_count, 1)
+        self.assertTrue(self.category1.pending_deletion)
+
     def test_make_category_as_parent_of_itself(self):
         updated_data = {
             "parent_category": self.category1.id
@@ -407,3 +508,504 @@ class SharedCategoryAPiTests(TestCase):
         self.assertEqual(len(response.data["results"]), 2)
         self.assertEqual(response.data["results"][0]["id"], self.category1.id )
         self.assertEqual(response.data["results"][1]["id"], self.category2.id )
+
+    def test_get_shared_categories_activity(self):
+        Category.objects.create(name="Child", owner=self.user1, parent_category=self.category1)
+        link = Link.objects.create(url="https://example.com", category=self.category1, owner=self.user1)
+        request = self.factory.get("/api/shared_categories/",format="json")
+        force_authenticate(request, user=self.user2)
+
+        response = SharedCategoryViewSet.as_view({"get":"list"})(request)
+
+        self.assertEqual(response.data["results"][0]["subcategory_count"], 1)
+        self.assertEqual(parse_datetime(response.data["results"][0]["last_link_added_at"]), link.created_at)
+        self.assertEqual(response.data["results"][1]["subcategory_count"], 0)
+
+    def test_get_shared_categories_queries(self):
+        user3 = User.objects.create_user(username="test3", password="test3", email="test3@test.com")
+        CategoryAccess.objects.create(user=user3, category=self.category1, level=AccessLevel.READ_WRITE)
+        CategoryAccess.objects.create(user=user3, category=self.category2, level=AccessLevel.READ_WRITE)
+        request = self.factory.get("/api/shared_categories/",format="json")
+        force_authenticate(request, user=self.user2)
+
+        with self.assertNumQueries(3):
+            response = SharedCategoryViewSet.as_view({"get":"list"})(request)
+
+        self.assertEqual(response.data["results"][0]["owner_username"], "test")
+        self.assertEqual(
+            [access["username"] for access in response.data["results"][0]["shared_users"]],
+            ["test2", "test3"],
+        )
+
+
+class CategoryTreeApiTests(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(
+            username= "test",
+            password="test",
+            email="test@test.com",
+            first_name="test"
+        )
+        self.user2 = User.objects.create_user(
+            username= "test2",
+            password="test2",
+            email="test2@test.com",
+            first_name="test2"
+        )
+        self.work = Category.objects.create(name="Work", owner=self.user)
+        self.projects = Category.objects.create(name="Projects", owner=self.user, parent_category=self.work)
+        self.api = Category.objects.create(name="Api", owner=self.user, parent_category=self.projects)
+        self.docs = Category.objects.create(name="Docs", owner=self.user, parent_category=self.work)
+        self.home = Category.objects.create(name="Home", owner=self.user)
+        self.other = Category.objects.create(name="Other", owner=self.user2, parent_category=self.work)
+
+        Link.objects.create(url="https://example1.com", category=self.api, owner=self.user)
+        Link.objects.create(url="https://example2.com", category=self.api, owner=self.user)
+        Link.objects.create(url="https://example3.com", category=self.work, owner=self.user)
+
+    def get_tree(self, params=None):
+        request = self.factory.get("/api/categories/tree/", params)
+        force_authenticate(request, user=self.user)
+        return CategoryViewSet.as_view({"get": "tree"})(request)
+
+    def names(self, nodes):
+        return [(node["name"], self.names(node["children"])) for node in nodes]
+
+    def test_get_tree(self):
+        with self.assertNumQueries(1):
+            response = self.get_tree()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            self.names(response.data),
+            [("Home", []), ("Work", [("Docs", []), ("Projects", [("Api", [])])])],
+        )
+        self.assertNotIn("link_count", response.data[0])
+
+    def test_get_tree_with_link_counts(self):
+        response = self.get_tree({"link_counts": "true"})
+
+        work = response.data[1]
+        self.assertEqual((work["link_count"], work["total_link_count"]), (1, 3))
+        self.assertEqual(work["children"][1]["total_link_count"], 2)
+
+    def test_get_subtree(self):
+        response = self.get_tree({"root": self.projects.id})
+
+        self.assertEqual(self.names(response.data), [("Projects", [("Api", [])])])
+        self.assertEqual(response.data[0]["parent_category"], self.work.id)
+
+    def test_get_subtree_of_different_user(self):
+        self.assertEqual(self.get_tree({"root": self.other.id}).status_code, 404)
+
+    def test_descendants_of(self):
+        request = self.factory.get("/api/categories/", {"descendants_of": self.work.id})
+        force_authenticate(request, user=self.user)
+        response = CategoryViewSet.as_view({"get": "list"})(request)
+
+        self.assertEqual(
+            {category["id"] for category in response.data["results"]},
+            {self.projects.id, self.api.id, self.docs.id},
+        )
+
+    def test_descendants_of_invalid(self):
+        request = self.factory.get("/api/categories/", {"descendants_of": "work"})
+        force_authenticate(request, user=self.user)
+        response = CategoryViewSet.as_view({"get": "list"})(request)
+
+        self.assertEqual(response.status_code, 400)
+
+
+class CategoryPathTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username= "test",
+            password="test",
+            email="test@test.com",
+            first_name="test"
+        )
+        self.work = Category.objects.create(name="Work", owner=self.user)
+        self.projects = Category.objects.create(name="Projects", owner=self.user, parent_category=self.work)
+        self.api = Category.objects.create(name="Api", owner=self.user, parent_category=self.projects)
+        self.home = Category.objects.create(name="Home", owner=self.user)
+
+    def paths(self):
+        return dict(Category.objects.values_list("name", "path"))
+
+    def test_paths(self):
+        w, p, a, h = self.work.id, self.projects.id, self.api.id, self.home.id
+        self.assertEqual(
+            self.paths(),
+            {"Work": f"{w}.", "Projects": f"{w}.{p}.", "Api": f"{w}.{p}.{a}.", "Home": f"{h}."},
+        )
+
+    def test_move_subtree(self):
+        self.projects.refresh_from_db()
+        self.projects.parent_category = self.home
+        # the subtree is re-pathed by a trigger of the same statement
+        with self.assertNumQueries(1):
+            self.projects.save()
+
+        p, a, h = self.projects.id, self.api.id, self.home.id
+        self.assertEqual(self.paths()["Projects"], f"{h}.{p}.")
+        self.assertEqual(self.paths()["Api"], f"{h}.{p}.{a}.")
+
+        Category.objects.filter(id=self.projects.id).update(parent_category=None)
+        self.assertEqual(self.paths()["Api"], f"{p}.{a}.")
+
+    def test_subtree(self):
+        self.work.refresh_from_db()
+
+        self.assertEqual(
+            set(Category.objects.subtree(self.work.path)),
+            {self.work, self.projects, self.api},
+        )
+
+
+class CategoryCycleTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username= "test",
+            password="test",
+            email="test@test.com",
+            first_name="test"
+        )
+        cls.chain = [Category.objects.create(name="Level 0", owner=cls.user)]
+        for depth in range(1, 300):
+            cls.chain.append(
+                Category.objects.create(
+                    name=f"Level {depth}", owner=cls.user, parent_category=cls.chain[-1]
+                )
+            )
+        cls.other = Category.objects.create(name="Other", owner=cls.user)
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+
+    def move(self, category, parent):
+        request = self.factory.patch(
+            f"/api/categories/{category.id}/", {"parent_category": parent.id}, format="json"
+        )
+        force_authenticate(request, user=self.user)
+        return CategoryViewSet.as_view({"patch": "partial_update"})(request, pk=category.id)
+
+    def test_move_under_descendant(self):
+        root, leaf = self.chain[0], self.chain[-1]
+        root.refresh_from_db()
+        root.parent_category = leaf
+        # the check is a prefix test of the parent's path, whatever the depth
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            with self.assertNumQueries(1):
+                root.save()
+
+        root.refresh_from_db()
+        self.assertIsNone(root.parent_category)
+
+    def test_move_deep_chain(self):
+        root, leaf = self.chain[0], self.chain[-1]
+        root.refresh_from_db()
+        root.parent_category = self.other
+        with self.assertNumQueries(1):
+            root.save()
+
+        leaf.refresh_from_db()
+        self.assertTrue(leaf.path.startswith(f"{self.other.id}.{root.id}."))
+
+    def test_api_two_category_cycle(self):
+        first, second = self.chain[-2], self.chain[-1]
+
+        response = self.move(first, second)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("parent_category", response.data)
+        first.refresh_from_db()
+        self.assertEqual(first.parent_category, self.chain[-3])
+
+    def test_api_move(self):
+        response = self.move(self.other, self.chain[-1])
+
+        self.assertEqual(response.status_code, 200)
+        self.other.refresh_from_db()
+        self.chain[-1].refresh_from_db()
+        self.assertEqual(self.other.path, f"{self.chain[-1].path}{self.other.id}.")
+
+
+class CategoryConcurrentMoveTests(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username= "test",
+            password="test",
+            email="test@test.com",
+            first_name="test"
+        )
+        self.first = Category.objects.create(name="First", owner=self.user)
+        self.second = Category.objects.create(name="Second", owner=self.user)
+
+    def wait_for_lock(self):
+        for _ in range(100):
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT count(*) FROM pg_locks WHERE NOT granted")
+                if cursor.fetchone()[0]:
+                    return
+            time.sleep(0.05)
+        self.fail("The concurrent move did not wait")
+
+    def test_crossed_moves(self):
+        errors = []
+
+        def move_second_under_first():
+            try:
+                Category.objects.filter(id=self.second.id).update(parent_category=self.first)
+            except IntegrityError as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        with transaction.atomic():
+            Category.objects.filter(id=self.first.id).update(parent_category=self.second)
+            thread = threading.Thread(target=move_second_under_first)
+            thread.start()
+            # the other move waits for this one, then sees the new path
+            self.wait_for_lock()
+        thread.join()
+
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(errors[0].__cause__.diag.constraint_name, "category_parent_not_descendant")
+        self.first.refresh_from_db()
+        self.second.refresh_from_db()
+        self.assertEqual(self.first.parent_category, self.second)
+        self.assertIsNone(self.second.parent_category)
+        self.assertEqual(self.first.path, f"{self.second.id}.{self.first.id}.")
+
+
+class CategoryBackgroundDeletionTests(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user1 = User.objects.create_user(
+            username= "test",
+            password="test",
+            email="test@test.com",
+            first_name="test"
+        )
+        self.user2 = User.objects.create_user(
+            username= "test2",
+            password="test2",
+            email="test2@test.com",
+            first_name="test2"
+        )
+        self.work = Category.objects.create(name="Work", owner=self.user1)
+        self.projects = Category.objects.create(name="Projects", owner=self.user1, parent_category=self.work)
+        self.api = Category.objects.create(name="Api", owner=self.user1, parent_category=self.projects)
+        self.home = Category.objects.create(name="Home", owner=self.user1)
+        self.tag = Tag.objects.create(name="django")
+        for number, category in enumerate([self.work, self.projects, self.api, self.api, self.api, self.home]):
+            link = Link.objects.create(url=f"https://example{number}.com", category=category, owner=self.user1)
+            link.tags.add(self.tag)
+        CategoryAccess.objects.create(user=self.user2, category=self.projects, level=AccessLevel.READ_WRITE)
+        CategoryInvitation.objects.create(sender=self.user1, receiver=self.user2, category=self.api, note="api")
+
+    def delete(self, category, user=None):
+        request = self.factory.delete(f"/api/categories/{category.id}/?background=true")
+        force_authenticate(request, user=user or self.user1)
+        return CategoryViewSet.as_view({"delete": "destroy"})(request, pk=category.id)
+
+    def list(self, view, user=None, actions=None):
+        request = self.factory.get("/api/")
+        force_authenticate(request, user=user or self.user1)
+        return view.as_view(actions or {"get": "list"})(request)
+
+    def test_schedule(self):
+        response = self.delete(self.work)
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data["status"], "pending")
+        self.assertEqual(response.data["total_categories"], 3)
+        self.assertEqual(response.data["total_links"], 5)
+        self.assertEqual(response.data["progress"], 0)
+        # hidden at once, deleted later
+        self.assertEqual(Category.objects.count(), 4)
+        self.assertEqual(
+            [category["id"] for category in self.list(CategoryViewSet).data["results"]],
+            [self.home.id],
+        )
+        self.assertEqual(len(self.list(CategoryViewSet, actions={"get": "tree"}).data), 1)
+        self.assertEqual(self.list(LinksViewSet).data["count"], 1)
+        self.assertEqual(self.list(SharedCategoryViewSet, user=self.user2).data["count"], 0)
+        self.assertEqual(self.delete(self.work).status_code, 404)
+
+    def test_name_reused(self):
+        self.delete(self.work)
+
+        request = self.factory.post("/api/categories/", {"name": "Work"}, format="json")
+        force_authenticate(request, user=self.user1)
+        response = CategoryViewSet.as_view({"post": "create"})(request)
+
+        self.assertEqual(response.status_code, 201)
+
+    def test_move_under_deleted(self):
+        self.delete(self.work)
+
+        request = self.factory.patch(
+            f"/api/categories/{self.home.id}/", {"parent_category": self.api.id}, format="json"
+        )
+        force_authenticate(request, user=self.user1)
+        response = CategoryViewSet.as_view({"patch": "partial_update"})(request, pk=self.home.id)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("parent_category", response.data)
+
+    def test_run_deletion(self):
+        self.delete(self.work)
+
+        deletion = claim_deletion()
+        self.assertEqual(deletion.status, CategoryDeletion.Status.RUNNING)
+        self.assertIsNone(claim_deletion())
+        deletion = run_deletion(deletion, batch_size=2)
+
+        self.assertEqual(deletion.status, CategoryDeletion.Status.DONE)
+        self.assertEqual((deletion.deleted_links, deletion.deleted_categories), (5, 3))
+        self.assertEqual(list(Category.objects.all()), [self.home])
+        self.assertEqual(Link.objects.count(), 1)
+        self.assertFalse(CategoryAccess.objects.exists())
+        self.assertFalse(CategoryInvitation.objects.exists())
+        self.assertEqual(TagUsage.objects.get(owner=self.user1, tag=self.tag).link_count, 1)
+
+        response = self.list(CategoryDeletionViewSet)
+        self.assertEqual(response.data["results"][0]["progress"], 1)
+        self.assertEqual(self.list(CategoryDeletionViewSet, user=self.user2).data["count"], 0)
+
+    def test_run_deletion_failure(self):
+        self.delete(self.work)
+        deletion = claim_deletion()
+
+        with patch("categories.deletion.delete_categories_batch", side_effect=DatabaseError("boom")):
+            with self.assertRaises(DatabaseError):
+                run_deletion(deletion, batch_size=10)
+
+        deletion.refresh_from_db()
+        self.assertEqual(deletion.status, CategoryDeletion.Status.PENDING)
+        self.assertEqual(deletion.deleted_links, 5)
+        self.assertEqual(deletion.last_error, "boom")
+        self.assertEqual(run_deletion(claim_deletion()).status, CategoryDeletion.Status.DONE)
+
+    def test_command(self):
+        self.delete(self.work)
+        self.delete(self.home)
+        out = io.StringIO()
+
+        # runs every pending deletion, then exits instead of waiting for more
+        call_command("delete_categories", "--once", stdout=out)
+
+        self.assertEqual(len(out.getvalue().splitlines()), 2)
+        self.assertFalse(Category.objects.exists())
+        self.assertFalse(Link.objects.exists())
+
+
+class CategoryCloneApiTests(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user1 = User.objects.create_user(
+            username= "test",
+            password="test",
+            email="test@test.com",
+            first_name="test"
+        )
+        self.user2 = User.objects.create_user(
+            username= "test2",
+            password="test2",
+            email="test2@test.com",
+            first_name="test2"
+        )
+        self.template = Category.objects.create(name="Template", description="weekly", owner=self.user1)
+        self.week1 = Category.objects.create(name="Week1", owner=self.user1, parent_category=self.template)
+        self.day1 = Category.objects.create(name="Day1", owner=self.user1, parent_category=self.week1)
+        self.week2 = Category.objects.create(name="Week2", owner=self.user1, parent_category=self.template)
+        self.tag1 = Tag.objects.create(name="react")
+        self.tag2 = Tag.objects.create(name="django")
+        for number, category in enumerate([self.template, self.week1, self.day1, self.day1, self.week2]):
+            link = Link.objects.create(
+                url=f"https://example{number}.com", title=f"Example {number}", category=category, owner=self.user1
+            )
+            link.tags.add(self.tag1, self.tag2)
+        # enriched, except the last link
+        LinkMetadataJob.objects.exclude(link__url="https://example4.com").delete()
+
+        for category in (self.template, self.week1, self.day1):
+            CategoryAccess.objects.create(user=self.user2, category=category, level=AccessLevel.READ_ONLY)
+        self.home = Category.objects.create(name="Template", owner=self.user2)
+        Link.objects.create(url="https://example3.com", category=self.home, owner=self.user2)
+
+    def clone(self, category, data=None, user=None):
+        request = self.factory.post(f"/api/categories/{category.id}/clone/", data or {}, format="json")
+        force_authenticate(request, user=user or self.user2)
+        return CategoryViewSet.as_view({"post": "clone"})(request, pk=category.id)
+
+    def test_clone_shared(self):
+        # the statements only grow with the depth of the subtree
+        with self.assertNumQueries(13):
+            response = self.clone(self.template)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["name"], "Template (copy)")
+        self.assertEqual(response.data["description"], "weekly")
+        self.assertEqual(response.data["owner"], self.user2.id)
+        self.assertEqual(response.data["subcategory_count"], 1)
+        self.assertEqual((response.data["copied_links"], response.data["skipped_links"]), (3, 1))
+
+        template = Category.objects.get(id=response.data["id"])
+        week1 = template.subcategories.get()
+        day1 = week1.subcategories.get()
+        # week2 is not shared with the user
+        self.assertEqual((week1.name, day1.name), ("Week1", "Day1"))
+        self.assertEqual(day1.path, f"{template.id}.{week1.id}.{day1.id}.")
+        self.assertEqual((template.link_count, week1.link_count, day1.link_count), (1, 1, 1))
+
+        # the url the user already saved is skipped
+        copies = Link.objects.filter(category__in=[template, week1, day1]).order_by("url")
+        self.assertEqual(
+            [(link.url, link.title) for link in copies],
+            [
+                ("https://example0.com", "Example 0"),
+                ("https://example1.com", "Example 1"),
+                ("https://example2.com", "Example 2"),
+            ],
+        )
+        self.assertTrue(all(link.owner_id == self.user2.id for link in copies))
+        self.assertEqual(set(copies[0].tags.all()), {self.tag1, self.tag2})
+        self.assertEqual(TagUsage.objects.get(owner=self.user2, tag=self.tag1).link_count, 3)
+        self.assertFalse(LinkMetadataJob.objects.filter(link__in=copies).exists())
+
+    def test_clone_into_parent(self):
+        response = self.clone(self.week2, {"name": "Archive", "parent_category": self.home.id})
+
+        self.assertEqual(response.status_code, 404)
+
+        response = self.clone(self.week1, {"name": "Archive", "parent_category": self.home.id})
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["name"], "Archive")
+        self.assertEqual(response.data["parent_category"], self.home.id)
+        self.assertEqual(Category.objects.get(name="Day1", owner=self.user2).parent_category.name, "Archive")
+
+    def test_clone_own(self):
+        response = self.clone(self.week2, user=self.user1)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["name"], "Week2 (copy)")
+        # the user already saved every url
+        self.assertEqual(response.data["link_count"], 0)
+        self.assertEqual((response.data["copied_links"], response.data["skipped_links"]), (0, 1))
+
+    def test_clone_name_in_use(self):
+        response = self.clone(self.template, {"name": "Template"})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Category.objects.filter(owner=self.user2).count(), 1)
+
+    def test_clone_parent_of_other_user(self):
+        response = self.clone(self.template, {"parent_category": self.week2.id})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("parent_category", response.data)
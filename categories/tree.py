@@ -0,0 +1,42 @@
+TREE_FIELDS = ("id", "name", "description", "background_url", "parent_category_id")
+
+
+def build_tree(categories, link_counts=False):
+    """
+    Nest flat `categories` under their parents, in the given order, and
+    return the top level nodes: those whose parent is not in `categories`.
+
+    With `link_counts`, each node has the `link_count` of the category and
+    the `total_link_count` of its whole subtree.
+    """
+    nodes = {}
+    for category in categories:
+        node = {
+            "id": category.id,
+            "name": category.name,
+            "description": category.description,
+            "background_url": category.background_url,
+            "parent_category": category.parent_category_id,
+            "children": [],
+        }
+        if link_counts:
+            node["link_count"] = node["total_link_count"] = category.link_count
+        nodes[category.id] = node
+
+    roots = []
+    for node in nodes.values():
+        parent = nodes.get(node["parent_category"])
+        (parent["children"] if parent else roots).append(node)
+
+    if link_counts:
+        # children before parents, without recursing on deep trees
+        stack, order = list(roots), []
+        while stack:
+            node = stack.pop()
+            order.append(node)
+            stack.extend(node["children"])
+        for node in reversed(order):
+            parent = nodes.get(node["parent_category"])
+            if parent:
+                parent["total_link_count"] += node["total_link_count"]
+    return roots
@@ -2,36 +2,157 @@ from django.db import IntegrityError
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import mixins, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.exceptions import PermissionDenied, ValidationError
-from rest_framework.generics import ListCreateAPIView, RetrieveUpdateDestroyAPIView
+from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
+from rest_framework.generics import (
+    ListCreateAPIView,
+    RetrieveUpdateDestroyAPIView,
+    get_object_or_404,
+)
 from rest_framework.request import Request
 from rest_framework.response import Response
 
-from links_organizer_api.utils.mixins import GetSerializerClassMixin
+from links_organizer_api.utils.mixins import (
+    ConstraintErrorsMixin,
+    GetSerializerClassMixin,
+    SparseFieldsetMixin,
+)
+from links_organizer_api.utils.paginations import LimitOffsetOrKeysetPagination
 from links_organizer_api.utils.serializers import EmptySerializer
 
-from .models import Category, CategoryAccess
-from .serializers import CategoryAccessSerializer, CategorySerializer
-
-
-class CategoryViewSet(viewsets.ModelViewSet, GetSerializerClassMixin):
+from .cloning import clone_subtree, visible_categories
+from .deletion import schedule_deletion
+from .models import Category, CategoryAccess, CategoryDeletion
+from .serializers import (
+    CategoryAccessSerializer,
+    CategoryCloneResultSerializer,
+    CategoryCloneSerializer,
+    CategoryDeleteQuerySerializer,
+    CategoryDeletionSerializer,
+    CategorySerializer,
+    CategoryTreeQuerySerializer,
+)
+from .tree import TREE_FIELDS, build_tree
+
+
+class CategoryViewSet(
+    SparseFieldsetMixin, ConstraintErrorsMixin, viewsets.ModelViewSet, GetSerializerClassMixin
+):
     serializer_class = CategorySerializer
+    constraint_errors = {
+        "unique_category_name_owner": {"name": ["Category already exists"]},
+        "category_parent_not_descendant": {
+            "parent_category": ["Category cannot be moved under one of its subcategories."]
+        },
+        "category_parent_not_deleted": {"parent_category": ["Category does not exist."]},
+        # named by Django, for a parent deleted while the category is saved
+        "categories_category_parent_category_id_766ad864_fk_categorie": {
+            "parent_category": ["Category does not exist."]
+        },
+    }
+    pagination_class = LimitOffsetOrKeysetPagination
     ordering = "-created_at"
     filter_fields = ("parent_category",)
     search_fields = ("name", "description")
-    ordering_fields = ("created_at", "updated_at", "name")
+    ordering_fields = ("created_at", "updated_at", "name", "last_activity")
 
     def get_queryset(self):
         if getattr(self, "swagger_fake_view", False):
             return Category.objects.none()
 
-        return Category.objects.filter(owner=self.request.user).prefetch_related("shared_users")
-
-    def perform_create(self, serializer):
+        categories = (
+            Category.objects.filter(owner=self.request.user, pending_deletion=False)
+            .with_owner_and_shares()
+            .with_activity()
+        )
+        descendants_of = self.request.query_params.get("descendants_of")
+        if descendants_of:
+            try:
+                categories = categories.descendants_of(int(descendants_of))
+            except ValueError:
+                raise ValidationError({"descendants_of": ["Expected a category id."]})
+        return categories
+
+    @swagger_auto_schema(
+        query_serializer=CategoryDeleteQuerySerializer,
+        responses={204: "", 202: CategoryDeletionSerializer},
+    )
+    def destroy(self, request, *args, **kwargs):
+        """
+        Delete the category with its subcategories and their links, or with
+        `?background=true` hide them at once and delete them in batches in
+        the background, see `/category_deletions/` for the progress.
+        """
+        serializer = CategoryDeleteQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        if not serializer.validated_data["background"]:
+            return super().destroy(request, *args, **kwargs)
+
+        deletion = schedule_deletion(self.get_object())
+        if deletion is None:
+            raise NotFound()
+        return Response(CategoryDeletionSerializer(deletion).data, status=status.HTTP_202_ACCEPTED)
+
+    @swagger_auto_schema(
+        operation_summary="Copy a category with its subcategories, links and tags",
+        request_body=CategoryCloneSerializer,
+        responses={201: CategoryCloneResultSerializer, 400: "Bad request", 404: "Not found"},
+    )
+    @action(detail=True, methods=["post"])
+    def clone(self, request, pk=None):
+        """
+        Copy a category owned by or shared with the user, with the
+        subcategories they can see, into the categories of the user. Names
+        in use get a " (copy)" suffix and links whose url the user already
+        saved are skipped, so a copy of their own category has no links. The
+        numbers of links copied and skipped are returned with the copy.
+        """
+        root = get_object_or_404(visible_categories(request.user), pk=pk)
+        serializer = CategoryCloneSerializer(
+            data=request.data, context=self.get_serializer_context()
+        )
+        serializer.is_valid(raise_exception=True)
         try:
-            serializer.save(owner=self.request.user)
+            copy, copied, skipped = clone_subtree(
+                root,
+                request.user,
+                parent=serializer.validated_data.get("parent_category"),
+                name=serializer.validated_data.get("name"),
+            )
         except IntegrityError:
             raise ValidationError({"name": ["Category already exists"]})
+        copy = self.get_queryset().get(pk=copy.pk)
+        copy.copied_links, copy.skipped_links = copied, skipped
+        return Response(
+            CategoryCloneResultSerializer(copy, context=self.get_serializer_context()).data,
+            status=status.HTTP_201_CREATED,
+        )
+
+    @swagger_auto_schema(
+        operation_summary="The categories of the user as a nested tree",
+        query_serializer=CategoryTreeQuerySerializer,
+        responses={200: "Top level categories, each with its nested `children`"},
+    )
+    @action(detail=False, methods=["get"], pagination_class=None)
+    def tree(self, request):
+        """
+        The whole hierarchy of the user in one `WITH RECURSIVE` query,
+        siblings ordered by name.
+        """
+        serializer = CategoryTreeQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        root = serializer.validated_data.get("root")
+        link_counts = serializer.validated_data["link_counts"]
+
+        categories = (
+            Category.objects.tree_of(request.user, root)
+            .filter(pending_deletion=False)
+            .order_by("name", "id")
+            .only(*TREE_FIELDS, *(("link_count",) if link_counts else ()))
+        )
+        tree = build_tree(categories, link_counts=link_counts)
+        if root is not None and not tree:
+            raise NotFound()
+        return Response(tree)
 
 
 class CategoryAccessViewSet(
@@ -45,7 +166,7 @@ class CategoryAccessViewSet(
         if getattr(self, "swagger_fake_view", False):
             return CategoryAccess.objects.none()
 
-        return CategoryAccess.objects.all()
+        return CategoryAccess.objects.filter(category__pending_deletion=False)
 
     def check_object_permissions(self, request, obj):
         if obj.category.owner != request.user:
@@ -53,6 +174,7 @@ class CategoryAccessViewSet(
 
 
 class SharedCategoryViewSet(
+    SparseFieldsetMixin,
     mixins.ListModelMixin,
     viewsets.GenericViewSet
     ):
@@ -71,5 +193,28 @@ class SharedCategoryViewSet(
         # return shared_categories
 
 
-        return Category.objects.filter(shared_users__id=self.request.user.id)
+        # ordered, so that pages do not depend on the plan of the joins
+        return (
+            Category.objects.filter(shared_users__id=self.request.user.id, pending_deletion=False)
+            .with_owner_and_shares()
+            .with_activity()
+            .order_by("id")
+        )
+
+
+class CategoryDeletionViewSet(
+    mixins.ListModelMixin,
+    mixins.RetrieveModelMixin,
+    viewsets.GenericViewSet
+):
+    """The background deletions of categories of the user, with their progress"""
+
+    serializer_class = CategoryDeletionSerializer
+
+    def get_queryset(self):
+        if getattr(self, "swagger_fake_view", False):
+            return CategoryDeletion.objects.none()
 
+        return CategoryDeletion.objects.filter(owner=self.request.user).order_by(
+            "-created_at", "-id"
+        )
@@ -1,11 +1,11 @@
 from django.contrib import admin
 from djangoql.admin import DjangoQLSearchMixin
 
-from .models import Link
+from .models import Link, LinkMetadataJob
 
 
 class LinkAdmin(DjangoQLSearchMixin, admin.ModelAdmin):
-    readonly_fields = ('id', 'created_at', 'updated_at')
+    readonly_fields = ('id', 'title', 'canonical_url', 'favicon_url', 'created_at', 'updated_at')
     list_display = ('url', 'description', 'owner', 'category', 'created_at', 'updated_at')
     list_display_links = list_display
     list_filter = ('category', 'created_at', 'updated_at')
@@ -20,10 +20,18 @@ class LinkAdmin(DjangoQLSearchMixin, admin.ModelAdmin):
         ),
         (
             'Metadata', {
-                'fields': ('created_at', 'updated_at')
+                'fields': ('title', 'canonical_url', 'favicon_url', 'created_at', 'updated_at')
             }
         )
     )
 
 
+class LinkMetadataJobAdmin(admin.ModelAdmin):
+    list_display = ('link', 'status', 'attempts', 'run_after', 'locked_at')
+    list_filter = ('status',)
+    raw_id_fields = ('link',)
+    ordering = ('run_after',)
+
+
 admin.site.register(Link, LinkAdmin)
+admin.site.register(LinkMetadataJob, LinkMetadataJobAdmin)
@@ -0,0 +1,209 @@
+import asyncio
+import ssl
+import time
+from typing import NamedTuple
+from urllib.parse import urljoin
+
+from django.utils import timezone
+
+from .http import (
+    MAX_REDIRECTS,
+    REDIRECT_STATUSES,
+    Connection,
+    FetchError,
+    RequestSlots,
+    split_url,
+)
+from .models import Link, is_broken
+
+# servers which do not implement HEAD properly
+HEAD_NOT_SUPPORTED_STATUSES = {405, 501}
+
+
+class CheckResult(NamedTuple):
+    link_id: int
+    # None when the server could not be reached
+    status_code: int = None
+
+
+class HostPool:
+    """
+    The idle keep-alive connections to one host, and `delay` seconds between
+    the start of two requests to it.
+    """
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.next_request_at = 0
+        self.idle = []
+
+    async def wait_turn(self):
+        now = time.monotonic()
+        start = max(now, self.next_request_at)
+        self.next_request_at = start + self.delay
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    def close(self):
+        while self.idle:
+            self.idle.pop().close()
+
+
+class LinkChecker:
+    """
+    Checks urls with `HEAD` requests, falling back to `GET` for servers which
+    do not support it, and follows redirects to get the final status.
+
+    Requests share an event loop and keep-alive connections per host across
+    calls to `check_all`, so run every batch on the same loop, see
+    `check_links`.
+    """
+
+    def __init__(self, concurrency=50, per_host=2, delay=0.5, timeout=10):
+        self.slots = RequestSlots(concurrency, per_host)
+        self.delay = delay
+        self.timeout = timeout
+        self.ssl_context = ssl.create_default_context()
+        self.hosts = {}
+
+    async def check_all(self, links):
+        """Check `(link id, url)` pairs, returning a `CheckResult` for each"""
+        return await asyncio.gather(*(self.check(link_id, url) for link_id, url in links))
+
+    async def check(self, link_id, url):
+        try:
+            parts = split_url(url)
+            key = (parts.scheme, parts.hostname, parts.port)
+            if key not in self.hosts:
+                self.hosts[key] = HostPool(self.delay)
+            host = self.hosts[key]
+            async with self.slots.take(key):
+                await host.wait_turn()
+                status = await asyncio.wait_for(self.request(host, parts), self.timeout)
+        except (asyncio.TimeoutError, FetchError, OSError, UnicodeError):
+            return CheckResult(link_id)
+        return CheckResult(link_id, status)
+
+    async def request(self, host, parts):
+        status, headers = await self.head(host, parts)
+        for _ in range(MAX_REDIRECTS):
+            if status not in REDIRECT_STATUSES or not headers.get("location"):
+                return status
+            parts = split_url(urljoin(parts.geturl(), headers["location"]))
+            # redirects are followed on one-off connections: waiting for a
+            # slot of another host while holding one of this host could
+            # deadlock two hosts redirecting to each other
+            status, headers = await self.one_off(parts)
+        raise FetchError("Too many redirects")
+
+    async def head(self, host, parts):
+        """`HEAD` through a pooled connection, retried once if it went stale"""
+        for reused in (True, False):
+            connection = host.idle.pop() if reused and host.idle else None
+            if connection is None:
+                reused = False
+                connection = await Connection.open(parts, self.ssl_context)
+            try:
+                status, headers = await connection.request("HEAD", parts)
+            except ConnectionError:
+                connection.close()
+                if reused:
+                    continue
+                raise
+            except BaseException:
+                connection.close()
+                raise
+
+            if connection.reusable:
+                host.idle.append(connection)
+            else:
+                connection.close()
+
+            if status in HEAD_NOT_SUPPORTED_STATUSES:
+                return await self.one_off(parts)
+            return status, headers
+
+    async def one_off(self, parts):
+        connection = await Connection.open(parts, self.ssl_context)
+        try:
+            return await connection.request("GET", parts, keep_alive=False)
+        finally:
+            connection.close()
+
+    def close(self):
+        for host in self.hosts.values():
+            host.close()
+        self.hosts = {}
+
+
+def check_links(links, checker, batch_size=500):
+    """
+    Check `links` in batches and save their status, yielding progress after
+    each batch.
+
+    Rows are streamed with a server side cursor, and every batch is checked
+    on the same event loop so keep-alive connections are reused across
+    batches, then saved with one `bulk_update`.
+    """
+    stats = {"checked": 0, "ok": 0, "broken": 0}
+    loop = asyncio.new_event_loop()
+
+    def check_batch(batch):
+        results = loop.run_until_complete(
+            checker.check_all([(link_id, url) for link_id, url, _ in batch])
+        )
+        save_results(results, {link_id: previous for link_id, _, previous in batch}, stats)
+
+    try:
+        rows = (
+            links.order_by("id")
+            .values_list("id", "url", "status_code", "last_checked_at")
+            .iterator(chunk_size=batch_size)
+        )
+        batch = []
+        for link_id, url, status_code, last_checked_at in rows:
+            batch.append((link_id, url, (status_code, last_checked_at is not None)))
+            if len(batch) >= batch_size:
+                check_batch(batch)
+                batch = []
+                yield dict(stats)
+        if batch:
+            check_batch(batch)
+            yield dict(stats)
+    finally:
+        checker.close()
+        loop.run_until_complete(asyncio.sleep(0))
+        loop.close()
+
+
+def save_results(results, previous, stats):
+    """
+    Save `results`, `previous` maps each link id to its `(status code,
+    checked before)`. Only the links checked for the first time or whose
+    status changed have `updated_at` bumped, so that syncing clients get
+    their status without every check making the whole library changed.
+    """
+    now = timezone.now()
+    changed = [
+        result for result in results if previous[result.link_id] != (result.status_code, True)
+    ]
+    Link.objects.bulk_update(
+        (
+            Link(
+                id=result.link_id,
+                status_code=result.status_code,
+                last_checked_at=now,
+                updated_at=now,
+            )
+            for result in changed
+        ),
+        ("status_code", "last_checked_at", "updated_at"),
+    )
+    changed_ids = {result.link_id for result in changed}
+    Link.objects.filter(
+        id__in=[result.link_id for result in results if result.link_id not in changed_ids]
+    ).update(last_checked_at=now)
+    broken = sum(1 for result in results if is_broken(result.status_code))
+    stats["checked"] += len(results)
+    stats["broken"] += broken
+    stats["ok"] += len(results) - broken
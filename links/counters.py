@@ -0,0 +1,64 @@
+from django.db import connection, transaction
+
+from categories.models import Category
+from tags.models import TagUsage
+
+from .models import Link
+
+# `Category.link_count` and `TagUsage` rows are kept up to date by triggers on
+# `links_link` and `links_link_tags`, see migration 0008. These queries
+# recompute them from scratch, for when they drifted anyway, e.g. after rows
+# were changed with the triggers disabled.
+
+REBUILD_CATEGORY_LINK_COUNTS = f"""
+    UPDATE {Category._meta.db_table} AS category
+    SET link_count = counts.link_count
+    FROM (
+        SELECT category.id, count(link.id) AS link_count
+        FROM {Category._meta.db_table} AS category
+        LEFT JOIN {Link._meta.db_table} AS link ON link.category_id = category.id
+        GROUP BY category.id
+    ) AS counts
+    WHERE category.id = counts.id AND category.link_count <> counts.link_count
+"""
+
+REBUILD_TAG_USAGE = f"""
+    WITH counts AS (
+        SELECT link.owner_id, link_tag.tag_id, count(*) AS link_count
+        FROM {Link.tags.through._meta.db_table} AS link_tag
+        JOIN {Link._meta.db_table} AS link ON link.id = link_tag.link_id
+        GROUP BY link.owner_id, link_tag.tag_id
+    ), deleted AS (
+        DELETE FROM {TagUsage._meta.db_table} AS tag_usage
+        WHERE NOT EXISTS (
+            SELECT FROM counts
+            WHERE counts.owner_id = tag_usage.owner_id AND counts.tag_id = tag_usage.tag_id
+        )
+        RETURNING 1
+    ), upserted AS (
+        INSERT INTO {TagUsage._meta.db_table} AS tag_usage (owner_id, tag_id, link_count)
+        SELECT owner_id, tag_id, link_count FROM counts
+        ON CONFLICT (owner_id, tag_id) DO UPDATE SET link_count = EXCLUDED.link_count
+        WHERE tag_usage.link_count <> EXCLUDED.link_count
+        RETURNING 1
+    )
+    SELECT (SELECT count(*) FROM deleted) + (SELECT count(*) FROM upserted)
+"""
+
+
+def rebuild_counters():
+    """
+    Recompute every link counter with one set based statement per counter.
+    Returns how many categories and tag usages were fixed.
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        # the triggers must not change the counters while they are recomputed
+        cursor.execute(
+            f"LOCK TABLE {Link._meta.db_table}, {Link.tags.through._meta.db_table} "
+            "IN SHARE MODE"
+        )
+        cursor.execute(REBUILD_CATEGORY_LINK_COUNTS)
+        categories = cursor.rowcount
+        cursor.execute(REBUILD_TAG_USAGE)
+        tag_usages = cursor.fetchone()[0]
+    return {"categories": categories, "tag_usages": tag_usages}
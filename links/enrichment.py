@@ -0,0 +1,230 @@
+import asyncio
+import ssl
+from datetime import timedelta
+from html.parser import HTMLParser
+from typing import NamedTuple
+from urllib.parse import urljoin, urlsplit
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .http import FetchError, RequestSlots, http_get
+from .models import Link, LinkMetadataJob
+
+TITLE_MAX_LENGTH = Link._meta.get_field("title").max_length
+METADATA_URL_MAX_LENGTH = Link._meta.get_field("canonical_url").max_length
+
+
+class Metadata(NamedTuple):
+    title: str = ""
+    canonical_url: str = ""
+    favicon_url: str = ""
+
+
+class MetadataParser(HTMLParser):
+    """
+    Collects the `<title>`, the canonical url and the favicon from the `<head>`
+    of a page, ignoring everything once the `<body>` starts.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = None
+        self.og_title = None
+        self.canonical_url = None
+        self.favicon_url = None
+        self.text = None
+        self.done = False
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+        attrs = {name: (value or "").strip() for name, value in attrs}
+        if tag == "title" and self.title is None:
+            self.text = []
+        elif tag == "meta" and attrs.get("property") == "og:title":
+            self.og_title = self.og_title or attrs.get("content")
+        elif tag == "link" and attrs.get("href"):
+            rel = set(attrs.get("rel", "").lower().split())
+            if "canonical" in rel:
+                self.canonical_url = self.canonical_url or attrs["href"]
+            elif "icon" in rel:
+                self.favicon_url = self.favicon_url or attrs["href"]
+        elif tag == "body":
+            self.done = True
+
+    def handle_endtag(self, tag):
+        if tag == "title" and self.text is not None:
+            self.title = " ".join("".join(self.text).split())
+            self.text = None
+        elif tag == "head":
+            self.done = True
+
+    def handle_data(self, data):
+        if self.text is not None:
+            self.text.append(data)
+
+
+def absolute_url(base, href):
+    """`href` resolved against `base`, or "" unless it is a usable http(s) url"""
+    if not href:
+        return ""
+    url = urljoin(base, href)
+    if urlsplit(url).scheme not in ("http", "https") or len(url) > METADATA_URL_MAX_LENGTH:
+        return ""
+    return url
+
+
+def parse_metadata(url, html):
+    parser = MetadataParser()
+    parser.feed(html)
+    parser.close()
+    return Metadata(
+        title=(parser.title or parser.og_title or "")[:TITLE_MAX_LENGTH],
+        canonical_url=absolute_url(url, parser.canonical_url),
+        favicon_url=absolute_url(url, parser.favicon_url or "/favicon.ico"),
+    )
+
+
+class MetadataFetcher:
+    """
+    Fetches the metadata of many urls concurrently, with at most `concurrency`
+    requests in flight overall, `per_host` per host, and `timeout` seconds for
+    each url including its redirects.
+    """
+
+    def __init__(self, concurrency=20, per_host=2, timeout=10):
+        self.slots = RequestSlots(concurrency, per_host)
+        self.timeout = timeout
+        self.ssl_context = ssl.create_default_context()
+
+    async def fetch(self, url):
+        async with self.slots.take(urlsplit(url).hostname):
+            try:
+                final_url, html = await asyncio.wait_for(
+                    http_get(url, self.ssl_context), self.timeout
+                )
+            except asyncio.TimeoutError:
+                raise FetchError(f"Timed out after {self.timeout}s")
+            except (OSError, UnicodeError) as error:
+                raise FetchError(str(error) or error.__class__.__name__)
+        return parse_metadata(final_url, html)
+
+    async def fetch_all(self, urls):
+        """Returns a `Metadata` or the exception raised for each url, in order"""
+        return await asyncio.gather(*(self.fetch(url) for url in urls), return_exceptions=True)
+
+
+class ClaimedJob(NamedTuple):
+    id: int
+    link_id: int
+    url: str
+    attempts: int
+    locked_at: object
+
+
+def claim_jobs(batch_size, lease=timedelta(minutes=5)):
+    """
+    Mark up to `batch_size` due jobs as running and return them.
+
+    Rows are locked with `FOR UPDATE SKIP LOCKED`, so concurrent workers
+    never claim the same job and never wait on each other. Jobs left running
+    for longer than `lease` by a worker which died are made pending again.
+    """
+    table = LinkMetadataJob._meta.db_table
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE {table} SET status = 'pending', locked_at = NULL
+            WHERE status = 'running' AND locked_at <= now() - %s
+            """,
+            [lease],
+        )
+        cursor.execute(
+            f"""
+            UPDATE {table} AS job
+            SET status = 'running', locked_at = now(), attempts = job.attempts + 1
+            FROM {Link._meta.db_table} AS link
+            WHERE link.id = job.link_id AND job.id IN (
+                SELECT id FROM {table}
+                WHERE status = 'pending' AND run_after <= now()
+                ORDER BY run_after, id
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING job.id, job.link_id, link.url, job.attempts, job.locked_at
+            """,
+            [batch_size],
+        )
+        return [ClaimedJob(*row) for row in cursor.fetchall()]
+
+
+def finish_jobs(jobs, results, max_attempts=3, retry_delay=timedelta(minutes=1)):
+    """
+    Save the metadata of the jobs which succeeded and delete them. Failed
+    jobs are retried with an exponential backoff, up to `max_attempts`.
+
+    Jobs which are no longer held by this claim, because the url of the link
+    changed in the meantime, are left alone.
+    """
+    stats = {"enriched": 0, "retried": 0, "failed": 0}
+    with transaction.atomic():
+        held = set(
+            LinkMetadataJob.objects.select_for_update()
+            .filter(
+                id__in=[job.id for job in jobs],
+                status=LinkMetadataJob.Status.RUNNING,
+                locked_at__in={job.locked_at for job in jobs},
+            )
+            .values_list("id", "locked_at")
+        )
+
+        links, done, failed = [], [], []
+        now = timezone.now()
+        for job, result in zip(jobs, results):
+            if (job.id, job.locked_at) not in held:
+                continue
+            if isinstance(result, Metadata):
+                links.append(Link(id=job.link_id, updated_at=now, **result._asdict()))
+                done.append(job.id)
+                continue
+
+            if job.attempts >= max_attempts:
+                status = LinkMetadataJob.Status.FAILED
+                stats["failed"] += 1
+            else:
+                status = LinkMetadataJob.Status.PENDING
+                stats["retried"] += 1
+            failed.append(
+                LinkMetadataJob(
+                    id=job.id,
+                    status=status,
+                    run_after=now + retry_delay * 2 ** (job.attempts - 1),
+                    locked_at=None,
+                    last_error=str(result)[:1000],
+                )
+            )
+
+        # `updated_at` is bumped so that syncing clients get the metadata
+        Link.objects.bulk_update(links, (*Metadata._fields, "updated_at"))
+        LinkMetadataJob.objects.filter(id__in=done).delete()
+        LinkMetadataJob.objects.bulk_update(
+            failed, ("status", "run_after", "locked_at", "last_error")
+        )
+        stats["enriched"] = len(done)
+    return stats
+
+
+def enrich_pending(fetcher, batch_size=100, max_attempts=3):
+    """
+    Claim a batch of jobs, fetch their metadata concurrently and save it.
+
+    Database work stays synchronous on the calling thread, only the fetches
+    run in an event loop. Returns counts of what happened to the batch.
+    """
+    jobs = claim_jobs(batch_size)
+    if not jobs:
+        return {"claimed": 0, "enriched": 0, "retried": 0, "failed": 0}
+
+    results = asyncio.run(fetcher.fetch_all([job.url for job in jobs]))
+    return {"claimed": len(jobs), **finish_jobs(jobs, results, max_attempts=max_attempts)}
@@ -0,0 +1,98 @@
+import csv
+import json
+import zlib
+
+from django.contrib.postgres.expressions import ArraySubquery
+from django.db.models import OuterRef
+
+from tags.models import Tag
+
+CHUNK_SIZE = 2000
+FIELDS = ("id", "url", "description", "category", "tags", "created_at", "updated_at")
+CONTENT_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def export_rows(links):
+    """
+    Yield one dict per link with its category and tag names.
+
+    Rows are read through a server side cursor and tag names come from a
+    correlated `ARRAY(SELECT ...)` subquery, so memory stays flat however
+    many links are exported.
+    """
+    tag_names = ArraySubquery(
+        Tag.objects.filter(link=OuterRef("pk")).order_by("name").values("name")
+    )
+    rows = (
+        links.select_related(None)
+        .prefetch_related(None)
+        .annotate(tag_names=tag_names)
+        .order_by("id")
+        .values_list(
+            "id", "url", "description", "category__name", "tag_names", "created_at", "updated_at"
+        )
+    )
+    for row in rows.iterator(chunk_size=CHUNK_SIZE):
+        yield dict(zip(FIELDS, row))
+
+
+def render_ndjson(rows):
+    for row in rows:
+        yield json.dumps(
+            {
+                **row,
+                "created_at": row["created_at"].isoformat(),
+                "updated_at": row["updated_at"].isoformat(),
+            }
+        ) + "\n"
+
+
+class Echo:
+    """A file-like object which returns what is written to it"""
+
+    def write(self, value):
+        return value
+
+
+def render_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(FIELDS)
+    for row in rows:
+        yield writer.writerow(
+            (
+                row["id"],
+                row["url"],
+                row["description"],
+                row["category"],
+                ",".join(row["tags"]),
+                row["created_at"].isoformat(),
+                row["updated_at"].isoformat(),
+            )
+        )
+
+
+RENDERERS = {
+    "ndjson": render_ndjson,
+    "csv": render_csv,
+}
+
+
+def gzip_stream(chunks, buffer_size=64 * 1024):
+    """Gzip compress a stream of strings on the fly"""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    buffer = []
+    size = 0
+    for chunk in chunks:
+        buffer.append(chunk.encode("utf-8"))
+        size += len(buffer[-1])
+        if size >= buffer_size:
+            compressed = compressor.compress(b"".join(buffer))
+            buffer, size = [], 0
+            if compressed:
+                yield compressed
+    compressed = compressor.compress(b"".join(buffer)) + compressor.flush()
+    if compressed:
+        yield compressed
@@ -0,0 +1,80 @@
+from django.contrib.postgres.search import SearchHeadline, SearchRank
+from django.db.models import F
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+from rest_framework.settings import api_settings
+
+from .models import search_query
+
+
+class FullTextSearchFilter(BaseFilterBackend):
+    """
+    Full text search over `Link.search_vector` with `?q=`.
+
+    Matches are annotated with `search_rank` (`ts_rank`) and a highlighted
+    `search_snippet` of the description, and are ordered by rank unless the
+    request asks for an explicit `?ordering=`.
+    """
+
+    search_param = "q"
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, "").strip()
+        if not text:
+            return queryset
+
+        query = search_query(text)
+        queryset = queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F("search_vector"), query),
+            search_snippet=SearchHeadline(
+                "description",
+                query,
+                config="english",
+                start_sel="<mark>",
+                stop_sel="</mark>",
+                max_fragments=2,
+            ),
+        )
+
+        if request.query_params.get(api_settings.ORDERING_PARAM):
+            return queryset
+        return queryset.order_by("-search_rank", "-id")
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.search_param,
+                "required": False,
+                "in": "query",
+                "description": "Full text search over url and description.",
+                "schema": {"type": "string"},
+            },
+        ]
+
+
+class LinkOrderingFilter(OrderingFilter):
+    """
+    `OrderingFilter` which sorts links that were never visited, whose
+    `last_visited_at` is null, as the oldest, and breaks ties by id so that
+    pages stay stable among the many links with the same number of visits.
+    Both match the visit indexes of `Link`.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        ordering = self.get_ordering(request, queryset, view)
+        if not ordering:
+            return queryset
+
+        terms = []
+        for term in ordering:
+            descending = term.startswith("-")
+            name = term.lstrip("-")
+            if queryset.model._meta.get_field(name).null:
+                field = F(name)
+                terms.append(
+                    field.desc(nulls_last=True) if descending else field.asc(nulls_first=True)
+                )
+            else:
+                terms.append(term)
+        if not any(term in ("id", "-id", "pk", "-pk") for term in ordering):
+            terms.append("-id" if ordering[-1].startswith("-") else "id")
+        return queryset.order_by(*terms)
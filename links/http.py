@@ -0,0 +1,217 @@
+import asyncio
+import contextlib
+import ipaddress
+import socket
+import ssl
+from collections import defaultdict
+from urllib.parse import quote, urljoin, urlsplit
+
+from django.conf import settings
+
+USER_AGENT = "links-organizer-api/1.0 (+link fetcher)"
+MAX_BODY_SIZE = 256 * 1024
+MAX_REDIRECTS = 5
+REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+
+
+class FetchError(Exception):
+    pass
+
+
+def parse_head(head):
+    status_line, *lines = head.decode("latin-1").split("\r\n")
+    try:
+        status = int(status_line.split()[1])
+    except (IndexError, ValueError):
+        raise FetchError(f"Invalid status line {status_line!r}")
+
+    headers = {}
+    for line in lines:
+        name, sep, value = line.partition(":")
+        if sep:
+            headers[name.strip().lower()] = value.strip()
+    return status, headers
+
+
+def charset(headers):
+    for param in headers.get("content-type", "").split(";")[1:]:
+        name, _, value = param.partition("=")
+        if name.strip().lower() == "charset":
+            return value.strip().strip('"') or "utf-8"
+    return "utf-8"
+
+
+def is_allowed_address(address):
+    """
+    Whether `address` is public, or in `LINK_FETCH_ALLOWED_NETWORKS`: urls
+    of users must not reach private, loopback, link-local or reserved
+    addresses, such as the cloud metadata endpoint 169.254.169.254.
+    """
+    ip = ipaddress.ip_address(address)
+    if ip.version == 6 and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    for network in settings.LINK_FETCH_ALLOWED_NETWORKS:
+        if ip in ipaddress.ip_network(network):
+            return True
+    return ip.is_global and not ip.is_multicast
+
+
+async def resolve(host, port):
+    """
+    An address of `host` to connect to, once every address it resolves to
+    is allowed, so that a name with a private address among public ones is
+    rejected as well.
+    """
+    infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    addresses = [info[4][0] for info in infos]
+    for address in addresses:
+        if not is_allowed_address(address):
+            raise FetchError(f"{host} resolves to the blocked address {address}")
+    if not addresses:
+        raise FetchError(f"{host} could not be resolved")
+    return addresses[0]
+
+
+def split_url(url):
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise FetchError(f"Unsupported url {url}")
+    return parts
+
+
+class RequestSlots:
+    """
+    Limits requests to `concurrency` in flight overall and `per_host` in
+    flight to each host.
+
+    Semaphores are bound to the event loop they are used on, so they are
+    made again whenever the slots are used on another loop.
+    """
+
+    def __init__(self, concurrency, per_host):
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.loop = None
+
+    @contextlib.asynccontextmanager
+    async def take(self, host):
+        loop = asyncio.get_running_loop()
+        if loop is not self.loop:
+            self.loop = loop
+            self.overall = asyncio.Semaphore(self.concurrency)
+            self.hosts = defaultdict(lambda: asyncio.Semaphore(self.per_host))
+        # the host slot is taken first, so that requests queued behind a
+        # busy host do not hold slots other hosts could use
+        async with self.hosts[host], self.overall:
+            yield
+
+
+class Connection:
+    """
+    A HTTP connection over asyncio streams.
+
+    The host is resolved and vetted with `resolve` when the connection is
+    opened, and the connection is made to the vetted address, so a second
+    lookup cannot return another one. Redirects open a new connection, so
+    every hop is vetted.
+
+    Keep-alive requests are sent as HTTP/1.1 and the connection can be reused
+    after a `HEAD`, which has no body, while `reusable` is true. Other requests
+    are sent as HTTP/1.0 so that the body is never chunked.
+    """
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.reusable = True
+
+    @classmethod
+    async def open(cls, parts, ssl_context=None):
+        secure = parts.scheme == "https"
+        port = parts.port or (443 if secure else 80)
+        reader, writer = await asyncio.open_connection(
+            await resolve(parts.hostname, port),
+            port,
+            ssl=(ssl_context or ssl.create_default_context()) if secure else None,
+            server_hostname=parts.hostname if secure else None,
+        )
+        return cls(reader, writer)
+
+    async def request(self, method, parts, keep_alive=True):
+        """Send a request and return `(status, headers)` once the head is read"""
+        target = quote(parts.path or "/", safe="/%:@!$&'()*+,;=~")
+        if parts.query:
+            target += "?" + quote(parts.query, safe="/%:@!$&'()*+,;=~?")
+        host = parts.hostname.encode("idna").decode("ascii")
+        if parts.port:
+            host += f":{parts.port}"
+
+        self.writer.write(
+            (
+                f"{method} {target} HTTP/{'1.1' if keep_alive else '1.0'}\r\n"
+                f"Host: {host}\r\n"
+                f"User-Agent: {USER_AGENT}\r\n"
+                "Accept: text/html,application/xhtml+xml;q=0.9,*/*;q=0.8\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+            ).encode("ascii")
+        )
+        await self.writer.drain()
+
+        try:
+            head = await self.reader.readuntil(b"\r\n\r\n")
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError) as error:
+            self.reusable = False
+            if isinstance(error, asyncio.IncompleteReadError) and not error.partial:
+                raise ConnectionResetError("Connection closed by the server")
+            raise FetchError("Invalid response")
+
+        status, headers = parse_head(head)
+        self.reusable = (
+            keep_alive
+            and method == "HEAD"
+            and head.startswith(b"HTTP/1.1")
+            and headers.get("connection", "").lower() != "close"
+        )
+        return status, headers
+
+    async def read_body(self, max_size=MAX_BODY_SIZE, until=None):
+        """Read up to `max_size` bytes of the body, or until `until` is seen"""
+        self.reusable = False
+        body = b""
+        while len(body) < max_size and not (until and until in body.lower()):
+            chunk = await self.reader.read(max_size - len(body))
+            if not chunk:
+                break
+            body += chunk
+        return body
+
+    def close(self):
+        self.reusable = False
+        self.writer.close()
+
+
+async def http_get(url, ssl_context=None, max_size=MAX_BODY_SIZE):
+    """
+    GET `url` following redirects, reading the start of the body only, which
+    is where the `<head>` is. Returns `(final url, html)`.
+    """
+    for _ in range(MAX_REDIRECTS + 1):
+        parts = split_url(url)
+        connection = await Connection.open(parts, ssl_context)
+        try:
+            status, headers = await connection.request("GET", parts, keep_alive=False)
+            if status in REDIRECT_STATUSES and headers.get("location"):
+                url = urljoin(url, headers["location"])
+                continue
+            if status >= 400:
+                raise FetchError(f"HTTP {status}")
+            body = await connection.read_body(max_size, until=b"</head>")
+        finally:
+            connection.close()
+
+        try:
+            return url, body.decode(charset(headers), errors="replace")
+        except LookupError:
+            return url, body.decode("utf-8", errors="replace")
+
+    raise FetchError("Too many redirects")
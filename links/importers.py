@@ -0,0 +1,369 @@
+import io
+import json
+import re
+from html.parser import HTMLParser
+from typing import NamedTuple
+
+from django.core.exceptions import ValidationError
+from django.core.validators import URLValidator
+from django.db import transaction
+
+from categories.cloning import copy_name, original_name
+from categories.models import Category
+from links_organizer_api.utils.primitives import url_hash
+from tags.models import Tag
+
+from .models import Link
+
+CHUNK_SIZE = 64 * 1024
+DEFAULT_CATEGORY_NAME = "Imported"
+
+TAG_NAME_MAX_LENGTH = Tag._meta.get_field("name").max_length
+CATEGORY_NAME_MAX_LENGTH = Category._meta.get_field("name").max_length
+URL_MAX_LENGTH = Link._meta.get_field("url").max_length
+DESCRIPTION_MAX_LENGTH = Link._meta.get_field("description").max_length
+
+
+class Bookmark(NamedTuple):
+    line: int
+    url: str
+    description: str = ""
+    folders: tuple = ()
+    tags: tuple = ()
+
+
+class NetscapeBookmarkParser(HTMLParser):
+    """
+    Incremental parser for the Netscape bookmark file format exported by
+    browsers. Feed it chunks and drain `bookmarks` as they are completed.
+
+    Folders (`<H3>`) open a nested `<DL>`, bookmarks are `<A HREF>` inside a
+    `<DT>` optionally followed by a `<DD>` description.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.bookmarks = []
+        self.folders = []
+        self.pending_folder = None
+        self.current = None
+        self.text = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ("dt", "dl"):
+            self.flush()
+
+        if tag == "h3":
+            self.text = []
+        elif tag == "dl":
+            self.folders.append(self.pending_folder)
+            self.pending_folder = None
+        elif tag == "a":
+            attrs = dict(attrs)
+            self.current = {
+                "line": self.getpos()[0],
+                "url": (attrs.get("href") or "").strip(),
+                "tags": tuple(filter(None, (attrs.get("tags") or "").split(","))),
+                "title": "",
+                "description": "",
+            }
+            self.text = []
+        elif tag == "dd" and self.current is not None:
+            self.text = []
+
+    def handle_endtag(self, tag):
+        if tag == "h3" and self.text is not None:
+            self.pending_folder = "".join(self.text).strip()
+            self.text = None
+        elif tag == "a" and self.current is not None and self.text is not None:
+            self.current["title"] = "".join(self.text).strip()
+            self.text = None
+        elif tag == "dl":
+            self.flush()
+            if self.folders:
+                self.folders.pop()
+
+    def handle_data(self, data):
+        if self.text is not None:
+            self.text.append(data)
+
+    def flush(self):
+        if self.current is None:
+            return
+        if self.text is not None:
+            # text collected after the anchor belongs to the <DD>
+            self.current["description"] = "".join(self.text).strip()
+            self.text = None
+
+        self.bookmarks.append(
+            Bookmark(
+                line=self.current["line"],
+                url=self.current["url"],
+                description=self.current["description"] or self.current["title"],
+                folders=tuple(folder for folder in self.folders if folder),
+                tags=self.current["tags"],
+            )
+        )
+        self.current = None
+
+    def close(self):
+        super().close()
+        self.flush()
+
+
+def text_stream(file):
+    if isinstance(file, io.TextIOBase):
+        return file
+    return io.TextIOWrapper(file, encoding="utf-8", errors="replace")
+
+
+def parse_netscape_html(file):
+    """Yield `Bookmark`s from a Netscape bookmark html file, chunk by chunk"""
+    parser = NetscapeBookmarkParser()
+    stream = text_stream(file)
+    while True:
+        chunk = stream.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        parser.feed(chunk)
+        yield from parser.bookmarks
+        parser.bookmarks.clear()
+    parser.close()
+    yield from parser.bookmarks
+
+
+def parse_json_lines(file):
+    """
+    Yield `Bookmark`s from a JSON Lines file, one object per line:
+    `{"url": ..., "description": ..., "category": "a/b" | ["a", "b"], "tags": [...]}`
+
+    Lines which cannot be parsed, or whose category or tags are neither a
+    string nor a list, are yielded as a `Bookmark` without a url so that the
+    importer reports them as errors.
+    """
+    for line_number, line in enumerate(text_stream(file), start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError
+        except ValueError:
+            yield Bookmark(line=line_number, url="")
+            continue
+
+        folders = record.get("category") or ()
+        tags = record.get("tags") or ()
+        if not isinstance(folders, (str, list, tuple)) or not isinstance(tags, (str, list, tuple)):
+            yield Bookmark(line=line_number, url="")
+            continue
+        if isinstance(folders, str):
+            folders = folders.split("/")
+        if isinstance(tags, str):
+            tags = tags.split(",")
+
+        yield Bookmark(
+            line=line_number,
+            url=str(record.get("url") or "").strip(),
+            description=str(record.get("description") or record.get("title") or ""),
+            folders=tuple(str(folder).strip() for folder in folders if str(folder).strip()),
+            tags=tuple(str(tag) for tag in tags),
+        )
+
+
+PARSERS = {
+    "html": parse_netscape_html,
+    "jsonl": parse_json_lines,
+}
+
+
+def detect_format(filename):
+    name = (filename or "").lower()
+    if name.endswith((".html", ".htm")):
+        return "html"
+    if name.endswith((".jsonl", ".ndjson", ".json")):
+        return "jsonl"
+    return None
+
+
+def normalize_tag_name(name):
+    name = re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+    return name[:TAG_NAME_MAX_LENGTH].strip("-")
+
+
+class BookmarkImporter:
+    """
+    Imports `Bookmark`s for `owner` in batches.
+
+    Each batch runs in its own transaction: missing categories are created
+    from the folder path, tags are created with one conflict-ignoring
+    `bulk_create`, links with another one which skips urls already saved by
+    the owner (`unique_link_url_hash_owner`), and the `links_link_tags` rows
+    with a third. `run` yields progress and per-row error events as it goes.
+    """
+
+    batch_size = 500
+
+    def __init__(self, owner, category=None, batch_size=None):
+        self.owner = owner
+        self.default_category = category
+        self.batch_size = batch_size or self.batch_size
+        self.categories = None
+        self.category_names = None
+        self.tags = {}
+        self.url_validator = URLValidator()
+        self.stats = {"processed": 0, "created": 0, "duplicates": 0, "errors": 0}
+
+    def run(self, bookmarks):
+        batch = []
+        for bookmark in bookmarks:
+            batch.append(bookmark)
+            if len(batch) >= self.batch_size:
+                yield from self.import_batch(batch)
+                batch = []
+        if batch:
+            yield from self.import_batch(batch)
+
+        yield {"event": "done", **self.stats}
+
+    def import_batch(self, batch):
+        errors = []
+        valid = {}
+        for bookmark in batch:
+            error = self.validate(bookmark)
+            if error:
+                errors.append(
+                    {"event": "error", "line": bookmark.line, "url": bookmark.url, "detail": error}
+                )
+                continue
+            hash_ = url_hash(bookmark.url)
+            if hash_ in valid:
+                self.stats["duplicates"] += 1
+            else:
+                valid[hash_] = bookmark
+
+        with transaction.atomic():
+            created = self.save_links(valid)
+
+        self.stats["processed"] += len(batch)
+        self.stats["created"] += created
+        self.stats["duplicates"] += len(valid) - created
+        self.stats["errors"] += len(errors)
+
+        yield from errors
+        yield {"event": "progress", **self.stats}
+
+    def validate(self, bookmark):
+        if not bookmark.url:
+            return "Invalid record."
+        if len(bookmark.url) > URL_MAX_LENGTH:
+            return f"URL is longer than {URL_MAX_LENGTH} characters."
+        try:
+            self.url_validator(bookmark.url)
+        except ValidationError:
+            return "Enter a valid URL."
+        return None
+
+    def save_links(self, bookmarks):
+        """Save `bookmarks`, a dict of url hash to bookmark"""
+        if not bookmarks:
+            return 0
+
+        existing = set(
+            Link.objects.filter(owner=self.owner, url_hash__in=bookmarks).values_list(
+                "url_hash", flat=True
+            )
+        )
+        bookmarks = {
+            hash_: bookmark for hash_, bookmark in bookmarks.items() if hash_ not in existing
+        }
+        if not bookmarks:
+            return 0
+
+        categories = {
+            bookmark.folders: self.get_category_id(bookmark.folders)
+            for bookmark in bookmarks.values()
+        }
+        Link.objects.bulk_create(
+            (
+                Link(
+                    url=bookmark.url,
+                    url_hash=hash_,
+                    description=bookmark.description.strip()[:DESCRIPTION_MAX_LENGTH],
+                    owner=self.owner,
+                    category_id=categories[bookmark.folders],
+                )
+                for hash_, bookmark in bookmarks.items()
+            ),
+            ignore_conflicts=True,
+        )
+
+        # ids are not returned when conflicts are ignored
+        link_ids = dict(
+            Link.objects.filter(owner=self.owner, url_hash__in=bookmarks).values_list(
+                "url_hash", "id"
+            )
+        )
+
+        tag_ids = self.get_tag_ids(
+            tag for bookmark in bookmarks.values() for tag in bookmark.tags
+        )
+        Link.tags.through.objects.bulk_create(
+            (
+                Link.tags.through(link_id=link_ids[hash_], tag_id=tag_ids[name])
+                for hash_, bookmark in bookmarks.items()
+                for name in {normalize_tag_name(tag) for tag in bookmark.tags}
+                if name in tag_ids
+            ),
+            ignore_conflicts=True,
+        )
+
+        return len(link_ids)
+
+    def get_category_id(self, folders):
+        if not folders:
+            if self.default_category is None:
+                self.default_category = self.get_or_create_category(DEFAULT_CATEGORY_NAME, None)
+            return self.default_category.id
+
+        parent = None
+        for name in folders:
+            parent = self.get_or_create_category(name[:CATEGORY_NAME_MAX_LENGTH], parent)
+        return parent.id
+
+    def get_or_create_category(self, name, parent):
+        if self.categories is None:
+            categories = list(
+                Category.objects.filter(owner=self.owner, pending_deletion=False).order_by("id")
+            )
+            # a suffixed category stands for the folder it was created for, so
+            # importing the same file again finds it, unless the folder name
+            # itself is in use under the same parent
+            self.categories = {}
+            for category in categories:
+                key = (category.parent_category_id, original_name(category.name))
+                self.categories.setdefault(key, category)
+            for category in categories:
+                self.categories[(category.parent_category_id, category.name)] = category
+            self.category_names = {category.name for category in categories}
+
+        # folders are merged into the category of the same name under the same
+        # parent. Category names are unique per owner, so a folder named like
+        # a category elsewhere, e.g. Work/Docs and Home/Docs, gets a suffix
+        key = (parent and parent.id, name)
+        if key not in self.categories:
+            self.categories[key] = Category.objects.create(
+                name=copy_name(name, self.category_names),
+                owner=self.owner,
+                parent_category=parent,
+            )
+        return self.categories[key]
+
+    def get_tag_ids(self, names):
+        names = {normalize_tag_name(name) for name in names} - {""}
+        missing = names - self.tags.keys()
+        if missing:
+            Tag.objects.bulk_create((Tag(name=name) for name in missing), ignore_conflicts=True)
+            self.tags.update(Tag.objects.filter(name__in=missing).values_list("name", "id"))
+        return self.tags
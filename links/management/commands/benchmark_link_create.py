@@ -0,0 +1,80 @@
+import statistics
+import time
+from types import SimpleNamespace
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from categories.models import Category
+from links.models import Link
+from links.serializers import LinkSerializer
+from tags.models import Tag
+
+UserModel = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the queries and latency of creating a link through the "
+        "validating model save with the lean serializer write path. "
+        "All data is created inside a transaction which is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--links", type=int, default=500)
+        parser.add_argument("--tags-per-link", type=int, default=3)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            owner = UserModel.objects.create_user(
+                username="benchmark", email="benchmark@example.com", password="benchmark"
+            )
+            self.category = Category.objects.create(name="benchmark", owner=owner)
+            self.tag_ids = [
+                tag.id
+                for tag in Tag.objects.bulk_create(
+                    Tag(name=f"benchmark-{i}") for i in range(options["tags_per_link"])
+                )
+            ]
+
+            self.stdout.write(
+                f"{'path':<10} {'queries/link':>13} {'median (ms)':>12} {'p95 (ms)':>9}"
+            )
+            for name, create in (("validated", self.create_validated), ("lean", self.create_lean)):
+                self.run(name, create, owner, options["links"])
+            transaction.set_rollback(True)
+
+    def run(self, name, create, owner, n):
+        timings = []
+        with CaptureQueriesContext(connection) as queries:
+            for i in range(n):
+                start = time.perf_counter()
+                create(owner, f"https://example.com/{name}/{i}")
+                timings.append((time.perf_counter() - start) * 1000)
+
+        timings.sort()
+        self.stdout.write(
+            f"{name:<10} {len(queries) / n:>13.1f} "
+            f"{statistics.median(timings):>12.2f} {timings[int(len(timings) * 0.95)]:>9.2f}"
+        )
+
+    def create_validated(self, owner, url):
+        """The write path before the lean serializer, query for query"""
+        with transaction.atomic():
+            Link.objects.filter(owner=owner).with_url(url).exists()
+            category = Category.objects.get(id=self.category.id, owner=owner)
+            tags = [Tag.objects.get(pk=pk) for pk in self.tag_ids]
+            link = Link(url=url, category=category, owner=owner)
+            link.save()
+            link.tags.set(tags)
+
+    def create_lean(self, owner, url):
+        serializer = LinkSerializer(
+            data={"url": url, "category": self.category.id, "tags": self.tag_ids},
+            context={"request": SimpleNamespace(user=owner)},
+        )
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            serializer.save(owner=owner)
@@ -0,0 +1,97 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from categories.models import Category
+from links.models import Link
+from links_organizer_api.utils.primitives import url_hash
+from tags.models import Tag
+
+UserModel = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the chained-join tag filter with the GROUP BY/HAVING tag "
+        "intersection as the number of tags in the filter grows. "
+        "All data is created inside a transaction which is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--links", type=int, default=20000)
+        parser.add_argument("--tags", type=int, default=20)
+        parser.add_argument("--tags-per-link", type=int, default=6)
+        parser.add_argument("--max-filter-tags", type=int, default=6)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        random.seed(0)
+        with transaction.atomic():
+            owner = self.populate(options)
+            self.run(owner, options)
+            transaction.set_rollback(True)
+
+    def populate(self, options):
+        owner = UserModel.objects.create_user(
+            username="benchmark", email="benchmark@example.com", password="benchmark"
+        )
+        category = Category.objects.create(name="benchmark", owner=owner)
+        tags = Tag.objects.bulk_create(
+            Tag(name=f"benchmark-{i}") for i in range(options["tags"])
+        )
+        # `bulk_create` skips `Link.save`, which computes the hash
+        urls = (f"https://example.com/{i}" for i in range(options["links"]))
+        links = Link.objects.bulk_create(
+            (
+                Link(url=url, url_hash=url_hash(url), owner=owner, category=category)
+                for url in urls
+            ),
+            batch_size=1000,
+        )
+
+        # skew the distribution so that the first tags are the most common
+        weights = [1 / (i + 1) for i in range(len(tags))]
+        through = Link.tags.through
+        rows = []
+        for link in links:
+            picked = set(
+                random.choices(tags, weights=weights, k=options["tags_per_link"])
+            )
+            rows.extend(through(link_id=link.id, tag_id=tag.id) for tag in picked)
+        through.objects.bulk_create(rows, batch_size=5000)
+
+        self.tag_ids = [tag.id for tag in tags]
+        return owner
+
+    def time(self, queryset, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            count = len(list(queryset.values_list("id", flat=True)))
+            timings.append(time.perf_counter() - start)
+        return statistics.median(timings) * 1000, count
+
+    def run(self, owner, options):
+        self.stdout.write(
+            f"{'tags':>4} {'rows':>7} {'chained (ms)':>13} {'intersect (ms)':>15}"
+        )
+        links = Link.objects.filter(owner=owner)
+        for n in range(1, options["max_filter_tags"] + 1):
+            tag_ids = self.tag_ids[:n]
+
+            chained = links
+            for tag_id in tag_ids:
+                chained = chained.filter(tags__id=tag_id)
+            intersect = links.with_all_tags(tag_ids)
+
+            chained_ms, chained_count = self.time(chained, options["repeat"])
+            intersect_ms, intersect_count = self.time(intersect, options["repeat"])
+            assert chained_count == intersect_count
+
+            self.stdout.write(
+                f"{n:>4} {intersect_count:>7} {chained_ms:>13.2f} {intersect_ms:>15.2f}"
+            )
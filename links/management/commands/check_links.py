@@ -0,0 +1,59 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import CommandError
+from django.db.models import Q
+from django.utils import timezone
+
+from links.checker import LinkChecker, check_links
+from links.models import Link
+from links_organizer_api.utils.commands import WorkerCommand
+
+UserModel = get_user_model()
+
+
+class Command(WorkerCommand):
+    help = (
+        "Check links for dead urls and save their status. Only links which were "
+        "not checked in the last --older-than hours are checked, so the command "
+        "can be scheduled periodically, or run as a worker with --interval."
+    )
+    interval = None
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument("--username", help="only check the links of this user")
+        parser.add_argument("--older-than", type=float, default=24, help="hours")
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--concurrency", type=int, default=50)
+        parser.add_argument("--per-host", type=int, default=2, help="concurrent requests per host")
+        parser.add_argument(
+            "--delay", type=float, default=0.5, help="seconds between requests to a host"
+        )
+        parser.add_argument("--timeout", type=float, default=10, help="seconds per link")
+
+    def handle(self, *args, **options):
+        self.links = Link.objects.all()
+        if options["username"]:
+            try:
+                self.links = self.links.filter(
+                    owner=UserModel.objects.get(username=options["username"])
+                )
+            except UserModel.DoesNotExist:
+                raise CommandError(f"User {options['username']} does not exist")
+
+        self.checker = LinkChecker(
+            concurrency=options["concurrency"],
+            per_host=options["per_host"],
+            delay=options["delay"],
+            timeout=options["timeout"],
+        )
+        super().handle(*args, **options)
+
+    def work(self, **options):
+        cutoff = timezone.now() - timedelta(hours=options["older_than"])
+        links = self.links.filter(Q(last_checked_at__isnull=True) | Q(last_checked_at__lt=cutoff))
+        for stats in check_links(links, self.checker, batch_size=options["batch_size"]):
+            self.stdout.write("checked {checked}, ok {ok}, broken {broken}".format(**stats))
+        # every link due was checked, the next ones are due after the interval
+        return False
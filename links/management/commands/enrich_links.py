@@ -0,0 +1,38 @@
+from links.enrichment import MetadataFetcher, enrich_pending
+from links_organizer_api.utils.commands import WorkerCommand
+
+
+class Command(WorkerCommand):
+    help = (
+        "Worker which fetches the title, canonical url and favicon of newly "
+        "saved links. Several workers can run side by side."
+    )
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--concurrency", type=int, default=20)
+        parser.add_argument("--per-host", type=int, default=2, help="concurrent requests per host")
+        parser.add_argument("--timeout", type=float, default=10, help="seconds per link")
+        parser.add_argument("--max-attempts", type=int, default=3)
+
+    def handle(self, *args, **options):
+        self.fetcher = MetadataFetcher(
+            concurrency=options["concurrency"],
+            per_host=options["per_host"],
+            timeout=options["timeout"],
+        )
+        super().handle(*args, **options)
+
+    def work(self, **options):
+        stats = enrich_pending(
+            self.fetcher,
+            batch_size=options["batch_size"],
+            max_attempts=options["max_attempts"],
+        )
+        if stats["claimed"]:
+            self.stdout.write(
+                "claimed {claimed}, enriched {enriched}, "
+                "retried {retried}, failed {failed}".format(**stats)
+            )
+        return bool(stats["claimed"])
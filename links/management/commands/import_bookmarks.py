@@ -0,0 +1,52 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from categories.models import Category
+from links.importers import PARSERS, BookmarkImporter, detect_format
+
+UserModel = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Import a Netscape bookmark html or JSON Lines file for a user"
+
+    def add_arguments(self, parser):
+        parser.add_argument("username")
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=tuple(PARSERS))
+        parser.add_argument(
+            "--category",
+            type=int,
+            help="id of the category for bookmarks which are not in a folder",
+        )
+        parser.add_argument("--batch-size", type=int, default=BookmarkImporter.batch_size)
+
+    def handle(self, *args, **options):
+        try:
+            owner = UserModel.objects.get(username=options["username"])
+        except UserModel.DoesNotExist:
+            raise CommandError(f"User {options['username']} does not exist")
+
+        category = None
+        if options["category"] is not None:
+            try:
+                category = Category.objects.get(
+                    id=options["category"], owner=owner, pending_deletion=False
+                )
+            except Category.DoesNotExist:
+                raise CommandError("Category does not exist")
+
+        file_format = options["format"] or detect_format(options["path"])
+        if file_format is None:
+            raise CommandError("Could not detect the file format, pass --format")
+
+        importer = BookmarkImporter(owner, category=category, batch_size=options["batch_size"])
+        with open(options["path"], "rb") as file:
+            for event in importer.run(PARSERS[file_format](file)):
+                if event["event"] == "error":
+                    self.stderr.write(f"line {event['line']}: {event['url']}: {event['detail']}")
+                else:
+                    self.stdout.write(
+                        "{event}: processed {processed}, created {created}, "
+                        "duplicates {duplicates}, errors {errors}".format(**event)
+                    )
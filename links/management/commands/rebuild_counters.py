@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from links.counters import rebuild_counters
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the link counts of categories and the tag usage counts of "
+        "users, in case they drifted from the links."
+    )
+
+    def handle(self, *args, **options):
+        fixed = rebuild_counters()
+        self.stdout.write(
+            "fixed {categories} category counts and {tag_usages} tag usages".format(**fixed)
+        )
@@ -0,0 +1,17 @@
+# Generated by Django 4.1.2 on 2026-10-18 08:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('links', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='link',
+            index=models.Index(fields=['owner', '-created_at', '-id'], name='link_owner_created_idx'),
+        ),
+    ]
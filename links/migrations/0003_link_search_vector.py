@@ -0,0 +1,50 @@
+# Generated by Django 4.1.2 on 2026-10-18 08:17
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+SEARCH_VECTOR = """
+    setweight(to_tsvector('simple', regexp_replace(coalesce({row}url, ''), '[^[:alnum:]]+', ' ', 'g')), 'A') ||
+    setweight(to_tsvector('english', coalesce({row}description, '')), 'B')
+"""
+
+CREATE_TRIGGER = f"""
+CREATE FUNCTION links_link_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := {SEARCH_VECTOR.format(row="NEW.")};
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER links_link_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF url, description ON links_link
+    FOR EACH ROW EXECUTE FUNCTION links_link_search_vector_update();
+
+UPDATE links_link SET search_vector = {SEARCH_VECTOR.format(row="")};
+"""
+
+DROP_TRIGGER = """
+DROP TRIGGER IF EXISTS links_link_search_vector_trigger ON links_link;
+DROP FUNCTION IF EXISTS links_link_search_vector_update();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('links', '0002_link_link_owner_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='link',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='link',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='link_search_vector_idx'),
+        ),
+        migrations.RunSQL(CREATE_TRIGGER, DROP_TRIGGER),
+    ]
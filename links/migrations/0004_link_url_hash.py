@@ -0,0 +1,49 @@
+# Generated by Django 4.1.2 on 2026-10-18 08:26
+
+from django.db import migrations, models
+
+from links_organizer_api.utils.primitives import sha1sum, url_hash
+
+
+def backfill_url_hash(apps, schema_editor):
+    Link = apps.get_model("links", "Link")
+
+    seen = set()
+    links = Link.objects.order_by("id").only("id", "owner_id", "url")
+    for link in links.iterator(chunk_size=2000):
+        link.url_hash = url_hash(link.url)
+        if (link.owner_id, link.url_hash) in seen:
+            # an older link of the owner already has the same canonical url,
+            # keep this one distinct instead of failing the migration
+            link.url_hash = sha1sum(f"{link.id}:{link.url}")
+        seen.add((link.owner_id, link.url_hash))
+        Link.objects.filter(id=link.id).update(url_hash=link.url_hash)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('links', '0003_link_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='link',
+            name='url_hash',
+            field=models.CharField(editable=False, max_length=40, null=True),
+        ),
+        migrations.RunPython(backfill_url_hash, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='link',
+            name='url_hash',
+            field=models.CharField(editable=False, max_length=40),
+        ),
+        migrations.RemoveConstraint(
+            model_name='link',
+            name='unique_link_owner',
+        ),
+        migrations.AddConstraint(
+            model_name='link',
+            constraint=models.UniqueConstraint(fields=('owner', 'url_hash'), name='unique_link_url_hash_owner'),
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 4.1.2 on 2026-10-18 08:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+ENQUEUE = """
+    INSERT INTO links_linkmetadatajob (link_id, status, attempts, run_after, locked_at, last_error)
+    {select}
+    ON CONFLICT (link_id) DO UPDATE
+    SET status = 'pending', attempts = 0, run_after = now(), locked_at = NULL, last_error = ''
+"""
+
+CREATE_TRIGGER = f"""
+CREATE FUNCTION links_link_enqueue_metadata_job() RETURNS trigger AS $$
+BEGIN
+    {ENQUEUE.format(select="VALUES (NEW.id, 'pending', 0, now(), NULL, '')")};
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER links_link_metadata_job_insert_trigger
+    AFTER INSERT ON links_link
+    FOR EACH ROW EXECUTE FUNCTION links_link_enqueue_metadata_job();
+
+CREATE TRIGGER links_link_metadata_job_update_trigger
+    AFTER UPDATE OF url ON links_link
+    FOR EACH ROW WHEN (OLD.url IS DISTINCT FROM NEW.url)
+    EXECUTE FUNCTION links_link_enqueue_metadata_job();
+
+{ENQUEUE.format(select="SELECT id, 'pending', 0, now(), NULL, '' FROM links_link")};
+"""
+
+DROP_TRIGGER = """
+DROP TRIGGER IF EXISTS links_link_metadata_job_insert_trigger ON links_link;
+DROP TRIGGER IF EXISTS links_link_metadata_job_update_trigger ON links_link;
+DROP FUNCTION IF EXISTS links_link_enqueue_metadata_job();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('links', '0004_link_url_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='link',
+            name='canonical_url',
+            field=models.URLField(blank=True, editable=False, max_length=500),
+        ),
+        migrations.AddField(
+            model_name='link',
+            name='favicon_url',
+            field=models.URLField(blank=True, editable=False, max_length=500),
+        ),
+        migrations.AddField(
+            model_name='link',
+            name='title',
+            field=models.CharField(blank=True, editable=False, max_length=300),
+        ),
+        migrations.CreateModel(
+            name='LinkMetadataJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('link', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='metadata_job', to='links.link')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='linkmetadatajob',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['run_after', 'id'], name='link_metadata_job_pending_idx'),
+        ),
+        migrations.RunSQL(CREATE_TRIGGER, DROP_TRIGGER),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.1.2 on 2026-10-18 08:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('links', '0005_link_metadata'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='link',
+            name='last_checked_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='link',
+            name='status_code',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.1.2 on 2026-10-18 08:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('links', '0006_link_status'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='link',
+            index=models.Index(fields=['owner', 'updated_at', 'id'], name='link_owner_updated_idx'),
+        ),
+    ]
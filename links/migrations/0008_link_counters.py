@@ -0,0 +1,128 @@
+# Generated by Django 4.1.2 on 2026-10-18 08:55
+
+from django.db import migrations
+
+# Statement level triggers, so that bulk inserts, moves and deletes update
+# each counter once per statement rather than once per row. They run in the
+# transaction of the change, so the counters can never be seen out of date.
+
+CREATE_TRIGGERS = """
+CREATE FUNCTION links_link_count_categories() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE categories_category AS category
+        SET link_count = category.link_count + changes.count
+        FROM (
+            SELECT category_id, count(*) AS count FROM new_rows GROUP BY category_id
+        ) AS changes
+        WHERE category.id = changes.category_id;
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE categories_category AS category
+        SET link_count = category.link_count - changes.count
+        FROM (
+            SELECT category_id, count(*) AS count FROM old_rows GROUP BY category_id
+        ) AS changes
+        WHERE category.id = changes.category_id;
+    ELSE
+        UPDATE categories_category AS category
+        SET link_count = category.link_count + changes.count
+        FROM (
+            SELECT category_id, sum(delta) AS count FROM (
+                SELECT new_rows.category_id, 1 AS delta
+                FROM new_rows JOIN old_rows ON old_rows.id = new_rows.id
+                WHERE old_rows.category_id <> new_rows.category_id
+                UNION ALL
+                SELECT old_rows.category_id, -1 AS delta
+                FROM new_rows JOIN old_rows ON old_rows.id = new_rows.id
+                WHERE old_rows.category_id <> new_rows.category_id
+            ) AS moves
+            GROUP BY category_id
+        ) AS changes
+        WHERE category.id = changes.category_id AND changes.count <> 0;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER links_link_count_categories_insert_trigger
+    AFTER INSERT ON links_link REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION links_link_count_categories();
+
+CREATE TRIGGER links_link_count_categories_update_trigger
+    AFTER UPDATE ON links_link REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION links_link_count_categories();
+
+CREATE TRIGGER links_link_count_categories_delete_trigger
+    AFTER DELETE ON links_link REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION links_link_count_categories();
+
+-- the owner is read from links_link, so the tags of a link must be deleted
+-- before the link itself, as Django does and as LinkQuerySet.bulk_delete does
+CREATE FUNCTION links_link_tags_count_usage() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO tags_tagusage AS tag_usage (owner_id, tag_id, link_count)
+        SELECT link.owner_id, new_rows.tag_id, count(*)
+        FROM new_rows JOIN links_link AS link ON link.id = new_rows.link_id
+        GROUP BY link.owner_id, new_rows.tag_id
+        ON CONFLICT (owner_id, tag_id) DO UPDATE
+        SET link_count = tag_usage.link_count + EXCLUDED.link_count;
+    ELSE
+        UPDATE tags_tagusage AS tag_usage
+        SET link_count = tag_usage.link_count - changes.count
+        FROM (
+            SELECT link.owner_id, old_rows.tag_id, count(*) AS count
+            FROM old_rows JOIN links_link AS link ON link.id = old_rows.link_id
+            GROUP BY link.owner_id, old_rows.tag_id
+        ) AS changes
+        WHERE tag_usage.owner_id = changes.owner_id AND tag_usage.tag_id = changes.tag_id;
+
+        DELETE FROM tags_tagusage AS tag_usage
+        USING old_rows JOIN links_link AS link ON link.id = old_rows.link_id
+        WHERE tag_usage.owner_id = link.owner_id AND tag_usage.tag_id = old_rows.tag_id
+            AND tag_usage.link_count = 0;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER links_link_tags_count_usage_insert_trigger
+    AFTER INSERT ON links_link_tags REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION links_link_tags_count_usage();
+
+CREATE TRIGGER links_link_tags_count_usage_delete_trigger
+    AFTER DELETE ON links_link_tags REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION links_link_tags_count_usage();
+
+UPDATE categories_category AS category
+SET link_count = (SELECT count(*) FROM links_link WHERE category_id = category.id);
+
+INSERT INTO tags_tagusage (owner_id, tag_id, link_count)
+SELECT link.owner_id, link_tag.tag_id, count(*)
+FROM links_link_tags AS link_tag JOIN links_link AS link ON link.id = link_tag.link_id
+GROUP BY link.owner_id, link_tag.tag_id;
+"""
+
+DROP_TRIGGERS = """
+DROP TRIGGER IF EXISTS links_link_count_categories_insert_trigger ON links_link;
+DROP TRIGGER IF EXISTS links_link_count_categories_update_trigger ON links_link;
+DROP TRIGGER IF EXISTS links_link_count_categories_delete_trigger ON links_link;
+DROP FUNCTION IF EXISTS links_link_count_categories();
+DROP TRIGGER IF EXISTS links_link_tags_count_usage_insert_trigger ON links_link_tags;
+DROP TRIGGER IF EXISTS links_link_tags_count_usage_delete_trigger ON links_link_tags;
+DROP FUNCTION IF EXISTS links_link_tags_count_usage();
+DELETE FROM tags_tagusage;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0006_category_link_count'),
+        ('tags', '0004_tagusage'),
+        ('links', '0007_link_link_owner_updated_idx'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_TRIGGERS, DROP_TRIGGERS),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.1.2 on 2026-10-18 08:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('links', '0008_link_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='link',
+            name='last_visited_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='link',
+            name='visits',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='link',
+            index=models.Index(fields=['owner', '-visits', '-id'], name='link_owner_visits_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='link',
+            index=models.Index(models.F('owner'), models.OrderBy(models.F('last_visited_at'), descending=True, nulls_last=True), models.OrderBy(models.F('id'), descending=True), name='link_owner_last_visited_idx'),
+        ),
+    ]
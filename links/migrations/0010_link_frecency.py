@@ -0,0 +1,33 @@
+# Generated by Django 4.1.2 on 2026-10-18 09:01
+
+from django.db import migrations, models
+
+# frecency of the visits counted so far, as if they were all made at their
+# last visit, with the 14 days half life of `links.visits`
+BACKFILL_FRECENCY = """
+UPDATE links_link
+SET frecency = ln(2) / 1209600
+    * extract(epoch FROM last_visited_at - '2020-01-01T00:00:00Z'::timestamptz)
+    + ln(visits)
+WHERE visits > 0 AND last_visited_at IS NOT NULL
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('links', '0009_link_visits'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='link',
+            name='frecency',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunSQL(BACKFILL_FRECENCY, migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name='link',
+            index=models.Index(models.F('owner'), models.OrderBy(models.F('frecency'), descending=True, nulls_last=True), models.OrderBy(models.F('id'), descending=True), name='link_owner_frecency_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.1.2 on 2026-10-18 09:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('links', '0010_link_frecency'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='link',
+            index=models.Index(fields=['category', '-created_at'], name='link_category_created_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.1.2 on 2026-10-18 10:05
+
+from django.db import migrations
+from django.db.models import Q
+
+from links_organizer_api.utils.primitives import url_hash
+
+
+def rehash_route_fragments(apps, schema_editor):
+    Link = apps.get_model("links", "Link")
+
+    links = Link.objects.filter(Q(url__contains="#/") | Q(url__contains="#!"))
+    for link in links.order_by("id").only("id", "owner_id", "url").iterator(chunk_size=2000):
+        hash_ = url_hash(link.url)
+        # keep the old hash of a link which would now duplicate another one
+        duplicate = (
+            Link.objects.filter(owner_id=link.owner_id, url_hash=hash_).exclude(id=link.id).exists()
+        )
+        if not duplicate:
+            Link.objects.filter(id=link.id).update(url_hash=hash_)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('links', '0012_link_sync_txid'),
+    ]
+
+    operations = [
+        migrations.RunPython(rehash_route_fragments, migrations.RunPython.noop),
+    ]
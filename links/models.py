@@ -1,31 +1,282 @@
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchQuery, SearchVectorField
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import connections, models, transaction
+from django.db.models import Case, Count, F, FilteredRelation, Q, Value, When
+from django.utils import timezone
+
+from categories.models import AccessLevel, Category, CategoryAccess
+from links_organizer_api.utils.primitives import url_hash
+
+
+def search_query(text):
+    # url tokens are indexed with the `simple` config and the description
+    # with `english`, so match the text against both
+    return SearchQuery(text, config="simple", search_type="websearch") | SearchQuery(
+        text, config="english", search_type="websearch"
+    )
+
+
+LINK_STATUSES = ("ok", "broken", "unchecked")
+
+# links of the categories the user owns, that were shared with them, or both
+LINK_SCOPES = ("owned", "shared", "all")
+
+
+def is_broken(status_code):
+    """Whether a link checked with `status_code` is broken, None if unreachable"""
+    return status_code is None or status_code >= 400
+
+
+class LinkQuerySet(models.QuerySet):
+    def _tagged(self, tag_ids):
+        return Link.tags.through.objects.filter(tag_id__in=tag_ids)
+
+    def with_all_tags(self, tag_ids):
+        """
+        Links having every tag in `tag_ids`.
+
+        Resolved with a single `GROUP BY link_id HAVING COUNT(DISTINCT tag_id) = N`
+        subquery on the through table, instead of one join per tag.
+        """
+        tag_ids = set(tag_ids)
+        if not tag_ids:
+            return self
+        matching = (
+            self._tagged(tag_ids)
+            .values("link_id")
+            .annotate(matched=Count("tag_id", distinct=True))
+            .filter(matched=len(tag_ids))
+            .values("link_id")
+        )
+        return self.filter(id__in=matching)
+
+    def with_any_tags(self, tag_ids):
+        """Links having at least one tag in `tag_ids`."""
+        return self.filter(id__in=self._tagged(tag_ids).values("link_id"))
+
+    def without_tags(self, tag_ids):
+        """Links having none of the tags in `tag_ids`."""
+        if not tag_ids:
+            return self
+        return self.exclude(id__in=self._tagged(tag_ids).values("link_id"))
+
+    def with_url(self, url):
+        """Links whose url has the same canonical form as `url`"""
+        return self.filter(url_hash=url_hash(url))
+
+    def search(self, text):
+        return self.filter(search_vector=search_query(text))
+
+    def with_status(self, status):
+        """Links by the result of their last check, one of `LINK_STATUSES`"""
+        if status == "unchecked":
+            return self.filter(last_checked_at__isnull=True)
+        broken = models.Q(status_code__isnull=True) | models.Q(status_code__gte=400)
+        links = self.filter(last_checked_at__isnull=False)
+        return links.filter(broken) if status == "broken" else links.exclude(broken)
+
+    def owned_by(self, user):
+        """
+        Links of `user`, but those of categories being deleted. These are
+        excluded by id, so that the categories are not joined.
+        """
+        deleting = Category.objects.filter(owner=user, pending_deletion=True).values("id")
+        return self.filter(owner=user).exclude(category__in=deleting)
+
+    def visible_to(self, user, scope="all"):
+        """
+        Links of the categories `user` owns and/or which are shared with
+        them, see `LINK_SCOPES`, annotated with their `access_level`:
+        `AccessLevel.ADMIN` in their own categories, the level they were
+        granted otherwise.
+
+        The shares of the user are joined once, so the level is known for
+        every link without a `get_access_level` query per link.
+        """
+        owned = Category.objects.filter(owner=user, pending_deletion=False).values("id")
+        shared = CategoryAccess.objects.filter(
+            user=user, category__pending_deletion=False
+        ).values("category_id")
+        categories = {"owned": owned, "shared": shared, "all": owned.union(shared)}[scope]
+        return (
+            self.filter(category__in=categories)
+            .annotate(
+                share=FilteredRelation(
+                    "category__categoryaccess", condition=Q(category__categoryaccess__user=user)
+                )
+            )
+            .annotate(
+                access_level=Case(
+                    When(category__owner=user, then=Value(AccessLevel.ADMIN)),
+                    default=F("share__level"),
+                )
+            )
+        )
+
+    def in_category_subtree(self, category_id):
+        """
+        Links of `category_id` and of the categories under it, at any depth,
+        found by prefix of the materialized `Category.path`
+        """
+        path = Category.objects.filter(id=category_id).values_list("path", flat=True).first()
+        if path is None:
+            return self.none()
+        return self.filter(category__path__startswith=path)
+
+    def writable(self, level=AccessLevel.READ_WRITE):
+        """Links of `visible_to` which can be changed at `level`"""
+        return self.filter(access_level__lte=level)
+
+    # Set based bulk operations. They bypass `Link.save`, so callers must
+    # make sure the links and the category belong to the same owner.
+
+    def _selection_sql(self):
+        return self.order_by().values("id").query.sql_with_params()
+
+    def _execute(self, sql, params):
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.rowcount
+
+    def move_to(self, category):
+        """Move the links to `category` with a single `UPDATE`"""
+        return self.order_by().update(category=category, updated_at=timezone.now())
+
+    def touch(self):
+        return self.order_by().update(updated_at=timezone.now())
+
+    def add_tags(self, tag_ids):
+        """
+        Add `tag_ids` to every link with one `INSERT ... SELECT` over the
+        selection crossed with the tag ids. Returns the number of links.
+        """
+        count = self.touch()
+        selection, params = self._selection_sql()
+        self._execute(
+            f"""
+            INSERT INTO {Link.tags.through._meta.db_table} (link_id, tag_id)
+            SELECT link.id, tag.id
+            FROM ({selection}) AS link CROSS JOIN unnest(%s::bigint[]) AS tag(id)
+            ON CONFLICT DO NOTHING
+            """,
+            (*params, list(tag_ids)),
+        )
+        return count
+
+    def remove_tags(self, tag_ids):
+        """Remove `tag_ids` from every link with one `DELETE`"""
+        count = self.touch()
+        Link.tags.through.objects.filter(
+            link_id__in=self.order_by().values("id"), tag_id__in=tag_ids
+        ).delete()
+        return count
+
+    def bulk_delete(self):
+        """
+        Delete the links with their `links_link_tags` and metadata job rows,
+        without loading them into memory like `QuerySet.delete` does.
+
+        The selection is resolved to ids first, then the tags are deleted
+        before the links: the tag usage triggers need the owner of the link.
+        """
+        selection, params = self._selection_sql()
+        with transaction.atomic(using=self.db), connections[self.db].cursor() as cursor:
+            cursor.execute(f"SELECT array_agg(id) FROM ({selection}) AS link", params)
+            ids = cursor.fetchone()[0] or []
+            cursor.execute(
+                f"DELETE FROM {Link.tags.through._meta.db_table} WHERE link_id = ANY(%s)",
+                [ids],
+            )
+            cursor.execute(
+                f"""
+                WITH deleted AS (
+                    DELETE FROM {Link._meta.db_table} WHERE id = ANY(%s) RETURNING id
+                ), deleted_jobs AS (
+                    DELETE FROM {LinkMetadataJob._meta.db_table}
+                    WHERE link_id IN (SELECT id FROM deleted)
+                )
+                SELECT count(*) FROM deleted
+                """,
+                [ids],
+            )
+            return cursor.fetchone()[0]
 
 
 class Link(models.Model):
     url = models.URLField(max_length=200)
+    # sha1 of the canonical form of `url`, see `canonicalize_url`
+    url_hash = models.CharField(max_length=40, editable=False)
     description = models.TextField(max_length=300, blank=True)
     owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     category = models.ForeignKey('categories.Category', on_delete=models.CASCADE)
     tags = models.ManyToManyField('tags.Tag', blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # maintained by the `links_link_search_vector_update` trigger
+    search_vector = SearchVectorField(null=True, editable=False)
+    # fetched from the page in the background, see `links.enrichment`
+    title = models.CharField(max_length=300, blank=True, editable=False)
+    canonical_url = models.URLField(max_length=500, blank=True, editable=False)
+    favicon_url = models.URLField(max_length=500, blank=True, editable=False)
+    # result of the last `check_links` run, a null status code with a check
+    # time means the server could not be reached
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
+    last_checked_at = models.DateTimeField(null=True, blank=True, editable=False)
+    # written in batches by `links.visits.VisitBuffer`
+    visits = models.PositiveIntegerField(default=0, editable=False)
+    last_visited_at = models.DateTimeField(null=True, blank=True, editable=False)
+    # log of the decayed visit count, see `links.visits.frecency_weight`
+    frecency = models.FloatField(null=True, blank=True, editable=False)
+    # id of the transaction which last changed `updated_at`, set by a
+    # trigger, see sync migration 0002
+    sync_txid = models.BigIntegerField(default=0, editable=False)
+
+    objects = LinkQuerySet.as_manager()
 
     class Meta:
         constraints = [
-            models.UniqueConstraint(fields=['url', 'owner'], name='unique_link_owner')
+            models.UniqueConstraint(fields=['owner', 'url_hash'], name='unique_link_url_hash_owner')
+        ]
+        indexes = [
+            models.Index(fields=['owner', '-created_at', '-id'], name='link_owner_created_idx'),
+            models.Index(fields=['owner', 'updated_at', 'id'], name='link_owner_updated_idx'),
+            models.Index(fields=['owner', 'sync_txid', 'id'], name='link_owner_sync_idx'),
+            models.Index(fields=['owner', '-visits', '-id'], name='link_owner_visits_idx'),
+            models.Index(
+                F('owner'),
+                F('last_visited_at').desc(nulls_last=True),
+                F('id').desc(),
+                name='link_owner_last_visited_idx',
+            ),
+            models.Index(
+                F('owner'),
+                F('frecency').desc(nulls_last=True),
+                F('id').desc(),
+                name='link_owner_frecency_idx',
+            ),
+            GinIndex(fields=['search_vector'], name='link_search_vector_idx'),
+            # the latest link of each category, see `CategoryQuerySet.with_activity`
+            models.Index(fields=['category', '-created_at'], name='link_category_created_idx'),
         ]
 
     def clean(self, *args, **kwargs):
-        if self.category.owner != self.owner:
+        if self.category.owner_id != self.owner_id:
             raise ValidationError({"category": ["category does not exist."]})
 
         super().clean(*args, **kwargs)
 
 
-    def save(self, *args, **kwargs):
-        self.full_clean()
+    def save(self, *args, validate=True, **kwargs):
+        """
+        Pass `validate=False` when the caller has already checked the category
+        ownership, to rely on the database constraints instead of the queries
+        `full_clean` runs.
+        """
+        self.url_hash = url_hash(self.url)
+        if validate:
+            self.full_clean()
 
         super().save(*args, **kwargs)
 
@@ -34,3 +285,36 @@ class Link(models.Model):
 
     def __str__(self):
         return self.url
+
+
+class LinkMetadataJob(models.Model):
+    """
+    A pending metadata fetch for a link, processed by the `enrich_links`
+    worker. Jobs are enqueued by the `links_link_enqueue_metadata_job` trigger
+    whenever a link is inserted or its url changes, so bulk imports are covered
+    too, and deleted once the metadata is saved.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending"
+        RUNNING = "running"
+        FAILED = "failed"
+
+    link = models.OneToOneField(Link, on_delete=models.CASCADE, related_name="metadata_job")
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['run_after', 'id'],
+                name='link_metadata_job_pending_idx',
+                condition=models.Q(status='pending'),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.link_id} ({self.status})"
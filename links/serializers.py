@@ -1,21 +1,106 @@
 from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
 
 from categories.models import Category
+from links_organizer_api.utils.serializers import SparseFieldsetSerializerMixin
+from tags.models import Tag
 from tags.serializers import TagSerializer
 
-from .models import Link
+from .exporters import RENDERERS
+from .importers import detect_format
+from .models import LINK_SCOPES, LINK_STATUSES, Link
 
 
-class LinkSerializer(serializers.ModelSerializer):
+class OwnedCategoryField(serializers.PrimaryKeyRelatedField):
+    """
+    A category of the requesting user, checked with a single lookup which
+    enforces the same rule as `Link.clean`.
+    """
+
+    default_error_messages = {
+        "does_not_exist": "Category does not exist.",
+    }
+
+    def get_queryset(self):
+        user = self.context["request"].user
+        instance = getattr(self.parent, "instance", None)
+        if isinstance(instance, Link) and instance.owner_id != user.id:
+            # a link of a category shared with the user stays in its category
+            return Category.objects.filter(id=instance.category_id)
+        return Category.objects.filter(owner=user, pending_deletion=False)
+
+
+class BulkManyRelatedField(serializers.ManyRelatedField):
+    """Resolves every primary key of the list with one query"""
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, "__iter__"):
+            self.fail("not_a_list", input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail("empty")
+
+        child = self.child_relation
+        pks = set()
+        for pk in data:
+            try:
+                if isinstance(pk, bool):
+                    raise TypeError
+                pks.add(int(pk))
+            except (TypeError, ValueError):
+                child.fail("incorrect_type", data_type=type(pk).__name__)
+
+        objects = list(child.get_queryset().filter(pk__in=pks))
+        missing = pks - {obj.pk for obj in objects}
+        if missing:
+            child.fail("does_not_exist", pk_value=min(missing))
+        return objects
+
+
+class TagRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Accepts tag ids on write and renders the tag through `TagSerializer` on
+    read. Relies on the tags being prefetched, so rendering a page of links
+    does not query per row.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.tag_serializer = TagSerializer()
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {"child_relation": cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
+
+    def use_pk_only_optimization(self):
+        return False
+
+    def to_representation(self, value):
+        return self.tag_serializer.to_representation(value)
+
+
+class LinkSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
+    """
+    Link serializer.
+
+    Writes skip `Link.full_clean`: the category is looked up once through
+    `OwnedCategoryField`, and url uniqueness is left to the
+    `unique_link_url_hash_owner` constraint, see `LinksViewSet.constraint_errors`.
+    """
+
     owner_username = serializers.ReadOnlyField(source='owner.username')
     owner_avatar = serializers.ReadOnlyField(source='owner.avatar')
+    category = OwnedCategoryField()
     category_background_url = serializers.ReadOnlyField(source='category.background_url')
-    # tags = TagSerializer(many=True)
-
-    def to_representation(self, instance):
-        ret = super().to_representation(instance)
-        ret['tags'] = TagSerializer(instance.tags.all(), many=True).data
-        return ret
+    tags = TagRelatedField(many=True, required=False, queryset=Tag.objects.all())
+    # only present on `?q=` full text search results
+    search_rank = serializers.FloatField(read_only=True)
+    search_snippet = serializers.CharField(read_only=True)
+    # only present with `?scope=shared` or `?scope=all`
+    access_level = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Link
@@ -25,25 +110,129 @@ class LinkSerializer(serializers.ModelSerializer):
           'category',
           'category_background_url',
           'description',
+          'title',
+          'canonical_url',
+          'favicon_url',
+          'status_code',
+          'last_checked_at',
+          'visits',
+          'last_visited_at',
           'owner',
           'owner_username',
           'owner_avatar',
           'tags',
           'created_at',
           'updated_at',
+          'search_rank',
+          'search_snippet',
+          'access_level',
         )
         read_only_fields = ('id', 'created_at', 'updated_at', 'owner')
 
+    def create(self, validated_data):
+        tags = validated_data.pop("tags", None)
+        link = Link(**validated_data)
+        link.save(validate=False)
+        if tags:
+            link.tags.add(*tags)
+        return link
+
+    def update(self, instance, validated_data):
+        tags = validated_data.pop("tags", None)
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        # only the edited fields are written, the visits, metadata and status
+        # may have been written by a worker since the instance was read
+        instance.save(validate=False, update_fields=(*validated_data, "url_hash", "updated_at"))
+        if tags is not None:
+            instance.tags.set(tags)
+        return instance
+
+
+class BookmarkImportSerializer(serializers.Serializer):
+    file = serializers.FileField()
+    format = serializers.ChoiceField(choices=("html", "jsonl"), required=False)
+    category = OwnedCategoryField(
+        required=False, help_text="Category for bookmarks which are not in a folder"
+    )
+
     def validate(self, attrs):
-        try:
-            link = Link.objects.get(url=attrs["url"], owner=self.context["request"].user)
-            raise serializers.ValidationError({"url": ("This URL is already in use.")})
-        except Link.DoesNotExist:
-            pass
+        if "format" not in attrs:
+            attrs["format"] = detect_format(attrs["file"].name)
+            if attrs["format"] is None:
+                raise serializers.ValidationError({"format": ["Could not detect the file format."]})
+        return attrs
+
+
+class LinkExportSerializer(serializers.Serializer):
+    file_format = serializers.ChoiceField(choices=tuple(RENDERERS), default="ndjson")
+    compress = serializers.ChoiceField(choices=("gzip",), required=False)
+
+
+class LinkFilterSerializer(serializers.Serializer):
+    category = serializers.IntegerField(required=False)
+    category_subtree = serializers.IntegerField(required=False)
+    tags = serializers.ListField(child=serializers.IntegerField(), required=False)
+    tags_any = serializers.ListField(child=serializers.IntegerField(), required=False)
+    tags_not = serializers.ListField(child=serializers.IntegerField(), required=False)
+    status = serializers.ChoiceField(choices=LINK_STATUSES, required=False)
+    q = serializers.CharField(required=False)
+
 
-        try:
-            category = Category.objects.get(id=attrs["category"].id, owner=self.context["request"].user)
-        except Category.DoesNotExist:
-            raise serializers.ValidationError({"category": ["Category does not exist."]})
+class BulkLinkSerializer(serializers.Serializer):
+    """
+    Selects the links of a bulk action, either by `ids` or by a `filter`
+    with the same meaning as the list query parameters.
+    """
 
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
+    filter = LinkFilterSerializer(required=False)
+    scope = serializers.ChoiceField(choices=LINK_SCOPES, default="owned")
+
+    def validate(self, attrs):
+        if ("ids" in attrs) == ("filter" in attrs):
+            raise serializers.ValidationError({"detail": ["Provide either ids or filter."]})
         return attrs
+
+    def get_links(self):
+        user = self.context["request"].user
+        if self.validated_data["scope"] == "owned":
+            links = Link.objects.owned_by(user)
+        else:
+            # only the links the user may change are selected
+            links = Link.objects.visible_to(user, self.validated_data["scope"]).writable()
+        if "ids" in self.validated_data:
+            return links.filter(id__in=self.validated_data["ids"])
+
+        filters = self.validated_data["filter"]
+        if "category" in filters:
+            links = links.filter(category_id=filters["category"])
+        if "category_subtree" in filters:
+            links = links.in_category_subtree(filters["category_subtree"])
+        if filters.get("tags"):
+            links = links.with_all_tags(filters["tags"])
+        if filters.get("tags_any"):
+            links = links.with_any_tags(filters["tags_any"])
+        if filters.get("tags_not"):
+            links = links.without_tags(filters["tags_not"])
+        if filters.get("status"):
+            links = links.with_status(filters["status"])
+        if filters.get("q"):
+            links = links.search(filters["q"])
+        return links
+
+
+class BulkLinkMoveSerializer(BulkLinkSerializer):
+    # links are only moved between categories of the same owner
+    scope = serializers.ChoiceField(choices=("owned",), default="owned")
+    category = OwnedCategoryField()
+
+
+class BulkLinkTagsSerializer(BulkLinkSerializer):
+    tags = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+
+    def validate_tags(self, value):
+        value = set(value)
+        if Tag.objects.filter(id__in=value).count() != len(value):
+            raise serializers.ValidationError("Tag does not exist.")
+        return value
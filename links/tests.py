@@ -1,15 +1,42 @@
+import csv
+import gzip
+import io
+import json
+import tempfile
+import threading
+import time
 from collections import OrderedDict
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
 
 from django.contrib.auth import get_user_model
 from django.core.exceptions import NON_FIELD_ERRORS, ValidationError
-from django.test import TestCase
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from rest_framework.test import APIRequestFactory, force_authenticate
 
 from accounts.models import User
-from categories.models import Category
-from links.models import Link
+from categories.models import AccessLevel, Category, CategoryAccess
+from links.checker import LinkChecker, check_links
+from links.enrichment import (
+    Metadata,
+    MetadataFetcher,
+    claim_jobs,
+    enrich_pending,
+    finish_jobs,
+)
+from links.http import is_allowed_address
+from links.importers import BookmarkImporter
+from links.models import Link, LinkMetadataJob
 from links.views import LinksViewSet
-from tags.models import Tag
+from links.visits import VisitBuffer, decayed_frecency
+from links_organizer_api.utils.primitives import canonicalize_url, url_hash
+from tags.models import Tag, TagUsage
 
 User: User = get_user_model()
 
@@ -142,6 +169,22 @@ class LinkCreateApiTests(TestCase):
         self.assertEqual(response.data["category"][0], "Category does not exist.")
 
 
+    def test_create_link_with_invalid_tag(self):
+        for tag, data_type in (("react", "str"), ({"id": 1}, "dict"), (True, "bool")):
+            request_data = {
+                "url": "https://example1.com",
+                "category": self.category1.id,
+                "tags": [self.tag1.id, tag]
+            }
+
+            request = self.factory.post("/api/links/", request_data, format="json")
+
+            force_authenticate(request, user=self.user)
+            response = LinksViewSet.as_view({"post": "create"})(request)
+
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.data["tags"][0], f"Incorrect type. Expected pk value, received {data_type}.")
+
     def test_create_link_when_category_does_not_exist(self):
         request_data = {
             "url": "https://example1.com",
@@ -269,6 +312,61 @@ class LinkListApiTests(TestCase):
         self.assertEqual(response.data["results"][0]["id"], self.link2.id)
 
 
+    def test_get_links_filter_by_tags_single_subquery(self):
+        request = self.factory.get(f"/api/links/?tags={self.tag1.id},{self.tag2.id},{self.tag3.id}", format="json")
+        force_authenticate(request, self.user)
+
+        with CaptureQueriesContext(connection) as context:
+            response = LinksViewSet.as_view({"get": "list"})(request)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 0)
+        count_query = context.captured_queries[0]["sql"]
+        self.assertEqual(count_query.count("links_link_tags"), 1)
+        self.assertIn("HAVING", count_query)
+
+
+    def test_get_links_filter_by_tags_any(self):
+        request = self.factory.get(f"/api/links/?tags_any={self.tag1.id},{self.tag3.id}", format="json")
+        force_authenticate(request, self.user)
+
+        response = LinksViewSet.as_view({"get": "list"})(request)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 2)
+
+
+    def test_get_links_filter_by_tags_not(self):
+        request = self.factory.get(f"/api/links/?tags_not={self.tag1.id}", format="json")
+        force_authenticate(request, self.user)
+
+        response = LinksViewSet.as_view({"get": "list"})(request)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 1)
+        self.assertEqual(response.data["results"][0]["id"], self.link2.id)
+
+
+    def test_get_links_filter_by_tags_combined(self):
+        request = self.factory.get(f"/api/links/?tags={self.tag2.id}&tags_not={self.tag3.id}", format="json")
+        force_authenticate(request, self.user)
+
+        response = LinksViewSet.as_view({"get": "list"})(request)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 1)
+        self.assertEqual(response.data["results"][0]["id"], self.link1.id)
+
+
+    def test_get_links_filter_by_invalid_tags(self):
+        request = self.factory.get("/api/links/?tags=react", format="json")
+        force_authenticate(request, self.user)
+
+        response = LinksViewSet.as_view({"get": "list"})(request)
+
+        self.assertEqual(response.status_code, 400)
+
+
 
 class LinkDetailApiTests(TestCase):
     def setUp(self):
@@ -363,7 +461,35 @@ class LinkDetailApiTests(TestCase):
         self.assertEqual(response.data["category"], updated_data["category"])
         self.assertEqual(self.link.category.id, updated_data["category"])
 
+    def test_update_does_not_overwrite_concurrent_changes(self):
+        get_object = LinksViewSet.get_object
+        checked_at = timezone.now()
+
+        def get_object_then_change(view):
+            link = get_object(view)
+            # visits flushed, metadata and status written while the update runs
+            Link.objects.filter(id=self.link.id).update(
+                visits=3, last_visited_at=checked_at, frecency=1.5,
+                title="Fetched", status_code=200, last_checked_at=checked_at,
+            )
+            return link
 
+        request = self.factory.patch(f"/api/links/{self.link.id}", {"description": "changed"}, format="json")
+        force_authenticate(request, user=self.user)
+        with patch.object(LinksViewSet, "get_object", get_object_then_change):
+            response = LinksViewSet.as_view({"patch":"partial_update"})(request, pk=self.link.id)
+
+        self.assertEqual(response.status_code, 200)
+        self.link.refresh_from_db()
+        self.assertEqual(self.link.description, "changed")
+        self.assertEqual(
+            (self.link.visits, self.link.last_visited_at, self.link.frecency),
+            (3, checked_at, 1.5),
+        )
+        self.assertEqual(
+            (self.link.title, self.link.status_code, self.link.last_checked_at),
+            ("Fetched", 200, checked_at),
+        )
 
 
 class LinkModelTestCases(TestCase):
@@ -405,3 +531,1543 @@ class LinkModelTestCases(TestCase):
     def test_string_representation_of_link(self):
         self.assertEqual(str(self.link), self.link.url)
 
+
+
+class LinkKeysetPaginationApiTests(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(
+            username= "test",
+            password="test",
+            email="test@test.com",
+            first_name="test"
+        )
+        self.category1 = Category.objects.create(name="Category1", description="some description", background_url="https://example.com/400", owner=self.user)
+
+        self.links = [
+            Link.objects.create(url=f"https://example{i}.com", category=self.category1, owner=self.user)
+            for i in range(5)
+        ]
+
+    def get(self, url):
+        request = self.factory.get(url, format="json")
+        force_authenticate(request, self.user)
+        return LinksViewSet.as_view({"get": "list"})(request)
+
+    def test_first_page(self):
+        response = self.get("/api/links/?pagination=cursor&limit=2")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("count", response.data)
+        self.assertIsNone(response.data["previous"])
+        self.assertIsNotNone(response.data["next"])
+        self.assertEqual(
+            [link["id"] for link in response.data["results"]],
+            [self.links[4].id, self.links[3].id],
+        )
+
+    def test_walk_forward_and_back(self):
+        response = self.get("/api/links/?pagination=cursor&limit=2")
+        seen = [link["id"] for link in response.data["results"]]
+        while response.data["next"]:
+            response = self.get(response.data["next"])
+            seen.extend(link["id"] for link in response.data["results"])
+
+        self.assertEqual(seen, [link.id for link in reversed(self.links)])
+
+        response = self.get(response.data["previous"])
+        self.assertEqual(
+            [link["id"] for link in response.data["results"]],
+            [self.links[2].id, self.links[1].id],
+        )
+        self.assertIsNotNone(response.data["next"])
+
+    def test_ascending_ordering(self):
+        response = self.get("/api/links/?pagination=cursor&limit=3&ordering=created_at")
+        response = self.get(response.data["next"])
+
+        self.assertEqual(
+            [link["id"] for link in response.data["results"]],
+            [self.links[3].id, self.links[4].id],
+        )
+        self.assertIsNone(response.data["next"])
+
+    def test_ties_on_created_at_are_broken_by_id(self):
+        Link.objects.update(created_at=self.links[0].created_at)
+
+        response = self.get("/api/links/?pagination=cursor&limit=2")
+        seen = [link["id"] for link in response.data["results"]]
+        while response.data["next"]:
+            response = self.get(response.data["next"])
+            seen.extend(link["id"] for link in response.data["results"])
+
+        self.assertEqual(seen, sorted((link.id for link in self.links), reverse=True))
+
+    def test_no_count_query(self):
+        response = self.get("/api/links/?pagination=cursor&limit=2")
+        next_url = response.data["next"]
+
+        with CaptureQueriesContext(connection) as context:
+            self.get(next_url)
+
+        self.assertFalse(any("COUNT(" in query["sql"] for query in context.captured_queries))
+        self.assertFalse(any("OFFSET" in query["sql"] for query in context.captured_queries))
+
+    def test_invalid_cursor(self):
+        response = self.get("/api/links/?cursor=not-a-cursor")
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_unsupported_ordering(self):
+        response = self.get("/api/links/?pagination=cursor&ordering=updated_at")
+
+        self.assertEqual(response.status_code, 400)
+
+
+class LinkQueryCountTests(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(
+            username= "test",
+            password="test",
+            email="test@test.com",
+            first_name="test"
+        )
+        self.category1 = Category.objects.create(name="Category1", description="some description", background_url="https://example.com/400", owner=self.user)
+        self.category2 = Category.objects.create(name="Category2", description="some description", background_url="https://example.com/400", owner=self.user)
+
+        self.tag1 = Tag.objects.create(name="react", description="a javascript framework")
+        self.tag2 = Tag.objects.create(name="django", description="something...")
+
+        self.link = self.create_links(1)[0]
+
+    def create_links(self, n):
+        links = []
+        for _ in range(n):
+            link = Link.objects.create(url=f"https://example{Link.objects.count()}.com", category=self.category1, owner=self.user)
+            link.tags.add(self.tag1, self.tag2)
+            links.append(link)
+        return links
+
+    def request(self, method, action, data=None, **kwargs):
+        request = getattr(self.factory, method)("/api/links/", data, format="json")
+        force_authenticate(request, self.user)
+        return LinksViewSet.as_view({method: action})(request, **kwargs)
+
+    def test_list_query_count_does_not_depend_on_page_size(self):
+        # count, page of links with owner and category joined, tags prefetch
+        with self.assertNumQueries(3):
+            response = self.request("get", "list")
+        self.assertEqual(len(response.data["results"]), 1)
+
+        self.create_links(9)
+        with self.assertNumQueries(3):
+            response = self.request("get", "list")
+        self.assertEqual(len(response.data["results"]), 10)
+
+    def test_keyset_list_query_count(self):
+        self.create_links(9)
+        with self.assertNumQueries(2):
+            response = self.request("get", "list", {"pagination": "cursor"})
+        self.assertEqual(len(response.data["results"]), 10)
+
+    def test_retrieve_query_count(self):
+        with self.assertNumQueries(2):
+            response = self.request("get", "retrieve", pk=self.link.id)
+        self.assertEqual(response.status_code, 200)
+
+    def test_create_query_count(self):
+        data = {"url": "https://new.com", "category": self.category1.id, "tags": [self.tag1.id, self.tag2.id]}
+        # category, tags, savepoint, insert link, insert tags, release, tags
+        with self.assertNumQueries(7):
+            response = self.request("post", "create", data)
+        self.assertEqual(response.status_code, 201)
+
+    def test_update_query_count(self):
+        data = {"url": "https://new.com", "category": self.category2.id, "tags": [self.tag1.id]}
+        # link, tags prefetch, category, tags, savepoint, update, current tags,
+        # delete removed tags, release, tags
+        with self.assertNumQueries(10):
+            response = self.request("put", "update", data, pk=self.link.id)
+        self.assertEqual(response.status_code, 200)
+
+    def test_partial_update_query_count(self):
+        data = {"url": "https://new.com", "category": self.category2.id}
+        with self.assertNumQueries(7):
+            response = self.request("patch", "partial_update", data, pk=self.link.id)
+        self.assertEqual(response.status_code, 200)
+
+    def test_destroy_query_count(self):
+        # link, tags prefetch, delete tags, metadata job and link
+        with self.assertNumQueries(5):
+            response = self.request("delete", "destroy", pk=self.link.id)
+        self.assertEqual(response.status_code, 204)
+
+
+class LinkFullTextSearchApiTests(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(
+            username= "test",
+            password="test",
+            email="test@test.com",
+            first_name="test"
+        )
+        self.category1 = Category.objects.create(name="Category1", description="some description", background_url="https://example.com/400", owner=self.user)
+
+        self.link1 = Link.objects.create(url="https://django.readthedocs.io/en/stable/", description="Django documentation", category=self.category1, owner=self.user)
+        self.link2 = Link.objects.create(url="https://react.dev/learn", description="Learning react hooks and building django backed apps", category=self.category1, owner=self.user)
+        self.link3 = Link.objects.create(url="https://example.com", description="nothing to see", category=self.category1, owner=self.user)
+
+    def search(self, query):
+        request = self.factory.get(f"/api/links/?{query}", format="json")
+        force_authenticate(request, self.user)
+        return LinksViewSet.as_view({"get": "list"})(request)
+
+    def test_search_vector_is_maintained(self):
+        self.link3.description = "a guide to kubernetes"
+        self.link3.save()
+
+        self.assertTrue(Link.objects.filter(id=self.link3.id, search_vector="kubernetes").exists())
+
+    def test_search_matches_url_tokens(self):
+        response = self.search("q=readthedocs")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 1)
+        self.assertEqual(response.data["results"][0]["id"], self.link1.id)
+
+    def test_search_matches_stemmed_description(self):
+        response = self.search("q=hook")
+
+        self.assertEqual(response.data["count"], 1)
+        self.assertEqual(response.data["results"][0]["id"], self.link2.id)
+        self.assertIn("<mark>hooks</mark>", response.data["results"][0]["search_snippet"])
+
+    def test_search_is_ordered_by_rank(self):
+        response = self.search("q=django")
+
+        self.assertEqual(response.data["count"], 2)
+        self.assertEqual(response.data["results"][0]["id"], self.link1.id)
+        self.assertEqual(response.data["results"][1]["id"], self.link2.id)
+        self.assertGreater(response.data["results"][0]["search_rank"], response.data["results"][1]["search_rank"])
+
+    def test_search_with_explicit_ordering(self):
+        response = self.search("q=django&ordering=-created_at")
+
+        self.assertEqual(response.data["results"][0]["id"], self.link2.id)
+
+    def test_search_fields_absent_without_query(self):
+        response = self.search("")
+
+        self.assertNotIn("search_rank", response.data["results"][0])
+        self.assertNotIn("search_snippet", response.data["results"][0])
+
+
+BOOKMARKS_HTML = """<!DOCTYPE NETSCAPE-Bookmark-file-1>
+<META HTTP-EQUIV="Content-Type" CONTENT="text/html; charset=UTF-8">
+<TITLE>Bookmarks</TITLE>
+<H1>Bookmarks</H1>
+<DL><p>
+    <DT><A HREF="https://example.com/root" ADD_DATE="1600000000">Root link</A>
+    <DT><H3 ADD_DATE="1600000000">Programming</H3>
+    <DL><p>
+        <DT><A HREF="https://www.djangoproject.com/" TAGS="python,Django Rest">Django</A>
+        <DD>The web framework for perfectionists
+        <DT><H3>Javascript</H3>
+        <DL><p>
+            <DT><A HREF="https://react.dev/">React</A>
+            <DT><A HREF="javascript:alert(1)">Bookmarklet</A>
+        </DL><p>
+        <DT><A HREF="https://existing.com/">Existing</A>
+    </DL><p>
+</DL><p>
+"""
+
+
+class LinkImportApiTests(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(
+            username= "test",
+            password="test",
+            email="test@test.com",
+            first_name="test"
+        )
+        self.category1 = Category.objects.create(name="Category1", description="some description", background_url="https://example.com/400", owner=self.user)
+        self.existing = Link.objects.create(url="https://existing.com/", category=self.category1, owner=self.user)
+        self.tag1 = Tag.objects.create(name="python")
+
+    def import_file(self, name, content, **data):
+        upload = SimpleUploadedFile(name, content.encode("utf-8"))
+        request = self.factory.post("/api/links/import/", {"file": upload, **data}, format="multipart")
+        force_authenticate(request, self.user)
+        response = LinksViewSet.as_view({"post": "import_bookmarks"})(request)
+        if response.status_code != 200:
+            return response, None
+        events = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        return response, events
+
+    def test_import_netscape_html(self):
+        response, events = self.import_file("bookmarks.html", BOOKMARKS_HTML)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(events[-1], {"event": "done", "processed": 5, "created": 3, "duplicates": 1, "errors": 1})
+        errors = [event for event in events if event["event"] == "error"]
+        self.assertEqual(errors[0]["url"], "javascript:alert(1)")
+        self.assertEqual(errors[0]["line"], 14)
+
+        programming = Category.objects.get(owner=self.user, name="Programming")
+        javascript = Category.objects.get(owner=self.user, name="Javascript")
+        self.assertEqual(javascript.parent_category, programming)
+
+        django = Link.objects.get(owner=self.user, url="https://www.djangoproject.com/")
+        self.assertEqual(django.category, programming)
+        self.assertEqual(django.description, "The web framework for perfectionists")
+        self.assertEqual(sorted(django.tags.values_list("name", flat=True)), ["django-rest", "python"])
+        self.assertEqual(Link.objects.get(url="https://react.dev/").category, javascript)
+        self.assertEqual(Link.objects.get(url="https://example.com/root").category.name, "Imported")
+        self.assertEqual(Link.objects.get(url="https://existing.com/").category, self.category1)
+
+    def test_import_json_lines(self):
+        content = "\n".join([
+            json.dumps({"url": "https://a.com", "description": "a", "category": "Category1", "tags": ["python"]}),
+            "not json",
+            json.dumps({"url": "https://b.com", "category": ["Reading", "Later"]}),
+            json.dumps({"url": "https://a.com"}),
+        ])
+        response, events = self.import_file("links.jsonl", content, category=self.category1.id)
+
+        self.assertEqual(events[-1], {"event": "done", "processed": 4, "created": 2, "duplicates": 1, "errors": 1})
+        self.assertEqual(Link.objects.get(url="https://a.com").category, self.category1)
+        self.assertEqual(list(Link.objects.get(url="https://a.com").tags.all()), [self.tag1])
+        self.assertEqual(Link.objects.get(url="https://b.com").category.parent_category.name, "Reading")
+
+    def test_import_folders_of_the_same_name(self):
+        content = "\n".join([
+            json.dumps({"url": "https://a.com", "category": ["Work", "Docs"]}),
+            json.dumps({"url": "https://b.com", "category": ["Home", "Docs"]}),
+            json.dumps({"url": "https://c.com", "category": ["Home", "Docs"]}),
+            json.dumps({"url": "https://d.com", "category": ["Category1"]}),
+        ])
+        self.import_file("links.jsonl", content)
+
+        work_docs = Link.objects.get(url="https://a.com").category
+        home_docs = Link.objects.get(url="https://b.com").category
+        self.assertEqual((work_docs.name, work_docs.parent_category.name), ("Docs", "Work"))
+        self.assertEqual((home_docs.name, home_docs.parent_category.name), ("Docs (copy)", "Home"))
+        self.assertEqual(Link.objects.get(url="https://c.com").category, home_docs)
+        self.assertEqual(Link.objects.get(url="https://d.com").category, self.category1)
+
+    def test_import_same_file_again(self):
+        content = "\n".join([
+            json.dumps({"url": "https://a.com", "category": ["Work", "Docs"]}),
+            json.dumps({"url": "https://b.com", "category": ["Home", "Docs"]}),
+        ])
+        self.import_file("links.jsonl", content)
+        categories = Category.objects.filter(owner=self.user).count()
+
+        response, events = self.import_file("links.jsonl", content)
+
+        self.assertEqual(events[-1], {"event": "done", "processed": 2, "created": 0, "duplicates": 2, "errors": 0})
+        self.assertEqual(Category.objects.filter(owner=self.user).count(), categories)
+
+        content = json.dumps({"url": "https://c.com", "category": ["Home", "Docs"]})
+        self.import_file("links.jsonl", content)
+
+        self.assertEqual(Category.objects.filter(owner=self.user).count(), categories)
+        self.assertEqual(Link.objects.get(url="https://c.com").category, Link.objects.get(url="https://b.com").category)
+
+    def test_import_json_lines_with_invalid_category_or_tags(self):
+        content = "\n".join([
+            json.dumps({"url": "https://a.com", "category": "Reading"}),
+            json.dumps({"url": "https://b.com", "category": 5}),
+            json.dumps({"url": "https://c.com", "tags": True}),
+            json.dumps({"url": "https://d.com", "tags": ["python"]}),
+        ])
+        response, events = self.import_file("links.jsonl", content)
+
+        self.assertEqual(events[-1], {"event": "done", "processed": 4, "created": 2, "duplicates": 0, "errors": 2})
+        errors = [event["line"] for event in events if event["event"] == "error"]
+        self.assertEqual(errors, [2, 3])
+        self.assertEqual(Link.objects.get(url="https://a.com").category.name, "Reading")
+        self.assertEqual(list(Link.objects.get(url="https://d.com").tags.all()), [self.tag1])
+
+    def test_import_reports_progress_per_batch(self):
+        content = "\n".join(json.dumps({"url": f"https://{i}.com"}) for i in range(5))
+        with patch.object(BookmarkImporter, "batch_size", 2):
+            response, events = self.import_file("links.jsonl", content)
+
+        progress = [event["processed"] for event in events if event["event"] == "progress"]
+        self.assertEqual(progress, [2, 4, 5])
+        self.assertEqual(Link.objects.filter(owner=self.user).count(), 6)
+
+    def test_import_unknown_format(self):
+        response, _ = self.import_file("bookmarks.txt", BOOKMARKS_HTML)
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_import_into_category_of_different_user(self):
+        user2 = User.objects.create_user(username="test2", password="test2", email="test2@test.com")
+        category = Category.objects.create(name="Category1", owner=user2)
+
+        response, _ = self.import_file("bookmarks.html", BOOKMARKS_HTML, category=category.id)
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_import_bookmarks_command(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".html") as file:
+            file.write(BOOKMARKS_HTML)
+            file.flush()
+            out = io.StringIO()
+            call_command("import_bookmarks", self.user.username, file.name, stdout=out, stderr=io.StringIO())
+
+        self.assertIn("done: processed 5, created 3, duplicates 1, errors 1", out.getvalue())
+        self.assertEqual(Link.objects.filter(owner=self.user).count(), 4)
+
+
+class LinkExportApiTests(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(
+            username= "test",
+            password="test",
+            email="test@test.com",
+            first_name="test"
+        )
+        self.user2 = User.objects.create_user(
+            username= "test2",
+            password="test2",
+            email="test2@test.com",
+            first_name="test2"
+        )
+        self.category1 = Category.objects.create(name="Category1", description="some description", background_url="https://example.com/400", owner=self.user)
+        self.category2 = Category.objects.create(name="Category2", description="some description", background_url="https://example.com/400", owner=self.user2)
+
+        self.tag1 = Tag.objects.create(name="react", description="a javascript framework")
+        self.tag2 = Tag.objects.create(name="django", description="something...")
+
+        self.link1 = Link.objects.create(url="https://example1.com", description="link, with \"quotes\"", category=self.category1, owner=self.user)
+        self.link1.tags.add(self.tag1, self.tag2)
+        self.link2 = Link.objects.create(url="https://example2.com", category=self.category1, owner=self.user)
+        self.link3 = Link.objects.create(url="https://example3.com", category=self.category2, owner=self.user2)
+
+    def export(self, query=""):
+        request = self.factory.get(f"/api/links/export/?{query}")
+        force_authenticate(request, self.user)
+        response = LinksViewSet.as_view({"get": "export"})(request)
+        content = b"".join(response.streaming_content) if response.status_code == 200 else None
+        return response, content
+
+    def test_export_ndjson(self):
+        response, content = self.export()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([row["id"] for row in rows], [self.link1.id, self.link2.id])
+        self.assertEqual(rows[0]["category"], "Category1")
+        self.assertEqual(rows[0]["tags"], ["django", "react"])
+        self.assertEqual(rows[1]["tags"], [])
+
+    def test_export_csv(self):
+        response, content = self.export("file_format=csv")
+
+        self.assertEqual(response["Content-Type"], "text/csv")
+        rows = list(csv.reader(io.StringIO(content.decode("utf-8"))))
+        self.assertEqual(rows[0], ["id", "url", "description", "category", "tags", "created_at", "updated_at"])
+        self.assertEqual(rows[1][:5], [str(self.link1.id), self.link1.url, self.link1.description, "Category1", "django,react"])
+        self.assertEqual(len(rows), 3)
+
+    def test_export_gzip(self):
+        response, content = self.export("file_format=csv&compress=gzip")
+
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        self.assertIn('filename="links.csv.gz"', response["Content-Disposition"])
+        self.assertTrue(gzip.decompress(content).startswith(b"id,url,description"))
+
+    def test_export_applies_list_filters(self):
+        response, content = self.export(f"tags={self.tag1.id}")
+
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([row["id"] for row in rows], [self.link1.id])
+
+    def test_export_invalid_format(self):
+        response, _ = self.export("file_format=xml")
+
+        self.assertEqual(response.status_code, 400)
+
+
+class LinkBulkApiTests(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(
+            username= "test",
+            password="test",
+            email="test@test.com",
+            first_name="test"
+        )
+        self.user2 = User.objects.create_user(
+            username= "test2",
+            password="test2",
+            email="test2@test.com",
+            first_name="test2"
+        )
+        self.category1 = Category.objects.create(name="Category1", description="some description", background_url="https://example.com/400", owner=self.user)
+        self.category2 = Category.objects.create(name="Category2", description="some description", background_url="https://example.com/400", owner=self.user)
+        self.category3 = Category.objects.create(name="Category3_user2", description="some description", background_url="https://example.com/400", owner=self.user2)
+
+        self.tag1 = Tag.objects.create(name="react", description="a javascript framework")
+        self.tag2 = Tag.objects.create(name="django", description="something...")
+
+        self.link1 = Link.objects.create(url="https://example1.com", category=self.category1, owner=self.user)
+        self.link1.tags.add(self.tag1)
+        self.link2 = Link.objects.create(url="https://example2.com", category=self.category1, owner=self.user)
+        self.link3 = Link.objects.create(url="https://example3.com", category=self.category2, owner=self.user)
+        self.other = Link.objects.create(url="https://example4.com", category=self.category3, owner=self.user2)
+        self.other.tags.add(self.tag1)
+
+    def bulk(self, action, data):
+        request = self.factory.post(f"/api/links/bulk/{action}/", data, format="json")
+        force_authenticate(request, self.user)
+        return LinksViewSet.as_view({"post": f"bulk_{action}"})(request)
+
+    def test_bulk_move_by_ids(self):
+        response = self.bulk("move", {"ids": [self.link1.id, self.link2.id, self.other.id], "category": self.category2.id})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["updated"], 2)
+        self.assertEqual(Link.objects.filter(category=self.category2).count(), 3)
+        self.assertEqual(Link.objects.get(id=self.other.id).category, self.category3)
+
+    def test_bulk_move_by_filter(self):
+        response = self.bulk("move", {"filter": {"category": self.category1.id}, "category": self.category2.id})
+
+        self.assertEqual(response.data["updated"], 2)
+        self.assertFalse(Link.objects.filter(category=self.category1).exists())
+
+    def test_bulk_move_to_category_of_different_user(self):
+        response = self.bulk("move", {"ids": [self.link1.id], "category": self.category3.id})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["category"][0], "Category does not exist.")
+        self.assertEqual(Link.objects.get(id=self.link1.id).category, self.category1)
+
+    def test_bulk_requires_ids_or_filter(self):
+        self.assertEqual(self.bulk("delete", {}).status_code, 400)
+        self.assertEqual(self.bulk("delete", {"ids": [self.link1.id], "filter": {}}).status_code, 400)
+
+    def test_bulk_add_tags(self):
+        # tag check, savepoint, UPDATE, INSERT ... SELECT, release
+        with self.assertNumQueries(5):
+            response = self.bulk("add_tags", {"filter": {"category": self.category1.id}, "tags": [self.tag1.id, self.tag2.id]})
+
+        self.assertEqual(response.data["updated"], 2)
+        self.assertEqual(set(self.link1.tags.all()), {self.tag1, self.tag2})
+        self.assertEqual(set(self.link2.tags.all()), {self.tag1, self.tag2})
+        self.assertEqual(set(self.link3.tags.all()), set())
+
+    def test_bulk_add_unknown_tag(self):
+        response = self.bulk("add_tags", {"ids": [self.link1.id], "tags": [10001]})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_bulk_remove_tags_selected_by_the_same_tags(self):
+        response = self.bulk("remove_tags", {"filter": {"tags": [self.tag1.id]}, "tags": [self.tag1.id]})
+
+        self.assertEqual(response.data["updated"], 1)
+        self.assertFalse(self.link1.tags.exists())
+        self.assertTrue(self.other.tags.exists())
+
+    def test_bulk_delete(self):
+        response = self.bulk("delete", {"filter": {"tags": [self.tag1.id]}})
+
+        self.assertEqual(response.data["deleted"], 1)
+        self.assertFalse(Link.objects.filter(id=self.link1.id).exists())
+        self.assertFalse(Link.tags.through.objects.filter(link_id=self.link1.id).exists())
+        self.assertTrue(Link.objects.filter(id=self.other.id).exists())
+        self.assertEqual(Link.objects.filter(owner=self.user).count(), 2)
+
+
+class LinkCounterTests(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(
+            username= "test",
+            password="test",
+            email="test@test.com",
+            first_name="test"
+        )
+        self.user2 = User.objects.create_user(
+            username= "test2",
+            password="test2",
+            email="test2@test.com",
+            first_name="test2"
+        )
+        self.category1 = Category.objects.create(name="Category1", description="some description", background_url="https://example.com/400", owner=self.user)
+        self.category2 = Category.objects.create(name="Category2", description="some description", background_url="https://example.com/400", owner=self.user)
+        self.category3 = Category.objects.create(name="Category3_user2", description="some description", background_url="https://example.com/400", owner=self.user2)
+
+        self.tag1 = Tag.objects.create(name="react", description="a javascript framework")
+        self.tag2 = Tag.objects.create(name="django", description="something...")
+
+        self.link1 = Link.objects.create(url="https://example1.com", category=self.category1, owner=self.user)
+        self.link1.tags.add(self.tag1, self.tag2)
+        self.link2 = Link.objects.create(url="https://example2.com", category=self.category1, owner=self.user)
+        self.link2.tags.add(self.tag1)
+        self.other = Link.objects.create(url="https://example3.com", category=self.category3, owner=self.user2)
+        self.other.tags.add(self.tag1)
+
+    def assertCounts(self, categories, usages):
+        self.assertEqual(
+            {category.name: category.link_count for category in Category.objects.all()},
+            categories,
+        )
+        self.assertEqual(
+            {
+                (usage.owner.username, usage.tag.name): usage.link_count
+                for usage in TagUsage.objects.select_related("owner", "tag")
+            },
+            usages,
+        )
+
+    def test_counts_after_create(self):
+        self.assertCounts(
+            {"Category1": 2, "Category2": 0, "Category3_user2": 1},
+            {("test", "react"): 2, ("test", "django"): 1, ("test2", "react"): 1},
+        )
+
+    def test_create_and_retag_through_api(self):
+        request = self.factory.post("/api/links/", {"url": "https://example4.com", "category": self.category2.id, "tags": [self.tag2.id]}, format="json")
+        force_authenticate(request, self.user)
+        response = LinksViewSet.as_view({"post": "create"})(request)
+        self.assertEqual(response.status_code, 201)
+
+        request = self.factory.patch("/api/links/", {"tags": [self.tag1.id]}, format="json")
+        force_authenticate(request, self.user)
+        response = LinksViewSet.as_view({"patch": "partial_update"})(request, pk=response.data["id"])
+        self.assertEqual(response.status_code, 200)
+
+        self.assertCounts(
+            {"Category1": 2, "Category2": 1, "Category3_user2": 1},
+            {("test", "react"): 3, ("test", "django"): 1, ("test2", "react"): 1},
+        )
+
+    def test_move_and_delete(self):
+        self.link1.category = self.category2
+        self.link1.save()
+        self.link2.delete()
+
+        self.assertCounts(
+            {"Category1": 0, "Category2": 1, "Category3_user2": 1},
+            {("test", "react"): 1, ("test", "django"): 1, ("test2", "react"): 1},
+        )
+
+    def test_bulk_operations(self):
+        links = Link.objects.filter(owner=self.user)
+        links.move_to(self.category2)
+        links.remove_tags([self.tag2.id])
+        links.add_tags([self.tag2.id])
+
+        self.assertCounts(
+            {"Category1": 0, "Category2": 2, "Category3_user2": 1},
+            {("test", "react"): 2, ("test", "django"): 2, ("test2", "react"): 1},
+        )
+
+        # the selection depends on the tags which are deleted with the links
+        self.assertEqual(links.filter(tags=self.tag1).bulk_delete(), 2)
+        self.assertCounts(
+            {"Category1": 0, "Category2": 0, "Category3_user2": 1},
+            {("test2", "react"): 1},
+        )
+
+    def test_delete_category(self):
+        self.category1.delete()
+
+        self.assertCounts({"Category2": 0, "Category3_user2": 1}, {("test2", "react"): 1})
+
+    def test_rebuild_counters(self):
+        Category.objects.update(link_count=5)
+        TagUsage.objects.filter(owner=self.user2).delete()
+        TagUsage.objects.filter(tag=self.tag2).update(link_count=3)
+        TagUsage.objects.create(owner=self.user2, tag=self.tag2, link_count=1)
+
+        out = io.StringIO()
+        call_command("rebuild_counters", stdout=out)
+
+        self.assertIn("fixed 3 category counts and 3 tag usages", out.getvalue())
+        self.assertCounts(
+            {"Category1": 2, "Category2": 0, "Category3_user2": 1},
+            {("test", "react"): 2, ("test", "django"): 1, ("test2", "react"): 1},
+        )
+
+
+class LinkVisitTests(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(
+            username= "test",
+            password="test",
+            email="test@test.com",
+            first_name="test"
+        )
+        self.user2 = User.objects.create_user(
+            username= "test2",
+            password="test2",
+            email="test2@test.com",
+            first_name="test2"
+        )
+        self.category = Category.objects.create(name="Category1", description="some description", background_url="https://example.com/400", owner=self.user)
+        self.category2 = Category.objects.create(name="Category2", description="some description", background_url="https://example.com/400", owner=self.user2)
+
+        self.link1 = Link.objects.create(url="https://example1.com", category=self.category, owner=self.user)
+        self.link2 = Link.objects.create(url="https://example2.com", category=self.category, owner=self.user)
+        self.link3 = Link.objects.create(url="https://example3.com", category=self.category, owner=self.user)
+        self.other = Link.objects.create(url="https://example4.com", category=self.category2, owner=self.user2)
+
+        self.buffer = VisitBuffer(interval=60)
+        self.addCleanup(self.buffer.stop)
+        patcher = patch("links.views.visit_buffer", self.buffer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def visit(self, link):
+        request = self.factory.post(f"/api/links/{link.id}/visit/")
+        force_authenticate(request, self.user)
+        return LinksViewSet.as_view({"post": "visit"})(request, pk=link.id)
+
+    def list(self, ordering):
+        request = self.factory.get("/api/links/", {"ordering": ordering})
+        force_authenticate(request, self.user)
+        response = LinksViewSet.as_view({"get": "list"})(request)
+        return [link["id"] for link in response.data["results"]]
+
+    def test_visits_are_buffered(self):
+        for link in (self.link1, self.link2, self.link1):
+            self.assertEqual(self.visit(link).status_code, 202)
+
+        self.link1.refresh_from_db()
+        self.assertEqual(self.link1.visits, 0)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.buffer.flush(), 2)
+
+        self.link1.refresh_from_db()
+        self.link2.refresh_from_db()
+        self.assertEqual(self.link1.visits, 2)
+        self.assertEqual(self.link2.visits, 1)
+        self.assertIsNotNone(self.link1.last_visited_at)
+        self.assertEqual(self.buffer.flush(), 0)
+
+    def test_visits_are_flushed_after_the_interval(self):
+        self.buffer.started_at -= 60
+        self.visit(self.link1)
+
+        self.link1.refresh_from_db()
+        self.assertEqual(self.link1.visits, 1)
+
+    def test_failed_flush_keeps_the_visits(self):
+        self.visit(self.link1)
+        with patch("links.visits.save_visits", side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                self.buffer.flush()
+        self.visit(self.link1)
+
+        self.buffer.flush()
+        self.link1.refresh_from_db()
+        self.assertEqual(self.link1.visits, 2)
+
+    def test_failed_flush_does_not_fail_the_visit(self):
+        self.buffer.started_at -= 60
+        with patch("links.visits.save_visits", side_effect=DatabaseError):
+            with self.assertLogs("links.visits", "ERROR"):
+                response = self.visit(self.link1)
+
+        self.assertEqual(response.status_code, 202)
+        self.assertIn(self.link1.id, self.buffer.pending)
+
+    def test_visits_are_flushed_by_the_timer(self):
+        flushed = threading.Event()
+        buffer = VisitBuffer(interval=0.1)
+        self.addCleanup(buffer.stop)
+
+        # the timer thread has its own connection, which cannot see the links
+        # of the test transaction
+        with patch("links.visits.save_visits", side_effect=lambda visits: flushed.set()) as save_visits:
+            buffer.add(self.link1.id)
+            self.assertTrue(flushed.wait(5))
+
+        self.assertEqual(list(save_visits.call_args.args[0]), [self.link1.id])
+
+    def test_visit_of_different_user(self):
+        self.assertEqual(self.visit(self.other).status_code, 404)
+        self.assertEqual(self.buffer.pending, {})
+
+    def test_ordering_visits(self):
+        Link.objects.filter(id=self.link2.id).update(visits=5)
+        Link.objects.filter(id=self.link3.id).update(visits=5)
+
+        self.assertEqual(self.list("-visits"), [self.link3.id, self.link2.id, self.link1.id])
+        self.assertEqual(self.list("visits"), [self.link1.id, self.link2.id, self.link3.id])
+
+    def test_ordering_last_visited(self):
+        self.buffer.add(self.link3.id, at=timezone.now() - timedelta(days=1))
+        self.buffer.add(self.link1.id)
+        self.buffer.flush()
+
+        # links never visited come last
+        self.assertEqual(self.list("-last_visited_at"), [self.link1.id, self.link3.id, self.link2.id])
+        self.assertEqual(self.list("last_visited_at"), [self.link2.id, self.link3.id, self.link1.id])
+
+
+    def test_frecency(self):
+        now = timezone.now()
+        for days in (14, 0):
+            self.buffer.add(self.link1.id, at=now - timedelta(days=days))
+            self.buffer.flush()
+        for _ in range(4):
+            self.buffer.add(self.link2.id, at=now - timedelta(days=42))
+        self.buffer.flush()
+
+        self.link1.refresh_from_db()
+        self.link2.refresh_from_db()
+        self.assertAlmostEqual(decayed_frecency(self.link1.frecency, now), 1.5)
+        self.assertAlmostEqual(decayed_frecency(self.link2.frecency, now), 0.5)
+        self.assertEqual(decayed_frecency(None), 0)
+
+        self.assertEqual(self.list("-frecency"), [self.link1.id, self.link2.id, self.link3.id])
+
+
+class LinkSharedScopeApiTests(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(
+            username= "test",
+            password="test",
+            email="test@test.com",
+            first_name="test"
+        )
+        self.user2 = User.objects.create_user(
+            username= "test2",
+            password="test2",
+            email="test2@test.com",
+            first_name="test2"
+        )
+        self.writable = Category.objects.create(name="Writable", description="some description", background_url="https://example.com/400", owner=self.user)
+        self.readable = Category.objects.create(name="Readable", description="some description", background_url="https://example.com/400", owner=self.user)
+        self.private = Category.objects.create(name="Private", description="some description", background_url="https://example.com/400", owner=self.user)
+        self.own = Category.objects.create(name="Own", description="some description", background_url="https://example.com/400", owner=self.user2)
+        CategoryAccess.objects.create(category=self.writable, user=self.user2, level=AccessLevel.READ_WRITE)
+        CategoryAccess.objects.create(category=self.readable, user=self.user2, level=AccessLevel.READ_ONLY)
+
+        self.tag = Tag.objects.create(name="react", description="a javascript framework")
+        self.writable_link = Link.objects.create(url="https://example1.com", category=self.writable, owner=self.user)
+        self.readable_link = Link.objects.create(url="https://example2.com", category=self.readable, owner=self.user)
+        self.private_link = Link.objects.create(url="https://example3.com", category=self.private, owner=self.user)
+        self.own_link = Link.objects.create(url="https://example4.com", category=self.own, owner=self.user2)
+
+    def list(self, params=None):
+        request = self.factory.get("/api/links/", params)
+        force_authenticate(request, self.user2)
+        return LinksViewSet.as_view({"get": "list"})(request)
+
+    def patch(self, link, data):
+        request = self.factory.patch(f"/api/links/{link.id}/?scope=all", data, format="json")
+        force_authenticate(request, self.user2)
+        return LinksViewSet.as_view({"patch": "partial_update"})(request, pk=link.id)
+
+    def bulk(self, action, data):
+        request = self.factory.post(f"/api/links/bulk/{action}/", data, format="json")
+        force_authenticate(request, self.user2)
+        return LinksViewSet.as_view({"post": f"bulk_{action}"})(request)
+
+    def test_list_all(self):
+        # count, links with their access level, tags
+        with self.assertNumQueries(3):
+            response = self.list({"scope": "all"})
+
+        self.assertEqual(
+            {link["id"]: link["access_level"] for link in response.data["results"]},
+            {
+                self.writable_link.id: AccessLevel.READ_WRITE,
+                self.readable_link.id: AccessLevel.READ_ONLY,
+                self.own_link.id: AccessLevel.ADMIN,
+            },
+        )
+
+    def test_list_shared(self):
+        response = self.list({"scope": "shared"})
+
+        self.assertEqual(
+            [link["id"] for link in response.data["results"]],
+            [self.readable_link.id, self.writable_link.id],
+        )
+
+    def test_list_owned_by_default(self):
+        response = self.list()
+
+        self.assertEqual([link["id"] for link in response.data["results"]], [self.own_link.id])
+        self.assertNotIn("access_level", response.data["results"][0])
+
+    def test_list_invalid_scope(self):
+        self.assertEqual(self.list({"scope": "everything"}).status_code, 400)
+
+    def test_update_with_write_access(self):
+        response = self.patch(self.writable_link, {"description": "edited", "category": self.writable.id})
+
+        self.assertEqual(response.status_code, 200)
+        self.writable_link.refresh_from_db()
+        self.assertEqual(self.writable_link.description, "edited")
+        self.assertEqual(self.writable_link.owner, self.user)
+
+    def test_update_with_read_access(self):
+        response = self.patch(self.readable_link, {"description": "edited"})
+
+        self.assertEqual(response.status_code, 403)
+
+    def test_move_out_of_shared_category(self):
+        response = self.patch(self.writable_link, {"category": self.own.id})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Link.objects.get(id=self.writable_link.id).category, self.writable)
+
+    def test_bulk_actions_skip_read_only_links(self):
+        ids = [self.writable_link.id, self.readable_link.id, self.private_link.id, self.own_link.id]
+
+        response = self.bulk("add_tags", {"ids": ids, "scope": "all", "tags": [self.tag.id]})
+        self.assertEqual(response.data["updated"], 2)
+        self.assertEqual(
+            set(Link.objects.filter(tags=self.tag).values_list("id", flat=True)),
+            {self.writable_link.id, self.own_link.id},
+        )
+
+        response = self.bulk("delete", {"ids": ids, "scope": "shared"})
+        self.assertEqual(response.data["deleted"], 1)
+        self.assertFalse(Link.objects.filter(id=self.writable_link.id).exists())
+
+    def test_list_category_subtree(self):
+        own_child = Category.objects.create(name="OwnChild", owner=self.user2, parent_category=self.own)
+        own_child_link = Link.objects.create(url="https://example5.com", category=own_child, owner=self.user2)
+        # shares are per category, so the child of a shared category is not shared
+        child = Category.objects.create(name="Child", owner=self.user, parent_category=self.writable)
+        Link.objects.create(url="https://example6.com", category=child, owner=self.user)
+
+        response = self.list({"category_subtree": self.own.id})
+        self.assertEqual(
+            [link["id"] for link in response.data["results"]],
+            [own_child_link.id, self.own_link.id],
+        )
+
+        response = self.list({"scope": "all", "category_subtree": self.writable.id})
+        self.assertEqual([link["id"] for link in response.data["results"]], [self.writable_link.id])
+
+        self.assertEqual(self.list({"category_subtree": "x"}).status_code, 400)
+
+    def test_bulk_move_is_owned_only(self):
+        response = self.bulk("move", {"ids": [self.writable_link.id], "scope": "all", "category": self.own.id})
+
+        self.assertEqual(response.status_code, 400)
+
+
+class CanonicalUrlTests(TestCase):
+    def test_canonicalize_url(self):
+        self.assertEqual(canonicalize_url("HTTPS://Example.COM:443/a/?utm_source=x&b=2&a=1#frag"), "https://example.com/a?a=1&b=2")
+        self.assertEqual(canonicalize_url("https://example.com"), "https://example.com/")
+        self.assertEqual(canonicalize_url("http://example.com:8080/"), "http://example.com:8080/")
+        self.assertEqual(canonicalize_url("https://example.com/?fbclid=1"), "https://example.com/")
+
+    def test_routes_of_single_page_apps_are_kept(self):
+        self.assertEqual(canonicalize_url("https://Example.com/#/inbox"), "https://example.com/#/inbox")
+        self.assertEqual(canonicalize_url("https://example.com/app/#!/settings"), "https://example.com/app#!/settings")
+        self.assertNotEqual(url_hash("https://example.com/#/inbox"), url_hash("https://example.com/#/settings"))
+        self.assertEqual(url_hash("https://example.com/#section"), url_hash("https://example.com/"))
+
+    def test_url_hash_is_fixed_width(self):
+        self.assertEqual(len(url_hash("https://example.com/" + "a" * 150)), 40)
+        self.assertEqual(url_hash("https://Example.com/a/"), url_hash("https://example.com/a"))
+
+
+class LinkCanonicalUrlApiTests(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(
+            username= "test",
+            password="test",
+            email="test@test.com",
+            first_name="test"
+        )
+        self.category1 = Category.objects.create(name="Category1", description="some description", background_url="https://example.com/400", owner=self.user)
+        self.link = Link.objects.create(url="https://example.com/page", category=self.category1, owner=self.user)
+
+    def test_url_hash_is_set_on_save(self):
+        self.assertEqual(self.link.url_hash, url_hash("https://example.com/page"))
+
+    def test_duplicate_of_canonical_form(self):
+        request = self.factory.post("/api/links/", {"url": "https://EXAMPLE.com/page/?utm_medium=email", "category": self.category1.id}, format="json")
+        force_authenticate(request, user=self.user)
+        response = LinksViewSet.as_view({"post": "create"})(request)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["url"][0], "This URL is already in use.")
+
+    def test_update_keeping_the_same_url(self):
+        request = self.factory.patch("/api/links/", {"url": self.link.url, "category": self.category1.id, "description": "changed"}, format="json")
+        force_authenticate(request, user=self.user)
+        response = LinksViewSet.as_view({"patch": "partial_update"})(request, pk=self.link.id)
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_lookup_by_url(self):
+        request = self.factory.get("/api/links/", {"url": "https://example.com/page/#top"})
+        force_authenticate(request, user=self.user)
+        response = LinksViewSet.as_view({"get": "list"})(request)
+
+        self.assertEqual(response.data["count"], 1)
+        self.assertEqual(response.data["results"][0]["id"], self.link.id)
+
+    def test_update_to_duplicate_of_canonical_form(self):
+        link = Link.objects.create(url="https://example.com/other", category=self.category1, owner=self.user)
+        request = self.factory.patch("/api/links/", {"url": "https://example.com/page?utm_source=feed"}, format="json")
+        force_authenticate(request, user=self.user)
+        response = LinksViewSet.as_view({"patch": "partial_update"})(request, pk=link.id)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["url"][0], "This URL is already in use.")
+        link.refresh_from_db()
+        self.assertEqual(link.url, "https://example.com/other")
+
+    def test_create_in_category_of_another_user(self):
+        other = User.objects.create_user(username="other", password="other", email="other@test.com")
+        category = Category.objects.create(name="Other", owner=other)
+        request = self.factory.post("/api/links/", {"url": "https://example.com/new", "category": category.id}, format="json")
+        force_authenticate(request, user=self.user)
+        response = LinksViewSet.as_view({"post": "create"})(request)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["category"][0], "Category does not exist.")
+
+
+METADATA_ENDPOINT = "http://169.254.169.254/latest/meta-data/"
+
+STUB_PAGES = {
+    "/page": """<html><head>
+        <title> Stub   page </title>
+        <link rel="canonical" href="/canonical">
+        <link rel="shortcut icon" href="/static/icon.png">
+    </head><body><title>not this one</title></body></html>""",
+    "/plain": "<html><head><meta property=\"og:title\" content=\"Open graph\"></head></html>",
+}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Serves `STUB_PAGES`, `/redirect`, `/redirect-internal`, `/slow` and
+    counts concurrent requests
+    """
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+        try:
+            if self.path in ("/redirect", "/redirect-internal"):
+                self.send_response(302)
+                self.send_header("Location", "/page" if self.path == "/redirect" else METADATA_ENDPOINT)
+                self.end_headers()
+                return
+            if self.path.startswith("/slow"):
+                time.sleep(server.delay)
+                body = STUB_PAGES["/plain"]
+            elif self.path in STUB_PAGES:
+                body = STUB_PAGES[self.path]
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.end_headers()
+            self.wfile.write(body.encode("utf-8"))
+        except (BrokenPipeError, ConnectionResetError):
+            # the client timed out
+            pass
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+@override_settings(LINK_FETCH_ALLOWED_NETWORKS=["127.0.0.1/32"])
+class LinkEnrichmentTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        cls.server.lock = threading.Lock()
+        cls.server.delay = 0.2
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.active = self.server.max_active = 0
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(
+            username= "test",
+            password="test",
+            email="test@test.com",
+            first_name="test"
+        )
+        self.category1 = Category.objects.create(name="Category1", description="some description", background_url="https://example.com/400", owner=self.user)
+        self.fetcher = MetadataFetcher(per_host=2, timeout=2)
+
+    def create_link(self, path):
+        return Link.objects.create(url=f"{self.base_url}{path}", category=self.category1, owner=self.user)
+
+    def test_created_link_is_enqueued(self):
+        request = self.factory.post("/api/links/", {"url": f"{self.base_url}/page", "category": self.category1.id}, format="json")
+        force_authenticate(request, user=self.user)
+        response = LinksViewSet.as_view({"post": "create"})(request)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["title"], "")
+        job = LinkMetadataJob.objects.get(link_id=response.data["id"])
+        self.assertEqual(job.status, LinkMetadataJob.Status.PENDING)
+        self.assertEqual(self.server.max_active, 0)
+
+    def test_enrich_pending(self):
+        link = self.create_link("/page")
+        plain = self.create_link("/plain")
+
+        stats = enrich_pending(self.fetcher)
+
+        self.assertEqual(stats, {"claimed": 2, "enriched": 2, "retried": 0, "failed": 0})
+        link.refresh_from_db()
+        self.assertEqual(link.title, "Stub page")
+        self.assertEqual(link.canonical_url, f"{self.base_url}/canonical")
+        self.assertEqual(link.favicon_url, f"{self.base_url}/static/icon.png")
+        plain.refresh_from_db()
+        self.assertEqual(plain.title, "Open graph")
+        self.assertEqual(plain.canonical_url, "")
+        self.assertEqual(plain.favicon_url, f"{self.base_url}/favicon.ico")
+        self.assertFalse(LinkMetadataJob.objects.exists())
+
+    def test_follows_redirects(self):
+        link = self.create_link("/redirect")
+
+        enrich_pending(self.fetcher)
+
+        link.refresh_from_db()
+        self.assertEqual(link.title, "Stub page")
+        self.assertEqual(link.favicon_url, f"{self.base_url}/static/icon.png")
+
+    def test_failed_fetch_is_retried_then_failed(self):
+        link = self.create_link("/missing")
+
+        stats = enrich_pending(self.fetcher, max_attempts=2)
+        self.assertEqual(stats["retried"], 1)
+        job = LinkMetadataJob.objects.get(link=link)
+        self.assertEqual(job.status, LinkMetadataJob.Status.PENDING)
+        self.assertEqual(job.last_error, "HTTP 404")
+        self.assertGreater(job.run_after, job.locked_at or job.run_after - timedelta(seconds=1))
+        # not due yet
+        self.assertEqual(enrich_pending(self.fetcher)["claimed"], 0)
+
+        LinkMetadataJob.objects.update(run_after=job.run_after - timedelta(hours=1))
+        stats = enrich_pending(self.fetcher, max_attempts=2)
+        self.assertEqual(stats["failed"], 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, LinkMetadataJob.Status.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_timeout(self):
+        link = self.create_link("/slow")
+
+        stats = enrich_pending(MetadataFetcher(timeout=0.05))
+
+        self.assertEqual(stats["retried"], 1)
+        self.assertIn("Timed out", LinkMetadataJob.objects.get(link=link).last_error)
+
+    def test_per_host_concurrency(self):
+        for i in range(4):
+            self.create_link(f"/slow/{i}")
+
+        enrich_pending(MetadataFetcher(concurrency=10, per_host=1, timeout=5))
+
+        self.assertEqual(self.server.max_active, 1)
+        self.assertEqual(Link.objects.exclude(title="").count(), 4)
+
+    def test_claimed_jobs_are_not_claimed_again(self):
+        self.create_link("/page")
+        self.create_link("/plain")
+
+        self.assertEqual(len(claim_jobs(1)), 1)
+        self.assertEqual(len(claim_jobs(10)), 1)
+        self.assertEqual(claim_jobs(10), [])
+        # until the lease of a worker which died expires
+        self.assertEqual(len(claim_jobs(10, lease=timedelta(0))), 2)
+
+    def test_url_change_enqueues_again(self):
+        link = self.create_link("/page")
+        enrich_pending(self.fetcher)
+
+        link.description = "no new job"
+        link.save()
+        self.assertFalse(LinkMetadataJob.objects.exists())
+
+        link.url = f"{self.base_url}/plain"
+        link.save()
+        self.assertTrue(LinkMetadataJob.objects.filter(link=link, status="pending").exists())
+
+    def test_job_released_while_fetching_is_left_alone(self):
+        link = self.create_link("/page")
+        jobs = claim_jobs(10)
+        Link.objects.filter(id=link.id).update(url=f"{self.base_url}/plain")
+
+        stats = finish_jobs(jobs, [Metadata(title="stale")])
+
+        self.assertEqual(stats["enriched"], 0)
+        link.refresh_from_db()
+        self.assertEqual(link.title, "")
+        self.assertEqual(LinkMetadataJob.objects.get(link=link).status, "pending")
+
+    @override_settings(LINK_FETCH_ALLOWED_NETWORKS=[])
+    def test_private_addresses_are_not_fetched(self):
+        link = self.create_link("/page")
+
+        enrich_pending(self.fetcher)
+
+        self.assertIn("blocked address 127.0.0.1", LinkMetadataJob.objects.get(link=link).last_error)
+        self.assertEqual(self.server.max_active, 0)
+
+    def test_redirects_to_private_addresses_are_not_followed(self):
+        link = self.create_link("/redirect-internal")
+
+        enrich_pending(self.fetcher)
+
+        self.assertIn("blocked address 169.254.169.254", LinkMetadataJob.objects.get(link=link).last_error)
+
+    @override_settings(LINK_FETCH_ALLOWED_NETWORKS=[])
+    def test_blocked_addresses(self):
+        for address in (
+            "10.0.0.1", "172.16.0.1", "192.168.1.1", "100.64.0.1", "127.0.0.1", "169.254.169.254",
+            "0.0.0.0", "240.0.0.1", "224.0.0.1", "::1", "fe80::1", "fd00::1", "::ffff:127.0.0.1",
+        ):
+            self.assertFalse(is_allowed_address(address), address)
+        for address in ("93.184.216.34", "2606:2800:220:1:248:1893:25c8:1946"):
+            self.assertTrue(is_allowed_address(address), address)
+
+    def test_worker_command(self):
+        self.create_link("/page")
+        out = io.StringIO()
+
+        call_command("enrich_links", "--once", stdout=out)
+
+        self.assertIn("claimed 1, enriched 1", out.getvalue())
+        self.assertEqual(Link.objects.get().title, "Stub page")
+
+
+class CheckStubHandler(BaseHTTPRequestHandler):
+    """Keep-alive server answering `HEAD` requests by path, counting connections"""
+
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def respond(self, status, headers=()):
+        with self.server.lock:
+            self.server.requests.append((self.command, self.path))
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    # paths answered with 404, as if they were removed
+    gone = set()
+
+    def do_HEAD(self):
+        if self.path in self.gone:
+            self.respond(404)
+        elif self.path.startswith("/ok"):
+            self.respond(200)
+        elif self.path == "/moved":
+            self.respond(301, [("Location", "/ok/target")])
+        elif self.path == "/moved-internal":
+            self.respond(301, [("Location", METADATA_ENDPOINT)])
+        elif self.path == "/no-head":
+            self.respond(405)
+        else:
+            self.respond(404)
+
+    def do_GET(self):
+        if self.path == "/no-head":
+            self.respond(200)
+        else:
+            self.do_HEAD()
+
+    def log_message(self, *args):
+        pass
+
+
+@override_settings(LINK_FETCH_ALLOWED_NETWORKS=["127.0.0.1/32"])
+class LinkCheckerTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), CheckStubHandler)
+        cls.server.lock = threading.Lock()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.connections = 0
+        self.server.requests = []
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(
+            username= "test",
+            password="test",
+            email="test@test.com",
+            first_name="test"
+        )
+        self.category1 = Category.objects.create(name="Category1", description="some description", background_url="https://example.com/400", owner=self.user)
+        self.checker = LinkChecker(per_host=1, delay=0, timeout=2)
+
+    def create_link(self, url):
+        if url.startswith("/"):
+            url = self.base_url + url
+        return Link.objects.create(url=url, category=self.category1, owner=self.user)
+
+    def check(self, checker=None, batch_size=500):
+        return list(check_links(Link.objects.all(), checker or self.checker, batch_size=batch_size))
+
+    def test_check_links(self):
+        ok = self.create_link("/ok")
+        gone = self.create_link("/gone")
+        moved = self.create_link("/moved")
+        no_head = self.create_link("/no-head")
+        unreachable = self.create_link("http://127.0.0.1:1/")
+
+        progress = self.check()
+
+        self.assertEqual(progress, [{"checked": 5, "ok": 3, "broken": 2}])
+        expected = {ok: 200, gone: 404, moved: 200, no_head: 200, unreachable: None}
+        for link, status_code in expected.items():
+            link.refresh_from_db()
+            self.assertEqual(link.status_code, status_code, link.url)
+            self.assertIsNotNone(link.last_checked_at)
+            # so that syncing clients get the status
+            self.assertEqual(link.updated_at, link.last_checked_at)
+        self.assertIn(("GET", "/no-head"), self.server.requests)
+
+    def test_unchanged_status_does_not_bump_updated_at(self):
+        ok = self.create_link("/ok")
+        gone = self.create_link("/ok/gone")
+        self.check()
+        ok.refresh_from_db()
+        first_check = ok.last_checked_at
+        CheckStubHandler.gone = {"/ok/gone"}
+        self.addCleanup(setattr, CheckStubHandler, "gone", set())
+
+        self.check()
+
+        ok.refresh_from_db()
+        gone.refresh_from_db()
+        self.assertGreater(ok.last_checked_at, first_check)
+        self.assertEqual(ok.updated_at, first_check)
+        self.assertEqual(gone.status_code, 404)
+        self.assertEqual(gone.updated_at, gone.last_checked_at)
+
+    @override_settings(LINK_FETCH_ALLOWED_NETWORKS=[])
+    def test_private_addresses_are_not_checked(self):
+        link = self.create_link("/ok")
+
+        self.check()
+
+        link.refresh_from_db()
+        self.assertIsNone(link.status_code)
+        self.assertEqual(self.server.requests, [])
+
+    def test_redirects_to_private_addresses_are_not_followed(self):
+        link = self.create_link("/moved-internal")
+
+        self.check()
+
+        link.refresh_from_db()
+        self.assertIsNone(link.status_code)
+        self.assertEqual(self.server.requests, [("HEAD", "/moved-internal")])
+
+    def test_connections_are_reused_across_batches(self):
+        for i in range(6):
+            self.create_link(f"/ok/{i}")
+
+        progress = self.check(batch_size=2)
+
+        self.assertEqual(len(progress), 3)
+        self.assertEqual(len(self.server.requests), 6)
+        self.assertEqual(self.server.connections, 1)
+
+    def test_delay_between_requests_to_a_host(self):
+        for i in range(4):
+            self.create_link(f"/ok/{i}")
+
+        start = time.monotonic()
+        self.check(LinkChecker(per_host=2, delay=0.1))
+
+        self.assertGreaterEqual(time.monotonic() - start, 0.3)
+
+    def test_status_filter(self):
+        self.create_link("/ok")
+        gone = self.create_link("/gone")
+        self.check()
+        unchecked = self.create_link("/ok/new")
+
+        for status, expected in (("broken", [gone.id]), ("unchecked", [unchecked.id])):
+            request = self.factory.get("/api/links/", {"status": status})
+            force_authenticate(request, user=self.user)
+            response = LinksViewSet.as_view({"get": "list"})(request)
+            self.assertEqual([link["id"] for link in response.data["results"]], expected)
+
+        request = self.factory.get("/api/links/", {"status": "dead"})
+        force_authenticate(request, user=self.user)
+        response = LinksViewSet.as_view({"get": "list"})(request)
+        self.assertEqual(response.status_code, 400)
+
+    def test_bulk_delete_broken(self):
+        ok = self.create_link("/ok")
+        self.create_link("/gone")
+        self.check()
+
+        request = self.factory.post("/api/links/bulk/delete/", {"filter": {"status": "broken"}}, format="json")
+        force_authenticate(request, user=self.user)
+        response = LinksViewSet.as_view({"post": "bulk_delete"})(request)
+
+        self.assertEqual(response.data, {"deleted": 1})
+        self.assertEqual(list(Link.objects.values_list("id", flat=True)), [ok.id])
+
+    def test_command_skips_recently_checked_links(self):
+        self.create_link("/ok")
+        out = io.StringIO()
+        call_command("check_links", "--delay", "0", stdout=out)
+        self.assertIn("checked 1, ok 1, broken 0", out.getvalue())
+
+        self.create_link("/gone")
+        out = io.StringIO()
+        call_command("check_links", "--delay", "0", stdout=out)
+        self.assertIn("checked 1, ok 0, broken 1", out.getvalue())
+
+    def test_command_with_interval(self):
+        self.create_link("/ok")
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            if len(sleeps) > 1:
+                raise KeyboardInterrupt
+            self.create_link("/gone")
+
+        out = io.StringIO()
+        commands = "links_organizer_api.utils.commands"
+        # closing the connection would end the test transaction
+        with patch(f"{commands}.time.sleep", sleep), patch(f"{commands}.close_old_connections"):
+            call_command("check_links", "--delay", "0", "--interval", "60", stdout=out)
+
+        self.assertEqual(sleeps, [60, 60])
+        self.assertEqual(
+            out.getvalue().splitlines(),
+            ["checked 1, ok 1, broken 0", "checked 1, ok 0, broken 1"],
+        )
+
+
+class LinkSparseFieldsetApiTests(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(
+            username= "test",
+            password="test",
+            email="test@test.com",
+            first_name="test"
+        )
+        self.category1 = Category.objects.create(name="Category1", description="some description", background_url="https://example.com/400", owner=self.user)
+        self.tag1 = Tag.objects.create(name="react", description="a javascript framework")
+        self.link = Link.objects.create(url="https://example.com", description="example", category=self.category1, owner=self.user)
+        self.link.tags.add(self.tag1)
+
+    def request(self, params, action="list", **kwargs):
+        request = self.factory.get("/api/links/", params)
+        force_authenticate(request, user=self.user)
+        return LinksViewSet.as_view({"get": action})(request, **kwargs)
+
+    def test_fields(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.request({"fields": "id,url,tags"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.data["results"],
+            [{"id": self.link.id, "url": "https://example.com", "tags": [{"id": self.tag1.id, "name": "react"}]}],
+        )
+        page = queries.captured_queries[1]["sql"]
+        self.assertNotIn("accounts_user", page)
+        # categories being deleted are only excluded by id
+        self.assertNotIn('JOIN "categories_category"', page)
+        self.assertNotIn("description", page)
+        self.assertNotIn("search_vector", page)
+
+    def test_fields_without_tags_skips_the_prefetch(self):
+        with self.assertNumQueries(2):
+            response = self.request({"fields": "id,url"})
+        self.assertEqual(list(response.data["results"][0]), ["id", "url"])
+
+    def test_omit(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.request({"omit": "owner_username,owner_avatar"})
+
+        link = response.data["results"][0]
+        self.assertNotIn("owner_username", link)
+        self.assertNotIn("owner_avatar", link)
+        self.assertEqual(link["category_background_url"], "https://example.com/400")
+        self.assertNotIn("accounts_user", queries.captured_queries[1]["sql"])
+        self.assertIn("categories_category", queries.captured_queries[1]["sql"])
+
+    def test_retrieve(self):
+        response = self.request({"fields": "id,owner_username"}, action="retrieve", pk=self.link.id)
+        self.assertEqual(response.data, {"id": self.link.id, "owner_username": "test"})
+
+    def test_keyset_pagination(self):
+        Link.objects.create(url="https://example.com/2", category=self.category1, owner=self.user)
+
+        with self.assertNumQueries(1):
+            response = self.request({"fields": "id", "pagination": "cursor", "limit": 1})
+        self.assertIsNotNone(response.data["next"])
+
+    def test_unknown_field(self):
+        response = self.request({"fields": "id,password"})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["fields"][0], "Unknown fields: password.")
+
+    def test_writes_are_not_pruned(self):
+        request = self.factory.patch("/api/links/?fields=id", {"description": "changed"}, format="json")
+        force_authenticate(request, user=self.user)
+        response = LinksViewSet.as_view({"patch": "partial_update"})(request, pk=self.link.id)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["description"], "changed")
+        self.assertIn("url", response.data)
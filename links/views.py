@@ -1,15 +1,83 @@
-from django.db import IntegrityError
+import json
+
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django_filters.rest_framework import DjangoFilterBackend
 from drf_yasg.utils import swagger_auto_schema
-from rest_framework import viewsets
-from rest_framework.exceptions import ValidationError
-from rest_framework.generics import ListCreateAPIView, RetrieveUpdateDestroyAPIView
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.filters import SearchFilter
+from rest_framework.generics import (
+    ListCreateAPIView,
+    RetrieveUpdateDestroyAPIView,
+    get_object_or_404,
+)
+from rest_framework.parsers import FormParser, MultiPartParser
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+from categories.models import AccessLevel
+from links_organizer_api.utils.mixins import (
+    ConstraintErrorsMixin,
+    GetSerializerClassMixin,
+    SparseFieldsetMixin,
+)
+from links_organizer_api.utils.paginations import LimitOffsetOrKeysetPagination
+from links_organizer_api.utils.serializers import EmptySerializer
+
+from .exporters import CONTENT_TYPES, RENDERERS, export_rows, gzip_stream
+from .filters import FullTextSearchFilter, LinkOrderingFilter
+from .importers import PARSERS, BookmarkImporter
+from .models import LINK_SCOPES, LINK_STATUSES, Link
+from .serializers import (
+    BookmarkImportSerializer,
+    BulkLinkMoveSerializer,
+    BulkLinkSerializer,
+    BulkLinkTagsSerializer,
+    LinkExportSerializer,
+    LinkSerializer,
+)
+from .visits import visit_buffer
+
 
-from .models import Link
-from .serializers import LinkSerializer
+def parse_ids(value, param):
+    """Parse a comma separated list of ids from a query parameter"""
+    try:
+        return [int(id_) for id_ in value.split(",") if id_.strip()]
+    except ValueError:
+        raise ValidationError({param: ["Expected a comma separated list of ids."]})
 
 
-class LinksViewSet(viewsets.ModelViewSet):
+def parse_id(value, param):
+    try:
+        return int(value)
+    except ValueError:
+        raise ValidationError({param: ["Expected an id."]})
+
+
+class LinksViewSet(
+    SparseFieldsetMixin, GetSerializerClassMixin, ConstraintErrorsMixin, viewsets.ModelViewSet
+):
     serializer_class = LinkSerializer
+    serializer_action_classes = {
+        "import_bookmarks": BookmarkImportSerializer,
+        "export": LinkExportSerializer,
+        "bulk_move": BulkLinkMoveSerializer,
+        "bulk_add_tags": BulkLinkTagsSerializer,
+        "bulk_remove_tags": BulkLinkTagsSerializer,
+        "bulk_delete": BulkLinkSerializer,
+        "visit": EmptySerializer,
+    }
+    constraint_errors = {
+        "unique_link_url_hash_owner": {"url": ["This URL is already in use."]},
+        # named by Django, for a category deleted while the link is saved
+        "links_link_category_id_57c9f0f5_fk_categories_category_id": {
+            "category": ["Category does not exist."]
+        },
+    }
+    pagination_class = LimitOffsetOrKeysetPagination
+    filter_backends = (DjangoFilterBackend, SearchFilter, LinkOrderingFilter, FullTextSearchFilter)
     ordering = ("-created_at",)
     filter_fields = (
         "category",
@@ -22,26 +90,171 @@ class LinksViewSet(viewsets.ModelViewSet):
     ordering_fields = (
         "created_at",
         "updated_at",
+        "visits",
+        "last_visited_at",
+        "frecency",
     )
 
     def get_queryset(self):
         if getattr(self, "swagger_fake_view", False):
             return Link.objects.none()
 
-        if self.action != "list":
-            return Link.objects.filter(owner=self.request.user).prefetch_related("tags")
-
-        ids = self.request.query_params.get("tags", None)
-        if ids:
-            ids = ids.split(",")
-            links = Link.objects.filter(owner=self.request.user).prefetch_related(
-                "tags"
-            )
-            for id_ in ids:
-                links = links.filter(tags__id=id_)
+        scope = self.request.query_params.get("scope", "owned")
+        if scope not in LINK_SCOPES:
+            raise ValidationError({"scope": [f"Expected one of {', '.join(LINK_SCOPES)}."]})
+        if scope == "owned":
+            links = Link.objects.owned_by(self.request.user)
+        else:
+            links = Link.objects.visible_to(self.request.user, scope)
+        links = links.select_related("owner", "category").prefetch_related("tags")
+
+        if self.action not in ("list", "export"):
             return links
 
-        return Link.objects.filter(owner=self.request.user).prefetch_related("tags")
+        params = self.request.query_params
+        if params.get("url"):
+            links = links.with_url(params["url"])
+        if params.get("tags"):
+            links = links.with_all_tags(parse_ids(params["tags"], "tags"))
+        if params.get("tags_any"):
+            links = links.with_any_tags(parse_ids(params["tags_any"], "tags_any"))
+        if params.get("tags_not"):
+            links = links.without_tags(parse_ids(params["tags_not"], "tags_not"))
+        if params.get("category_subtree"):
+            category_id = parse_id(params["category_subtree"], "category_subtree")
+            links = links.in_category_subtree(category_id)
+        if params.get("status"):
+            if params["status"] not in LINK_STATUSES:
+                raise ValidationError({"status": [f"Expected one of {', '.join(LINK_STATUSES)}."]})
+            links = links.with_status(params["status"])
+
+        return links
+
+    def check_object_permissions(self, request, obj):
+        super().check_object_permissions(request, obj)
+        # links of shared categories are annotated by `Link.objects.visible_to`
+        access_level = getattr(obj, "access_level", AccessLevel.ADMIN)
+        if request.method not in SAFE_METHODS and access_level > AccessLevel.READ_WRITE:
+            raise PermissionDenied("You only have read access to this category.")
+
+    @swagger_auto_schema(
+        operation_summary="Record a visit of the link",
+        responses={202: "The visit is counted with the next flush", 404: "Not found"},
+    )
+    @action(detail=True, methods=["post"])
+    def visit(self, request, pk=None):
+        """
+        Count a visit of the link. Visits are buffered and written in batches,
+        so `visits` and `last_visited_at` lag behind by up to
+        `LINK_VISITS_FLUSH_INTERVAL` seconds.
+        """
+        link = get_object_or_404(Link.objects.filter(owner=request.user).only("id"), pk=pk)
+        visit_buffer.add(link.id)
+        return Response(status=status.HTTP_202_ACCEPTED)
+
+    @swagger_auto_schema(
+        operation_summary="Import bookmarks from a Netscape bookmark html or JSON Lines file",
+        responses={
+            200: "NDJSON stream of progress, error and done events",
+            400: "Bad request",
+        },
+    )
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="import",
+        parser_classes=(MultiPartParser, FormParser),
+    )
+    def import_bookmarks(self, request):
+        """Import bookmarks, streaming progress and per-row errors as NDJSON"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        data = serializer.validated_data
+        bookmarks = PARSERS[data["format"]](data["file"])
+        importer = BookmarkImporter(request.user, category=data.get("category"))
+        events = (json.dumps(event) + "\n" for event in importer.run(bookmarks))
 
-    def perform_create(self, serializer):
-        serializer.save(owner=self.request.user)
+        return StreamingHttpResponse(events, content_type="application/x-ndjson")
+
+    @swagger_auto_schema(
+        operation_summary="Export links as NDJSON or CSV",
+        query_serializer=LinkExportSerializer,
+        responses={200: "NDJSON or CSV file, gzip compressed with ?compress=gzip"},
+    )
+    @action(detail=False, methods=["get"], pagination_class=None)
+    def export(self, request):
+        """
+        Stream all links matching the list filters with their category and
+        tag names.
+        """
+        serializer = self.get_serializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        file_format = serializer.validated_data["file_format"]
+        compress = serializer.validated_data.get("compress")
+
+        links = self.filter_queryset(self.get_queryset())
+        content = RENDERERS[file_format](export_rows(links))
+        filename = f"links.{file_format}"
+        content_type = CONTENT_TYPES[file_format]
+        if compress == "gzip":
+            content = gzip_stream(content)
+            filename += ".gz"
+            content_type = "application/gzip"
+
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+    def perform_bulk_action(self, request, operation):
+        """
+        Validate the selection and run `operation(links, validated_data)` on
+        it in one transaction
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        with transaction.atomic():
+            return operation(serializer.get_links(), serializer.validated_data)
+
+    @swagger_auto_schema(
+        operation_summary="Move the selected links to another category",
+        responses={200: "Number of links updated", 400: "Bad request"},
+    )
+    @action(detail=False, methods=["post"], url_path="bulk/move")
+    def bulk_move(self, request):
+        count = self.perform_bulk_action(
+            request, lambda links, data: links.move_to(data["category"])
+        )
+        return Response({"updated": count})
+
+    @swagger_auto_schema(
+        operation_summary="Add tags to the selected links",
+        responses={200: "Number of links updated", 400: "Bad request"},
+    )
+    @action(detail=False, methods=["post"], url_path="bulk/add_tags")
+    def bulk_add_tags(self, request):
+        count = self.perform_bulk_action(
+            request, lambda links, data: links.add_tags(data["tags"])
+        )
+        return Response({"updated": count})
+
+    @swagger_auto_schema(
+        operation_summary="Remove tags from the selected links",
+        responses={200: "Number of links updated", 400: "Bad request"},
+    )
+    @action(detail=False, methods=["post"], url_path="bulk/remove_tags")
+    def bulk_remove_tags(self, request):
+        count = self.perform_bulk_action(
+            request, lambda links, data: links.remove_tags(data["tags"])
+        )
+        return Response({"updated": count})
+
+    @swagger_auto_schema(
+        operation_summary="Delete the selected links",
+        responses={200: "Number of links deleted", 400: "Bad request"},
+    )
+    @action(detail=False, methods=["post"], url_path="bulk/delete")
+    def bulk_delete(self, request):
+        count = self.perform_bulk_action(request, lambda links, data: links.bulk_delete())
+        return Response({"deleted": count})
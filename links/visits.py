@@ -0,0 +1,161 @@
+import atexit
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.utils import timezone
+
+from .models import Link
+
+logger = logging.getLogger(__name__)
+
+# Frecency is the number of visits, each decayed by half every
+# `FRECENCY_HALF_LIFE`. Scores which decay are stored relative to a fixed
+# epoch instead, where a visit weighs `2 ** ((visited_at - epoch) / half life)`:
+# every score then decays at the same rate, so the order of the stored scores
+# is the order of the decayed ones and old scores never need to be rescanned.
+# They are stored as logarithms, which keeps the weights of recent visits in
+# the range of a float.
+FRECENCY_EPOCH = datetime(2020, 1, 1, tzinfo=dt_timezone.utc)
+FRECENCY_HALF_LIFE = timedelta(days=14)
+FRECENCY_RATE = math.log(2) / FRECENCY_HALF_LIFE.total_seconds()
+
+
+def frecency_weight(at, count=1):
+    """The log domain weight of `count` visits at `at`"""
+    return FRECENCY_RATE * (at - FRECENCY_EPOCH).total_seconds() + math.log(count)
+
+
+def decayed_frecency(frecency, now=None):
+    """The stored `frecency` as the decayed number of visits at `now`"""
+    if frecency is None:
+        return 0.0
+    return math.exp(frecency - frecency_weight(now or timezone.now()))
+
+
+def save_visits(visits):
+    """
+    Add `visits`, a dict of link id to `(count, last visited at)`, to the
+    links with a single `UPDATE ... FROM (VALUES ...)`. Returns the number of
+    links updated.
+
+    The frecency is incremented with `ln(exp(a) + exp(b))`, computed as
+    `max(a, b) + ln(1 + exp(-|a - b|))` so that it cannot overflow. Visits
+    coalesced by the buffer all count as made at the last of them.
+    """
+    if not visits:
+        return 0
+    # rows are locked in id order, so concurrent flushes cannot deadlock
+    rows = sorted(visits.items())
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE {Link._meta.db_table} AS link
+            SET visits = link.visits + visit.count,
+                last_visited_at = GREATEST(link.last_visited_at, visit.at),
+                frecency = CASE WHEN link.frecency IS NULL THEN visit.weight
+                    ELSE GREATEST(link.frecency, visit.weight)
+                        + ln(1 + exp(-LEAST(abs(link.frecency - visit.weight), 50)))
+                END
+            FROM (VALUES {", ".join(["(%s, %s, %s::timestamptz, %s::float8)"] * len(rows))})
+                AS visit(id, count, at, weight)
+            WHERE link.id = visit.id
+            """,
+            [
+                param
+                for link_id, (count, at) in rows
+                for param in (link_id, count, at, frecency_weight(at, count))
+            ],
+        )
+        return cursor.rowcount
+
+
+class VisitBuffer:
+    """
+    Coalesces link visits in memory, so that a link clicked many times is
+    written once per flush instead of once per click.
+
+    Visits are flushed every `interval` seconds by a background thread,
+    started with the first visit, by the request which finds the buffer older
+    than `interval` seconds or holding `max_links` links, and when the
+    process exits. Each process has its own buffer; visits still buffered
+    when a process is killed are lost, which is acceptable for a popularity
+    count.
+    """
+
+    def __init__(self, interval=10, max_links=1000):
+        self.interval = interval
+        self.max_links = max_links
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.started_at = time.monotonic()
+        self.thread = None
+        self.stopped = threading.Event()
+
+    def add(self, link_id, at=None):
+        at = at or timezone.now()
+        with self.lock:
+            count, last_at = self.pending.get(link_id, (0, at))
+            self.pending[link_id] = (count + 1, max(last_at, at))
+            due = (
+                len(self.pending) >= self.max_links
+                or time.monotonic() - self.started_at >= self.interval
+            )
+            # started by the first visit, in the process serving it, rather
+            # than at import in a process which may fork afterwards
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, name="visit-buffer", daemon=True)
+                self.thread.start()
+        if due:
+            self.try_flush()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            close_old_connections()
+            self.try_flush()
+
+    def stop(self):
+        self.stopped.set()
+
+    def take(self):
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            self.started_at = time.monotonic()
+        return pending
+
+    def merge(self, visits):
+        with self.lock:
+            for link_id, (count, at) in visits.items():
+                pending_count, pending_at = self.pending.get(link_id, (0, at))
+                self.pending[link_id] = (pending_count + count, max(pending_at, at))
+
+    def flush(self):
+        visits = self.take()
+        try:
+            return save_visits(visits)
+        except Exception:
+            # kept for the next flush
+            self.merge(visits)
+            raise
+
+    def try_flush(self):
+        """`flush`, logging errors instead of raising them to the request"""
+        try:
+            return self.flush()
+        except Exception:
+            logger.exception("Flushing link visits failed, retrying with the next flush")
+            return 0
+
+    def close(self):
+        """Stop the timer and flush the visits left, when the process exits"""
+        self.stop()
+        self.try_flush()
+
+
+visit_buffer = VisitBuffer(interval=settings.LINK_VISITS_FLUSH_INTERVAL)
+atexit.register(visit_buffer.close)
@@ -53,6 +53,7 @@ INSTALLED_APPS = [
     "tags",
     "links",
     "invitations",
+    "sync",
 ]
 
 MIDDLEWARE = [
@@ -161,6 +162,18 @@ AUTH_USER_MODEL = "accounts.User"
 
 AUTHENTICATION_BACKENDS = ("accounts.auth.EmailOrUsernameModelBackend",)
 
+# deleted rows are reported by `/changes/` for this long, see `sync.Tombstone`
+SYNC_TOMBSTONE_RETENTION = timedelta(days=30)
+
+# networks links may be fetched from although they are not public, e.g.
+# "10.1.0.0/16,127.0.0.1/32", see `links.http`
+LINK_FETCH_ALLOWED_NETWORKS = [
+    network for network in getenv("LINK_FETCH_ALLOWED_NETWORKS", "").split(",") if network
+]
+
+# seconds link visits are buffered in memory before being written, see `links.visits`
+LINK_VISITS_FLUSH_INTERVAL = int(getenv("LINK_VISITS_FLUSH_INTERVAL", 10))
+
 REST_FRAMEWORK = {
     "EXCEPTION_HANDLER": "links_organizer_api.utils.exceptions.exception_handler",
     "DEFAULT_AUTHENTICATION_CLASSES": (
@@ -44,6 +44,7 @@ api_v1_urlpatterns = [
     path("", include("tags.urls"), name="tags"),
     path("", include("links.urls"), name="links"),
     path("", include("invitations.urls"), name="invitations"),
+    path("", include("sync.urls"), name="sync"),
 ]
 
 urlpatterns = [
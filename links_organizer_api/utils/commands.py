@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+
+class WorkerCommand(BaseCommand):
+    """
+    A command which runs as a worker, calling `work` in a loop until it is
+    interrupted.
+
+    A class which inherits this command should implement `work(**options)`,
+    which returns whether it found something to do: it is called again at
+    once while it does, and after `--interval` seconds once it does not, or
+    the command exits then with `--once`. Commands which run periodically
+    rather than polling have no default `interval`, so that they run once
+    unless `--interval` is given, i.e.:
+
+    class Command(WorkerCommand):
+        interval = None
+
+        def work(self, **options):
+            deleted, _ = Session.objects.filter(expire_date__lt=timezone.now()).delete()
+            self.stdout.write(f"deleted {deleted} sessions")
+            return False
+    """
+
+    # seconds to wait when there is nothing to do
+    interval = 5
+
+    def add_arguments(self, parser):
+        if self.interval is None:
+            interval_help = "run again every this many seconds instead of exiting"
+        else:
+            interval_help = "seconds to wait when there is nothing to do"
+        parser.add_argument(
+            "--interval", type=float, default=self.interval, help=interval_help
+        )
+        parser.add_argument(
+            "--once", action="store_true", help="exit once there is nothing left to do"
+        )
+
+    def work(self, **options):
+        raise NotImplementedError("subclasses of WorkerCommand must provide a work() method")
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                if self.work(**options):
+                    continue
+                if options["once"] or options["interval"] is None:
+                    break
+                # the connections may have timed out while the worker sleeps
+                close_old_connections()
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
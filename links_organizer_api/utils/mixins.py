@@ -1,3 +1,7 @@
+from django.db import IntegrityError, transaction
+from rest_framework.exceptions import ValidationError
+
+
 class GetSerializerClassMixin:
     def get_serializer_class(self):
         """
@@ -26,3 +30,60 @@ class GetSerializerClassMixin:
             return self.serializer_action_classes[self.action]
         except (KeyError, AttributeError):
             return super().get_serializer_class()
+
+
+class SparseFieldsetMixin:
+    """
+    Narrows the queryset of GET requests to the fields requested with
+    `?fields=` and `?omit=`, for serializers using
+    `SparseFieldsetSerializerMixin`.
+    """
+
+    # fetched even when they are not rendered, e.g. for the keyset cursor
+    always_fetched_fields = ("created_at",)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.request.method != "GET":
+            return queryset
+
+        serializer = self.get_serializer()
+        if not hasattr(serializer, "narrow_queryset"):
+            return queryset
+        return serializer.narrow_queryset(queryset, self.always_fetched_fields)
+
+
+class ConstraintErrorsMixin:
+    """
+    Saves relying on the database constraints, and maps their violations to
+    the errors of the fields they concern.
+
+    A class which inherits this mixin should have variable
+    `constraint_errors`, a dict mapping a constraint name to the errors
+    raised when it is violated, i.e.:
+
+    class SampleViewSet(viewsets.ModelViewSet):
+        constraint_errors = {
+            "unique_sample_name": {"name": ["This name is already in use."]},
+        }
+
+    Violations of other constraints are raised as they are.
+    """
+
+    constraint_errors = {}
+
+    def perform_save(self, serializer, **kwargs):
+        try:
+            with transaction.atomic():
+                serializer.save(**kwargs)
+        except IntegrityError as error:
+            constraint = getattr(getattr(error.__cause__, "diag", None), "constraint_name", None)
+            if constraint in self.constraint_errors:
+                raise ValidationError(self.constraint_errors[constraint])
+            raise
+
+    def perform_create(self, serializer):
+        self.perform_save(serializer, owner=self.request.user)
+
+    def perform_update(self, serializer):
+        self.perform_save(serializer)
@@ -1,4 +1,12 @@
-from rest_framework.pagination import LimitOffsetPagination
+import base64
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 
 class CustomLimitOffsetPagination(LimitOffsetPagination):
@@ -8,3 +16,190 @@ class CustomLimitOffsetPagination(LimitOffsetPagination):
 
     default_limit = 10
     max_limit = 30
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination over `(created_at, id)`.
+
+    Every page is fetched with a `WHERE (created_at, id) < (x, y)` style
+    predicate instead of an `OFFSET`, and no `COUNT(*)` is issued, so page N
+    costs the same as page 1. Cursors are opaque base64 strings which encode
+    the boundary row and the direction of travel.
+
+    Ordering is always on `created_at` then `id`, newest first unless the
+    request asks for `?ordering=created_at`.
+    """
+
+    cursor_query_param = "cursor"
+    limit_query_param = "limit"
+    default_limit = CustomLimitOffsetPagination.default_limit
+    max_limit = CustomLimitOffsetPagination.max_limit
+    ordering_field = "created_at"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.limit = self.get_limit(request)
+        self.descending = self.get_descending(request)
+
+        position, reverse = self.decode_cursor(request)
+
+        # walking backwards is the same query with the ordering flipped
+        descending = self.descending != reverse
+        field = self.ordering_field
+        if descending:
+            queryset = queryset.order_by(f"-{field}", "-id")
+            lookup = "lt"
+        else:
+            queryset = queryset.order_by(field, "id")
+            lookup = "gt"
+
+        if position is not None:
+            value, pk = position
+            queryset = queryset.filter(**{f"{field}__{lookup}e": value}).filter(
+                Q(**{f"{field}__{lookup}": value}) | Q(**{f"id__{lookup}": pk})
+            )
+
+        results = list(queryset[: self.limit + 1])
+        has_more = len(results) > self.limit
+        results = results[: self.limit]
+        if reverse:
+            results.reverse()
+
+        if reverse:
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params[self.limit_query_param])
+        except (KeyError, ValueError):
+            return self.default_limit
+        if limit <= 0:
+            return self.default_limit
+        return min(limit, self.max_limit)
+
+    def get_descending(self, request):
+        ordering = request.query_params.get("ordering")
+        if not ordering:
+            return True
+        if ordering not in (self.ordering_field, f"-{self.ordering_field}"):
+            raise ValidationError(
+                {
+                    "ordering": [
+                        f"cursor pagination only supports ordering by {self.ordering_field}."
+                    ]
+                }
+            )
+        return ordering.startswith("-")
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, instance, reverse):
+        value = getattr(instance, self.ordering_field)
+        payload = {"v": value.isoformat(), "i": instance.pk}
+        if reverse:
+            payload["r"] = 1
+        encoded = base64.urlsafe_b64encode(
+            json.dumps(payload, separators=(",", ":")).encode("ascii")
+        ).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        """
+        Returns `((value, id), reverse)` for the cursor in the request, or
+        `(None, False)` when on the first page.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode("ascii")))
+            value = parse_datetime(payload["v"])
+            pk = int(payload["i"])
+            reverse = bool(payload.get("r", False))
+        except (TypeError, ValueError, KeyError, UnicodeEncodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if value is None:
+            raise NotFound(self.invalid_cursor_message)
+
+        return (value, pk), reverse
+
+    @classmethod
+    def is_requested(cls, request):
+        return (
+            cls.cursor_query_param in request.query_params
+            or request.query_params.get("pagination") == "cursor"
+        )
+
+
+class LimitOffsetOrKeysetPagination(CustomLimitOffsetPagination):
+    """
+    Limit-offset pagination by default. Clients opt in to keyset pagination
+    with `?pagination=cursor` for the first page and then follow the
+    `next`/`previous` links, which carry a `cursor` parameter.
+    """
+
+    keyset_pagination_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.keyset_pagination_class.is_requested(request):
+            self.keyset = self.keyset_pagination_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_schema_operation_parameters(self, view):
+        parameters = super().get_schema_operation_parameters(view)
+        parameters.append(
+            {
+                "name": KeysetPagination.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Opaque keyset cursor returned in next/previous.",
+                "schema": {"type": "string"},
+            }
+        )
+        return parameters
@@ -1,4 +1,5 @@
 import hashlib
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 
 
 def errors_to_string(errors: dict) -> str:
@@ -16,3 +17,61 @@ def sha1sum(string: str) -> str:
     sha_1 = hashlib.sha1()
     sha_1.update(string.encode("utf-8"))
     return sha_1.hexdigest()
+
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+TRACKING_PARAMS = {"fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid"}
+
+
+def is_tracking_param(name: str) -> bool:
+    name = name.lower()
+    return name.startswith("utm_") or name in TRACKING_PARAMS
+
+
+def is_route_fragment(fragment: str) -> bool:
+    """Whether `fragment` is the route of a single page app, e.g. `#/inbox` or `#!/inbox`"""
+    return fragment.startswith(("/", "!"))
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Normalize trivially different forms of the same url: lowercase scheme
+    and host, drop default ports, fragments, trailing slashes and tracking
+    query parameters, and sort the remaining query parameters. Fragments
+    which are routes of single page apps are kept, they address different
+    pages.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    host = parts.hostname or ""
+    if ":" in host:
+        host = f"[{host}]"
+    netloc = host
+    if parts.username is not None:
+        userinfo = parts.username
+        if parts.password is not None:
+            userinfo += f":{parts.password}"
+        netloc = f"{userinfo}@{netloc}"
+    if port is not None and DEFAULT_PORTS.get(scheme) != port:
+        netloc += f":{port}"
+
+    path = parts.path.rstrip("/") or "/"
+    query = urlencode(
+        sorted(
+            (name, value)
+            for name, value in parse_qsl(parts.query, keep_blank_values=True)
+            if not is_tracking_param(name)
+        )
+    )
+    fragment = parts.fragment if is_route_fragment(parts.fragment) else ""
+    return urlunsplit((scheme, netloc, path, query, fragment))
+
+
+def url_hash(url: str) -> str:
+    """Fixed width hash of the canonical form of `url`"""
+    return sha1sum(canonicalize_url(url))
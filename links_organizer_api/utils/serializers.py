@@ -1,5 +1,121 @@
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
 from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
 
 
 class EmptySerializer(serializers.Serializer):
     pass
+
+
+def parse_field_names(value):
+    return {name.strip() for name in value.split(",") if name.strip()}
+
+
+class SparseFieldsetSerializerMixin:
+    """
+    Lets clients of a GET request pick the fields of the response with
+    `?fields=id,url` or drop some with `?omit=owner_avatar`.
+
+    Only the top level serializer of the response is pruned. Views should
+    also pass their queryset through `narrow_queryset`, see
+    `SparseFieldsetMixin`, so that what is not rendered is not fetched.
+    """
+
+    fields_query_param = "fields"
+    omit_query_param = "omit"
+
+    def get_fields(self):
+        fields = super().get_fields()
+        names = self.get_sparse_fieldset(fields)
+        if names is None:
+            return fields
+        return OrderedDict((name, field) for name, field in fields.items() if name in names)
+
+    def is_root(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+    def get_sparse_fieldset(self, fields):
+        """The names of the fields to render, or None for all of them"""
+        request = self.context.get("request")
+        if getattr(request, "method", None) != "GET" or not self.is_root():
+            return None
+
+        params = request.query_params
+        names = set(fields)
+        for param in (self.fields_query_param, self.omit_query_param):
+            if not params.get(param):
+                continue
+            requested = parse_field_names(params[param])
+            unknown = requested - set(fields)
+            if unknown:
+                raise ValidationError(
+                    {param: [f"Unknown fields: {', '.join(sorted(unknown))}."]}
+                )
+            if param == self.fields_query_param:
+                names &= requested
+            else:
+                names -= requested
+
+        return names if names != set(fields) else None
+
+    def narrow_queryset(self, queryset, always=()):
+        """
+        Restrict `queryset` to the columns, `select_related` joins and
+        prefetches the rendered fields need. Joins and prefetches are only
+        ever removed, never added.
+        """
+        opts = queryset.model._meta
+        reverse_relations = {
+            relation.get_accessor_name(): relation for relation in opts.related_objects
+        }
+
+        only = {opts.pk.name, *always}
+        relations = set()
+        prefetches = set()
+        for field in self.fields.values():
+            if field.source == "*":
+                continue
+            path = field.source.split(".")
+            try:
+                model_field = opts.get_field(path[0])
+            except FieldDoesNotExist:
+                model_field = reverse_relations.get(path[0])
+            if model_field is None:
+                # a property or an annotation
+                continue
+
+            if model_field.many_to_many or model_field.one_to_many:
+                prefetches.add(path[0])
+                continue
+            only.add(path[0])
+            if model_field.is_relation and len(path) > 1:
+                relations.add(path[0])
+                only.add("__".join(path[:2]))
+
+        select_related = queryset.query.select_related
+        if select_related is False:
+            relations = set()
+        elif isinstance(select_related, dict):
+            relations &= set(select_related)
+        queryset = queryset.select_related(None)
+        if relations:
+            queryset = queryset.select_related(*relations)
+
+        lookups = [
+            lookup
+            for lookup in queryset._prefetch_related_lookups
+            if (lookup.prefetch_to if isinstance(lookup, Prefetch) else lookup).split("__")[0]
+            in prefetches
+        ]
+        queryset = queryset.prefetch_related(None).prefetch_related(*lookups)
+
+        # columns of relations which are not joined are loaded lazily
+        return queryset.only(
+            *(name for name in only if "__" not in name or name.split("__")[0] in relations)
+        )
@@ -0,0 +1,13 @@
+from django.contrib import admin
+
+from .models import Tombstone
+
+
+class TombstoneAdmin(admin.ModelAdmin):
+    list_display = ("id", "kind", "object_id", "owner", "deleted_at")
+    list_filter = ("kind",)
+    raw_id_fields = ("owner",)
+    ordering = ("-deleted_at",)
+
+
+admin.site.register(Tombstone, TombstoneAdmin)
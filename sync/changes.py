@@ -0,0 +1,152 @@
+import base64
+import json
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from categories.models import Category
+from links.models import Link
+from tags.models import Tag
+
+from .models import Tombstone
+
+PAGE_SIZE = 500
+
+# Rows are stamped with the id of the transaction which changed them, see
+# sync migration 0002. Every transaction older than the oldest one still
+# running has committed or rolled back, so changes are synced up to it: a
+# long transaction holds the sync back until it commits instead of landing
+# behind a token which was already handed out. The own transaction of the
+# sync, if it wrote, is not waited for.
+SYNC_BOUND = """
+    SELECT coalesce(
+        (SELECT min(xid::text::bigint) FROM pg_snapshot_xip(snapshot) AS xid),
+        pg_snapshot_xmax(snapshot)::text::bigint
+    )
+    FROM pg_current_snapshot() AS snapshot
+"""
+
+
+class InvalidToken(Exception):
+    pass
+
+
+class ExpiredToken(Exception):
+    pass
+
+
+def encode_token(synced_at, positions):
+    payload = {
+        name: [txid, pk] if pk is not None else [txid] for name, (txid, pk) in positions.items()
+    }
+    payload["t"] = synced_at.isoformat()
+    return base64.urlsafe_b64encode(
+        json.dumps(payload, separators=(",", ":")).encode("ascii")
+    ).decode("ascii")
+
+
+def decode_token(token):
+    """
+    `(synced_at, positions)` of `token`, where `synced_at` is when the
+    tombstones were last synced up to the end.
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+        synced_at = parse_datetime(payload.pop("t"))
+        if synced_at is None:
+            raise ValueError
+        positions = {
+            name: (int(position[0]), int(position[1]) if len(position) > 1 else None)
+            for name, position in payload.items()
+        }
+    except (TypeError, ValueError, KeyError, IndexError, AttributeError, UnicodeEncodeError):
+        raise InvalidToken
+    return synced_at, positions
+
+
+def get_bound():
+    with connection.cursor() as cursor:
+        cursor.execute(SYNC_BOUND)
+        return cursor.fetchone()[0]
+
+
+class Stream:
+    """A queryset walked in `(sync_txid, id)` order"""
+
+    def __init__(self, queryset):
+        self.queryset = queryset
+
+    def page(self, position, bound, limit):
+        """
+        Rows after `position` and below `bound`, and the position to resume
+        from. A position is `(txid, id)`, or `(txid, None)` once every row
+        below `txid` was returned.
+        """
+        rows = self.queryset.filter(sync_txid__lt=bound)
+        if position is not None:
+            txid, pk = position
+            if pk is None:
+                rows = rows.filter(sync_txid__gte=txid)
+            else:
+                rows = rows.filter(Q(sync_txid__gt=txid) | Q(sync_txid=txid, id__gt=pk))
+
+        rows = list(rows.order_by("sync_txid", "id")[: limit + 1])
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            return rows, (last.sync_txid, last.id), True
+        return rows, (bound, None), False
+
+
+def get_streams(user):
+    return {
+        "links": Stream(
+            Link.objects.filter(owner=user)
+            .select_related("owner", "category")
+            .prefetch_related("tags")
+        ),
+        # categories being deleted in the background are hidden, as in the API
+        "categories": Stream(
+            Category.objects.filter(owner=user, pending_deletion=False)
+            .with_owner_and_shares()
+            .with_activity()
+        ),
+        # tags are shared by every user
+        "tags": Stream(Tag.objects.all()),
+        "deleted": Stream(Tombstone.objects.filter(owner=user)),
+    }
+
+
+def get_changes(user, token=None, limit=PAGE_SIZE):
+    """
+    The links, categories and tags created or updated since `token`, and the
+    tombstones of deleted links and categories, at most `limit` of each.
+
+    Every kind of row is paged on its own `(sync_txid, id)` keyset through
+    the `(owner, sync_txid, id)` indexes, so a sync costs time proportional
+    to the number of changes. Returns `(changes, next token, has more)`.
+    """
+    now = timezone.now()
+    bound = get_bound()
+    streams = get_streams(user)
+
+    if token:
+        synced_at, positions = decode_token(token)
+        if synced_at < now - settings.SYNC_TOMBSTONE_RETENTION:
+            raise ExpiredToken
+    else:
+        # a first sync has nothing to delete
+        synced_at, positions = now, {"deleted": (bound, None)}
+
+    changes, next_positions, has_more = {}, {}, False
+    for name, stream in streams.items():
+        rows, next_positions[name], more = stream.page(positions.get(name), bound, limit)
+        changes[name] = rows
+        has_more |= more
+    if next_positions["deleted"][1] is None:
+        synced_at = now
+
+    return changes, encode_token(synced_at, next_positions), has_more
@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.utils import timezone
+
+from links_organizer_api.utils.commands import WorkerCommand
+from sync.models import Tombstone
+
+
+class Command(WorkerCommand):
+    help = (
+        "Delete tombstones older than SYNC_TOMBSTONE_RETENTION, once or, with "
+        "--interval, periodically as a worker."
+    )
+    interval = None
+
+    def work(self, **options):
+        cutoff = timezone.now() - settings.SYNC_TOMBSTONE_RETENTION
+        deleted, _ = Tombstone.objects.filter(deleted_at__lt=cutoff).delete()
+        self.stdout.write(f"deleted {deleted} tombstones")
+        return False
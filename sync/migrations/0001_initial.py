@@ -0,0 +1,65 @@
+# Generated by Django 4.1.2 on 2026-10-18 08:48
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+TABLES = {
+    "link": "links_link",
+    "category": "categories_category",
+}
+
+CREATE_TRIGGERS = """
+CREATE FUNCTION sync_tombstone_insert() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO sync_tombstone (owner_id, kind, object_id, deleted_at)
+    VALUES (OLD.owner_id, TG_ARGV[0], OLD.id, clock_timestamp());
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+""" + "".join(
+    f"""
+CREATE TRIGGER sync_tombstone_{kind}_trigger
+    AFTER DELETE ON {table}
+    FOR EACH ROW EXECUTE FUNCTION sync_tombstone_insert('{kind}');
+"""
+    for kind, table in TABLES.items()
+)
+
+DROP_TRIGGERS = "".join(
+    f"DROP TRIGGER IF EXISTS sync_tombstone_{kind}_trigger ON {table};\n"
+    for kind, table in TABLES.items()
+) + "DROP FUNCTION IF EXISTS sync_tombstone_insert();"
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('categories', '0005_category_category_owner_updated_idx'),
+        ('links', '0007_link_link_owner_updated_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('link', 'Link'), ('category', 'Category')], max_length=10)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField()),
+                ('owner', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['owner', 'deleted_at', 'id'], name='tombstone_owner_deleted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['deleted_at'], name='tombstone_deleted_idx'),
+        ),
+        migrations.RunSQL(CREATE_TRIGGERS, DROP_TRIGGERS),
+    ]
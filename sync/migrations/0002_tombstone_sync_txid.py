@@ -0,0 +1,82 @@
+# Generated by Django 4.1.2 on 2026-10-18 09:48
+
+from django.db import migrations, models
+
+# `sync_txid` is the id of the transaction which last changed `updated_at`.
+# Changes are synced up to the oldest transaction still running, so rows of
+# a transaction which commits late are not skipped, see `sync.changes`.
+TABLES = ("links_link", "categories_category", "tags_tag")
+
+CREATE_TRIGGERS = """
+CREATE FUNCTION sync_txid_update() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' THEN
+        IF NEW.updated_at IS NOT DISTINCT FROM OLD.updated_at THEN
+            NEW.sync_txid := OLD.sync_txid;
+            RETURN NEW;
+        END IF;
+    END IF;
+    NEW.sync_txid := pg_current_xact_id()::text::bigint;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION sync_tombstone_insert() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO sync_tombstone (owner_id, kind, object_id, deleted_at, sync_txid)
+    VALUES (
+        OLD.owner_id, TG_ARGV[0], OLD.id, clock_timestamp(),
+        pg_current_xact_id()::text::bigint
+    );
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+""" + "".join(
+    f"""
+CREATE TRIGGER sync_txid_trigger
+    BEFORE INSERT OR UPDATE ON {table}
+    FOR EACH ROW EXECUTE FUNCTION sync_txid_update();
+"""
+    for table in TABLES
+)
+
+DROP_TRIGGERS = "".join(
+    f"DROP TRIGGER IF EXISTS sync_txid_trigger ON {table};\n" for table in TABLES
+) + """
+DROP FUNCTION IF EXISTS sync_txid_update();
+
+CREATE OR REPLACE FUNCTION sync_tombstone_insert() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO sync_tombstone (owner_id, kind, object_id, deleted_at)
+    VALUES (OLD.owner_id, TG_ARGV[0], OLD.id, clock_timestamp());
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0010_category_sync_txid'),
+        ('links', '0012_link_sync_txid'),
+        ('sync', '0001_initial'),
+        ('tags', '0005_tag_sync_txid'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='tombstone',
+            name='tombstone_owner_deleted_idx',
+        ),
+        migrations.AddField(
+            model_name='tombstone',
+            name='sync_txid',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['owner', 'sync_txid', 'id'], name='tombstone_owner_sync_idx'),
+        ),
+        migrations.RunSQL(CREATE_TRIGGERS, DROP_TRIGGERS),
+    ]
@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.db import models
+
+
+class Tombstone(models.Model):
+    """
+    A deleted link or category, so that clients syncing changes learn about
+    the deletion.
+
+    Rows are written by the `sync_tombstone_*` triggers on the deleted
+    tables, which also covers cascades and raw bulk deletes. The owner is not
+    a database level foreign key so that deleting an account, which deletes
+    its links and categories first, can still write them. Tombstones are
+    kept for `SYNC_TOMBSTONE_RETENTION`, see `prune_tombstones`.
+    """
+
+    class Kind(models.TextChoices):
+        LINK = "link"
+        CATEGORY = "category"
+
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        db_index=False,
+        related_name="+",
+    )
+    kind = models.CharField(max_length=10, choices=Kind.choices)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField()
+    # id of the deleting transaction
+    sync_txid = models.BigIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['owner', 'sync_txid', 'id'], name='tombstone_owner_sync_idx'),
+            models.Index(fields=['deleted_at'], name='tombstone_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id} deleted at {self.deleted_at}"
@@ -0,0 +1,36 @@
+from rest_framework import serializers
+
+from categories.serializers import CategorySerializer
+from links.serializers import LinkSerializer
+from tags.serializers import TagDetailSerializer
+
+from .models import Tombstone
+
+
+class TombstonesField(serializers.Field):
+    """Renders tombstones as the ids of the deleted rows, by kind"""
+
+    def to_representation(self, tombstones):
+        deleted = {"links": [], "categories": []}
+        names = {Tombstone.Kind.LINK: "links", Tombstone.Kind.CATEGORY: "categories"}
+        for tombstone in tombstones:
+            deleted[names[tombstone.kind]].append(tombstone.object_id)
+        return deleted
+
+
+class ChangesSerializer(serializers.Serializer):
+    links = LinkSerializer(many=True)
+    categories = CategorySerializer(many=True)
+    tags = TagDetailSerializer(many=True)
+    deleted = TombstonesField()
+    next_since = serializers.CharField(
+        help_text="Token to pass as `since` on the next sync"
+    )
+    has_more = serializers.BooleanField(
+        help_text="Whether more changes are waiting, sync again right away"
+    )
+
+
+class ChangesQuerySerializer(serializers.Serializer):
+    since = serializers.CharField(required=False, help_text="`next_since` of the last sync")
+    limit = serializers.IntegerField(required=False, min_value=1, max_value=1000)
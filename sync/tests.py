@@ -0,0 +1,235 @@
+import io
+import threading
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from accounts.models import User
+from categories.models import Category
+from categories.views import CategoryViewSet
+from links.models import Link
+from links.views import LinksViewSet
+from sync.changes import encode_token
+from sync.models import Tombstone
+from sync.views import ChangesViewSet
+from tags.models import Tag
+
+User: User = get_user_model()
+
+
+# changes are synced once committed, so every write of these tests commits
+class ChangesApiTests(TransactionTestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(
+            username= "test",
+            password="test",
+            email="test@test.com",
+            first_name="test"
+        )
+        self.other_user = User.objects.create_user(
+            username= "other",
+            password="other",
+            email="other@test.com",
+            first_name="other"
+        )
+        self.category1 = Category.objects.create(name="Category1", description="some description", background_url="https://example.com/400", owner=self.user)
+        self.tag1 = Tag.objects.create(name="react", description="a javascript framework")
+        self.link1 = Link.objects.create(url="https://example.com/1", category=self.category1, owner=self.user)
+        self.link2 = Link.objects.create(url="https://example.com/2", category=self.category1, owner=self.user)
+        self.link2.tags.add(self.tag1)
+
+        other_category = Category.objects.create(name="Other", owner=self.other_user)
+        Link.objects.create(url="https://example.com/other", category=other_category, owner=self.other_user)
+
+    def sync(self, since=None, **params):
+        if since is not None:
+            params["since"] = since
+        request = self.factory.get("/api/changes/", params)
+        force_authenticate(request, user=self.user)
+        return ChangesViewSet.as_view({"get": "list"})(request)
+
+    def ids(self, rows):
+        return [row["id"] for row in rows]
+
+    def test_first_sync(self):
+        response = self.sync()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.ids(response.data["links"]), [self.link1.id, self.link2.id])
+        self.assertEqual(response.data["links"][1]["tags"], [{"id": self.tag1.id, "name": "react"}])
+        self.assertEqual(self.ids(response.data["categories"]), [self.category1.id])
+        self.assertEqual(self.ids(response.data["tags"]), [self.tag1.id])
+        self.assertEqual(response.data["deleted"], {"links": [], "categories": []})
+        self.assertFalse(response.data["has_more"])
+
+    def test_categories_have_their_activity(self):
+        child = Category.objects.create(name="Child", owner=self.user, parent_category=self.category1)
+        Category.objects.filter(id=child.id).update(pending_deletion=True)
+        Category.objects.create(name="Child2", owner=self.user, parent_category=self.category1)
+
+        response = self.sync()
+
+        categories = {category["name"]: category for category in response.data["categories"]}
+        # the category being deleted is hidden
+        self.assertEqual(sorted(categories), ["Category1", "Child2"])
+        self.assertEqual(categories["Category1"]["subcategory_count"], 1)
+        self.assertEqual(parse_datetime(categories["Category1"]["last_link_added_at"]), self.link2.created_at)
+
+    def test_nothing_changed(self):
+        token = self.sync().data["next_since"]
+
+        response = self.sync(token)
+
+        self.assertEqual(response.data["links"], [])
+        self.assertEqual(response.data["categories"], [])
+        self.assertEqual(response.data["tags"], [])
+
+    def test_incremental_sync(self):
+        token = self.sync().data["next_since"]
+
+        self.link1.description = "changed"
+        self.link1.save()
+        category2 = Category.objects.create(name="Category2", owner=self.user)
+        tag2 = Tag.objects.create(name="django")
+        response = self.sync(token)
+
+        self.assertEqual(self.ids(response.data["links"]), [self.link1.id])
+        self.assertEqual(response.data["links"][0]["description"], "changed")
+        self.assertEqual(self.ids(response.data["categories"]), [category2.id])
+        self.assertEqual(self.ids(response.data["tags"]), [tag2.id])
+
+    def test_bulk_changes_are_synced(self):
+        token = self.sync().data["next_since"]
+
+        Link.objects.filter(id=self.link1.id).add_tags([self.tag1.id])
+        response = self.sync(token)
+
+        self.assertEqual(self.ids(response.data["links"]), [self.link1.id])
+
+    def test_deleted_link(self):
+        token = self.sync().data["next_since"]
+
+        request = self.factory.delete("/api/links/")
+        force_authenticate(request, user=self.user)
+        LinksViewSet.as_view({"delete": "destroy"})(request, pk=self.link1.id)
+        Link.objects.filter(id=self.link2.id).bulk_delete()
+        response = self.sync(token)
+
+        self.assertEqual(response.data["links"], [])
+        self.assertEqual(response.data["deleted"], {"links": [self.link1.id, self.link2.id], "categories": []})
+
+    def test_deleted_category_and_its_links(self):
+        token = self.sync().data["next_since"]
+
+        request = self.factory.delete("/api/categories/")
+        force_authenticate(request, user=self.user)
+        CategoryViewSet.as_view({"delete": "destroy"})(request, pk=self.category1.id)
+        response = self.sync(token)
+
+        self.assertEqual(sorted(response.data["deleted"]["links"]), [self.link1.id, self.link2.id])
+        self.assertEqual(response.data["deleted"]["categories"], [self.category1.id])
+
+    def test_paging(self):
+        for i in range(3, 6):
+            Link.objects.create(url=f"https://example.com/{i}", category=self.category1, owner=self.user)
+
+        synced = []
+        token = None
+        for _ in range(10):
+            response = self.sync(token, limit=2)
+            synced.extend(self.ids(response.data["links"]))
+            token = response.data["next_since"]
+            if not response.data["has_more"]:
+                break
+
+        self.assertEqual(synced, list(Link.objects.filter(owner=self.user).order_by("sync_txid", "id").values_list("id", flat=True)))
+
+    def test_query_count_does_not_depend_on_account_size(self):
+        token = self.sync().data["next_since"]
+        for i in range(3, 13):
+            Link.objects.create(url=f"https://example.com/{i}", category=self.category1, owner=self.user)
+
+        # sync bound, links with owner and category joined, tags prefetch,
+        # categories, tags, tombstones
+        with self.assertNumQueries(6):
+            response = self.sync(token)
+        self.assertEqual(len(response.data["links"]), 10)
+
+    def test_invalid_token(self):
+        response = self.sync("not-a-token")
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_expired_token(self):
+        old = timezone.now() - timedelta(days=365)
+        response = self.sync(encode_token(old, {"links": (1, None), "deleted": (1, None)}))
+
+        self.assertEqual(response.status_code, 410)
+
+    def test_changes_of_running_transaction_wait_for_commit(self):
+        token = self.sync().data["next_since"]
+        responses = []
+
+        def create_and_sync():
+            try:
+                Category.objects.create(name="Category2", owner=self.user)
+                responses.append(self.sync(token))
+            finally:
+                connection.close()
+
+        with transaction.atomic():
+            self.link1.description = "late"
+            self.link1.save()
+            # committed after the running transaction started, synced after it
+            thread = threading.Thread(target=create_and_sync)
+            thread.start()
+            thread.join()
+
+        self.assertEqual(responses[0].data["links"], [])
+        self.assertEqual(responses[0].data["categories"], [])
+
+        response = self.sync(responses[0].data["next_since"])
+
+        self.assertEqual(self.ids(response.data["links"]), [self.link1.id])
+        self.assertEqual(len(response.data["categories"]), 1)
+
+
+class PruneTombstonesTests(TestCase):
+    def test_prune_tombstones(self):
+        user = User.objects.create_user(username="test", password="test", email="test@test.com")
+        Tombstone.objects.create(owner=user, kind="link", object_id=1, deleted_at=timezone.now() - timedelta(days=365))
+        recent = Tombstone.objects.create(owner=user, kind="link", object_id=2, deleted_at=timezone.now())
+
+        call_command("prune_tombstones", stdout=io.StringIO())
+
+        self.assertEqual(list(Tombstone.objects.values_list("id", flat=True)), [recent.id])
+
+    def test_prune_tombstones_with_interval(self):
+        user = User.objects.create_user(username="test", password="test", email="test@test.com")
+        old = timezone.now() - timedelta(days=365)
+        Tombstone.objects.create(owner=user, kind="link", object_id=1, deleted_at=old)
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            if len(sleeps) > 1:
+                raise KeyboardInterrupt
+            Tombstone.objects.create(owner=user, kind="link", object_id=2, deleted_at=old)
+
+        out = io.StringIO()
+        commands = "links_organizer_api.utils.commands"
+        # closing the connection would end the test transaction
+        with patch(f"{commands}.time.sleep", sleep), patch(f"{commands}.close_old_connections"):
+            call_command("prune_tombstones", "--interval", "60", stdout=out)
+
+        self.assertEqual(sleeps, [60, 60])
+        self.assertEqual(out.getvalue().splitlines(), ["deleted 1 tombstones", "deleted 1 tombstones"])
+        self.assertFalse(Tombstone.objects.exists())
@@ -0,0 +1,8 @@
+from rest_framework.routers import DefaultRouter
+
+from .views import ChangesViewSet
+
+router = DefaultRouter()
+router.register("changes", ChangesViewSet, basename="changes")
+
+urlpatterns = router.urls
@@ -0,0 +1,52 @@
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework import status, viewsets
+from rest_framework.exceptions import APIException, NotFound
+from rest_framework.response import Response
+
+from .changes import PAGE_SIZE, ExpiredToken, InvalidToken, get_changes
+from .serializers import ChangesQuerySerializer, ChangesSerializer
+
+
+class TokenExpired(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = "The sync token expired, sync again without since."
+    default_code = "token_expired"
+
+
+class ChangesViewSet(viewsets.GenericViewSet):
+    serializer_class = ChangesSerializer
+    pagination_class = None
+
+    @swagger_auto_schema(
+        operation_summary="Links, categories and tags changed since the last sync",
+        query_serializer=ChangesQuerySerializer,
+        responses={
+            200: ChangesSerializer,
+            404: "Invalid token",
+            410: "Expired token, sync again without since",
+        },
+    )
+    def list(self, request):
+        """
+        Returns what changed since the `since` token, and the token for the next
+        sync. Without `since` everything is returned. When `has_more` is true
+        the changes were paged, sync again right away with `next_since`.
+        """
+        query = ChangesQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+
+        try:
+            changes, token, has_more = get_changes(
+                request.user,
+                query.validated_data.get("since"),
+                query.validated_data.get("limit", PAGE_SIZE),
+            )
+        except InvalidToken:
+            raise NotFound("Invalid token")
+        except ExpiredToken:
+            raise TokenExpired()
+
+        serializer = self.get_serializer(
+            {**changes, "next_since": token, "has_more": has_more}
+        )
+        return Response(serializer.data)
@@ -0,0 +1,33 @@
+# Generated by Django 4.1.2 on 2026-10-18 08:52
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('tags', '0003_tag_tag_updated_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TagUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('link_count', models.PositiveIntegerField(default=0)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usages', to='tags.tag')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='tagusage',
+            index=models.Index(fields=['owner', '-link_count', 'tag'], name='tag_usage_owner_count_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='tagusage',
+            constraint=models.UniqueConstraint(fields=('owner', 'tag'), name='unique_tag_usage_owner_tag'),
+        ),
+    ]
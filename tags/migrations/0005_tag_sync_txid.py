@@ -0,0 +1,22 @@
+# Generated by Django 4.1.2 on 2026-10-18 09:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tags', '0004_tagusage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tag',
+            name='sync_txid',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['sync_txid', 'id'], name='tag_sync_idx'),
+        ),
+    ]
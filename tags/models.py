@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.db import models
 
 from .validators import TagNameValidator
@@ -19,6 +20,39 @@ class Tag(models.Model):
     description = models.TextField(max_length=300, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # id of the transaction which last changed `updated_at`, set by a
+    # trigger, see sync migration 0002
+    sync_txid = models.BigIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='tag_created_idx'),
+            models.Index(fields=['updated_at', 'id'], name='tag_updated_idx'),
+            models.Index(fields=['sync_txid', 'id'], name='tag_sync_idx'),
+        ]
 
     def __str__(self):
         return f"T{self.id} - {self.name}"
+
+
+class TagUsage(models.Model):
+    """
+    How many links of `owner` are tagged with `tag`. Rows are maintained by
+    triggers on `links_link_tags`, see links migration 0008, and are removed
+    once the count drops to zero.
+    """
+
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+")
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name="usages")
+    link_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'tag'], name='unique_tag_usage_owner_tag'),
+        ]
+        indexes = [
+            models.Index(fields=['owner', '-link_count', 'tag'], name='tag_usage_owner_count_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.owner_id} - {self.tag_id}: {self.link_count}"
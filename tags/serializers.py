@@ -1,9 +1,11 @@
 from rest_framework import serializers
 
-from .models import Tag
+from links_organizer_api.utils.serializers import SparseFieldsetSerializerMixin
 
+from .models import Tag, TagUsage
 
-class TagDetailSerializer(serializers.ModelSerializer):
+
+class TagDetailSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     """Tag Detail Serializer"""
 
     class Meta:
@@ -18,3 +20,13 @@ class TagSerializer(serializers.ModelSerializer):
     class Meta:
         model = Tag
         fields = ('id', 'name')
+
+
+class TagUsageSerializer(serializers.ModelSerializer):
+    """How many links of the user are tagged with a tag"""
+
+    tag = TagSerializer(read_only=True)
+
+    class Meta:
+        model = TagUsage
+        fields = ('tag', 'link_count')
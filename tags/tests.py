@@ -3,6 +3,8 @@ from django.test import TestCase
 from rest_framework.test import APIRequestFactory, force_authenticate
 
 from accounts.models import User
+from categories.models import Category
+from links.models import Link
 from tags.models import Tag
 from tags.views import TagViewSet
 
@@ -74,6 +76,20 @@ class TagListApiTests(TestCase):
         self.assertEqual(response.data["results"][1]["id"], self.tag2.id)
         self.assertEqual(response.data["results"][2]["id"], self.tag1.id)
 
+    def test_get_tag_list_fields(self):
+        request = self.factory.get("/api/tags/", {"fields": "id,name"})
+        force_authenticate(request, user=self.user)
+        response = TagViewSet.as_view({"get": "list"})(request)
+
+        self.assertEqual(response.data["results"][0], {"id": self.tag3.id, "name": "python"})
+
+    def test_get_tag_list_unknown_field(self):
+        request = self.factory.get("/api/tags/", {"omit": "owner"})
+        force_authenticate(request, user=self.user)
+        response = TagViewSet.as_view({"get": "list"})(request)
+
+        self.assertEqual(response.status_code, 400)
+
     def test_tags_filter_by_name(self):
         request = self.factory.get(f"/api/tags/?name=r")
         force_authenticate(request, user=self.user)
@@ -127,3 +143,54 @@ class TagModelTests(TestCase):
 
     def test_tag_object_as_string(self):
         self.assertEqual(str(self.tag), f"T{self.tag.id} - {self.tag.name}")
+
+
+class TagUsageApiTests(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(
+                username= "test",
+                password="test",
+                email="test@test.com",
+                first_name="test"
+            )
+        self.user2 = User.objects.create_user(
+                username= "test2",
+                password="test2",
+                email="test2@test.com",
+                first_name="test2"
+            )
+        self.tag1 = Tag.objects.create(name="react", description="a javascript framework")
+        self.tag2 = Tag.objects.create(name="django", description="something...")
+        self.tag3 = Tag.objects.create(name="python", description="a programming language.")
+
+        category = Category.objects.create(name="Category1", owner=self.user)
+        link1 = Link.objects.create(url="https://example1.com", category=category, owner=self.user)
+        link1.tags.add(self.tag1, self.tag2)
+        link2 = Link.objects.create(url="https://example2.com", category=category, owner=self.user)
+        link2.tags.add(self.tag2)
+
+        other = Link.objects.create(url="https://example3.com", category=Category.objects.create(name="Category2", owner=self.user2), owner=self.user2)
+        other.tags.add(self.tag3)
+
+    def get_usage(self, params=None):
+        request = self.factory.get("/api/tags/usage/", params)
+        force_authenticate(request, user=self.user)
+        return TagViewSet.as_view({"get": "usage"})(request)
+
+    def test_get_tag_usage(self):
+        with self.assertNumQueries(2):
+            response = self.get_usage()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 2)
+        self.assertEqual(
+            [(usage["tag"]["name"], usage["link_count"]) for usage in response.data["results"]],
+            [("django", 2), ("react", 1)],
+        )
+
+    def test_get_tag_usage_limit(self):
+        response = self.get_usage({"limit": 1, "offset": 1})
+
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["results"][0]["tag"], {"id": self.tag1.id, "name": "react"})
@@ -3,27 +3,35 @@ from django.contrib.postgres.search import SearchVector
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import mixins, viewsets
+from rest_framework.decorators import action
 from rest_framework.generics import ListCreateAPIView, RetrieveAPIView
 from rest_framework.request import Request
 from rest_framework.response import Response
 
-from links_organizer_api.utils.paginations import CustomLimitOffsetPagination
+from links_organizer_api.utils.mixins import GetSerializerClassMixin, SparseFieldsetMixin
+from links_organizer_api.utils.paginations import (
+    CustomLimitOffsetPagination,
+    LimitOffsetOrKeysetPagination,
+)
 
-from .models import Tag
-from .serializers import TagDetailSerializer
+from .models import Tag, TagUsage
+from .serializers import TagDetailSerializer, TagUsageSerializer
 
 UserModel = get_user_model()
 
 
 class TagViewSet(
+    SparseFieldsetMixin,
+    GetSerializerClassMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     mixins.RetrieveModelMixin,
     viewsets.GenericViewSet,
 ):
     serializer_class = TagDetailSerializer
+    serializer_action_classes = {"usage": TagUsageSerializer}
     ordering = "-created_at"
-    pagination_class = CustomLimitOffsetPagination
+    pagination_class = LimitOffsetOrKeysetPagination
     ordering_fields = ("created_at", "updated_at", "name")
 
     def get_queryset(self):
@@ -44,3 +52,20 @@ class TagViewSet(
                 search__icontains=tag_name
             )
         return Tag.objects.all()
+
+    @swagger_auto_schema(responses={200: TagUsageSerializer(many=True)})
+    @action(
+        detail=False,
+        methods=["get"],
+        pagination_class=CustomLimitOffsetPagination,
+    )
+    def usage(self, request):
+        """The tags used by the links of the user, most used first"""
+        usages = (
+            TagUsage.objects.filter(owner=request.user)
+            .select_related("tag")
+            .order_by("-link_count", "tag_id")
+        )
+        page = self.paginate_queryset(usages)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)